@@ -8,6 +8,8 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional, Tuple
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
@@ -26,6 +28,8 @@ except ImportError:
 
 # Importar classe original
 from src.ai_engine import AITradingEngine
+from src.ultra_model_registry import get_ultra_model_registry
+from src.dtype_policy import to_model_matrix
 
 logger = logging.getLogger(__name__)
 
@@ -36,9 +40,16 @@ class UltraEnhancedAIEngine(AITradingEngine):
         super().__init__(config)
         self.ultra_features_enabled = True
         self.min_confidence_threshold = 0.55  # Threshold mais baixo para ser menos conservador
-        self.ensemble_models = {}
-        self.feature_scalers = {}
-        self.feature_selectors = {}
+        
+        # Modelos por (símbolo, timeframe): cada entrada é trocada inteira (ensemble,
+        # seletor, scaler e colunas) quando um retreino termina
+        self.ultra_models = {}
+        self.model_registry = get_ultra_model_registry(config)
+        registry_settings = getattr(config, 'ULTRA_MODEL_REGISTRY', None) or {}
+        self.train_in_background = registry_settings.get('train_in_background', True)
+        self._ultra_lock = threading.Lock()
+        self._training_pending = set()
+        self._training_pool = None
         
         # Configurações avançadas
         self.lookback_periods = [3, 5, 8, 13, 21]  # Fibonacci
@@ -327,8 +338,13 @@ class UltraEnhancedAIEngine(AITradingEngine):
             logger.error(f"❌ Erro criando features ultra avançadas: {e}")
             return df
     
-    def train_ultra_model(self, df: pd.DataFrame, symbol: str) -> Dict:
-        """Treinar modelo ultra avançado com otimizações"""
+    def train_ultra_model(self, df: pd.DataFrame, symbol: str, timeframe: str = '1h') -> Dict:
+        """
+        Treinar modelo ultra avançado com otimizações
+
+        df deve vir de create_ultra_features. O modelo treinado substitui o da
+        série em memória e é salvo como nova versão no registro.
+        """
         
         try:
             if not ML_AVAILABLE:
@@ -373,7 +389,7 @@ class UltraEnhancedAIEngine(AITradingEngine):
             # Feature Selection otimizada
             k_features = min(30, len(feature_cols), len(X) // 3)
             selector = SelectKBest(f_classif, k=k_features)
-            X_selected = selector.fit_transform(X, y)
+            X_selected = selector.fit_transform(to_model_matrix(X), y.to_numpy())
             
             # Feature Scaling
             scaler = RobustScaler()
@@ -416,21 +432,30 @@ class UltraEnhancedAIEngine(AITradingEngine):
                     class_weight='balanced'
                 )
               # Treinar modelo
-            ensemble.fit(X_scaled, y)
+            ensemble.fit(X_scaled, y.to_numpy())
             
             # Validação cruzada
-            cv_scores = cross_val_score(ensemble, X_scaled, y, cv=5, scoring='accuracy')
+            cv_scores = cross_val_score(ensemble, X_scaled, y.to_numpy(), cv=5, scoring='accuracy')
             accuracy = cv_scores.mean()
             
             logger.info(f"📊 Acurácia CV: {accuracy:.3f} ± {cv_scores.std():.3f}")
             
             # Salvar componentes
-            self.ensemble_models[symbol] = ensemble
-            self.feature_selectors[symbol] = selector
-            self.feature_scalers[symbol] = scaler
+            bundle = {
+                'ensemble': ensemble,
+                'selector': selector,
+                'scaler': scaler,
+                'feature_cols': feature_cols,
+            }
+            entry = {'accuracy': float(accuracy), 'std': float(cv_scores.std()),
+                     'n_features': int(X_scaled.shape[1]), 'n_samples': int(len(X))}
+            if self.model_registry is not None:
+                entry = self.model_registry.save(symbol, timeframe, bundle, df_clean.index, **entry) or entry
+            self._install_ultra_model(symbol, timeframe, bundle, entry)
             
             return {
                 'success': True,
+                'version': entry.get('version'),
                 'accuracy': accuracy,
                 'std': cv_scores.std(),
                 'n_features': X_scaled.shape[1],
@@ -442,43 +467,143 @@ class UltraEnhancedAIEngine(AITradingEngine):
             logger.error(f"❌ Erro no treinamento ultra: {e}")
             return {'success': False, 'error': str(e)}
     
-    def ultra_predict_signal(self, df: pd.DataFrame, symbol: str) -> Dict:
-        """Predição ultra avançada otimizada"""
+    def get_ultra_model(self, symbol: str, timeframe: str = '1h') -> Optional[Tuple[Dict, Dict]]:
+        """Modelo em uso da série e seus metadados (carregado do registro na primeira vez)"""
+        key = (symbol, timeframe)
+        with self._ultra_lock:
+            current = self.ultra_models.get(key)
+        if current is not None or self.model_registry is None:
+            return current
+
+        loaded = self.model_registry.load(symbol, timeframe)
+        if loaded is None:
+            return None
+        bundle, entry = loaded
+        with self._ultra_lock:
+            # Um retreino concluído enquanto o arquivo era lido tem prioridade
+            current = self.ultra_models.setdefault(key, (bundle, entry))
+        logger.info(f"💾 Modelo ultra {symbol} {timeframe} v{entry.get('version')} carregado do registro")
+        return current
+
+    def schedule_ultra_training(self, df_enhanced: pd.DataFrame, symbol: str, timeframe: str = '1h') -> bool:
+        """Agendar treino em segundo plano (um por série por vez); False se já há um pendente"""
+        key = (symbol, timeframe)
+        with self._ultra_lock:
+            if not self.train_in_background or key in self._training_pending:
+                return False
+            self._training_pending.add(key)
+            if self._training_pool is None:
+                self._training_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ultra-train')
+            pool = self._training_pool
+
+        logger.info(f"🧠 Treino do modelo ultra de {symbol} {timeframe} agendado em segundo plano")
+        pool.submit(self._train_in_background, df_enhanced, symbol, timeframe)
+        return True
+
+    def pretrain_ultra_models(self, market_data, symbols: Optional[List[str]] = None,
+                              timeframes: Optional[List[str]] = None) -> int:
+        """
+        Pré-treinar em segundo plano as séries sem modelo salvo ou com modelo
+        desatualizado. Retorna imediatamente o número de séries verificadas.
+        """
+        settings = getattr(self.config, 'ULTRA_MODEL_REGISTRY', None) or {}
+        symbols = symbols or getattr(self.config, 'CRYPTO_PAIRS', [])
+        timeframes = timeframes or getattr(self.config, 'STARTUP_TIMEFRAMES', ['1h'])
+        series = [(symbol, timeframe) for symbol in symbols for timeframe in timeframes]
+        limit = settings.get('pretrain_candles', 1000)
+
+        def pretrain():
+            for symbol, timeframe in series:
+                try:
+                    df = market_data.get_historical_data(symbol, timeframe, limit)
+                    if df is None or len(df) < 100:
+                        logger.warning(f"⚠️ Dados insuficientes para pré-treinar {symbol} {timeframe}")
+                        continue
+                    current = self.get_ultra_model(symbol, timeframe)
+                    if current is not None and not self._is_stale(current[1], df.index):
+                        continue
+                    df_enhanced = self.create_ultra_features(df.copy())
+                    self.schedule_ultra_training(df_enhanced, symbol, timeframe)
+                except Exception as e:
+                    logger.error(f"Erro no pré-treino ultra de {symbol} {timeframe}: {e}")
+
+        threading.Thread(target=pretrain, name='ultra-pretrain', daemon=True).start()
+        logger.info(f"🧠 Pré-treino ultra iniciado para {len(series)} séries")
+        return len(series)
+
+    def _train_in_background(self, df_enhanced: pd.DataFrame, symbol: str, timeframe: str):
+        try:
+            result = self.train_ultra_model(df_enhanced, symbol, timeframe)
+            if not result.get('success', False):
+                logger.warning(f"⚠️ Treino ultra de {symbol} {timeframe} não concluído: "
+                               f"{result.get('reason') or result.get('error')}")
+        except Exception as e:
+            logger.error(f"Erro no treino ultra em segundo plano de {symbol} {timeframe}: {e}")
+        finally:
+            with self._ultra_lock:
+                self._training_pending.discard((symbol, timeframe))
+
+    def _reload_newer_version(self, symbol: str, timeframe: str,
+                              current: Optional[Tuple[Dict, Dict]]) -> Optional[Tuple[Dict, Dict]]:
+        """Trocar para a versão gravada por outro processo (ex.: pipeline offline), se houver"""
+        if self.model_registry is None:
+            return current
+        entry = self.model_registry.refresh(symbol, timeframe)
+        if entry is None or (current is not None and entry.get('version') == current[1].get('version')):
+            return current
+
+        loaded = self.model_registry.load(symbol, timeframe)
+        if loaded is None:
+            return current
+        self._install_ultra_model(symbol, timeframe, *loaded)
+        logger.info(f"🔄 Modelo ultra {symbol} {timeframe} atualizado para v{entry.get('version')}")
+        return loaded
+
+    def _install_ultra_model(self, symbol: str, timeframe: str, bundle: Dict, entry: Dict):
+        """Troca atômica: leitores pegam a tupla antiga ou a nova, nunca uma mistura"""
+        with self._ultra_lock:
+            self.ultra_models[(symbol, timeframe)] = (bundle, entry)
+
+    def _is_stale(self, entry: Dict, index: pd.Index) -> bool:
+        if self.model_registry is None:
+            return False
+        return self.model_registry.is_stale(entry, index)
+
+    def ultra_predict_signal(self, df: pd.DataFrame, symbol: str, timeframe: str = '1h') -> Dict:
+        """
+        Predição ultra avançada otimizada
+
+        Nunca treina no caminho da requisição: sem modelo para a série, o treino
+        é agendado em segundo plano e a predição normal é usada; com modelo
+        desatualizado, ele continua em uso até o retreino terminar.
+        """
         
         try:
             # Criar features ultra avançadas
             df_enhanced = self.create_ultra_features(df)
             
-            # Treinar modelo se necessário
-            if symbol not in self.ensemble_models:
-                logger.info(f"🧠 Treinando modelo ultra para {symbol}...")
-                training_result = self.train_ultra_model(df_enhanced, symbol)
-                
-                if not training_result.get('success', False):
-                    logger.warning(f"⚠️ Fallback para predição normal")
-                    return self.predict_signal(df, symbol)
+            current = self.get_ultra_model(symbol, timeframe)
+            if current is None or self._is_stale(current[1], df_enhanced.index):
+                current = self._reload_newer_version(symbol, timeframe, current)
+                if current is None or self._is_stale(current[1], df_enhanced.index):
+                    self.schedule_ultra_training(df_enhanced.copy(), symbol, timeframe)
             
-            # Preparar dados para predição
-            exclude_cols = [
-                'open', 'high', 'low', 'close', 'volume', 'timestamp', 
-                'future_direction', 'Unnamed'
-            ]
-            feature_cols = [
-                col for col in df_enhanced.columns 
-                if not any(exc in col for exc in exclude_cols)
-            ]
+            if current is None:
+                logger.warning(f"⚠️ Modelo ultra de {symbol} {timeframe} ainda não disponível - fallback para predição normal")
+                return self.predict_signal(df, symbol)
             
-            X_latest = df_enhanced[feature_cols].iloc[-1:].fillna(0)
+            bundle, entry = current
             
-            # Aplicar transformações
-            selector = self.feature_selectors[symbol]
-            scaler = self.feature_scalers[symbol]
+            # Preparar dados para predição (mesmas colunas do treino)
+            feature_cols = bundle['feature_cols']
+            X_latest = to_model_matrix(df_enhanced.reindex(columns=feature_cols).iloc[-1:].fillna(0))
             
-            X_selected = selector.transform(X_latest)
-            X_scaled = scaler.transform(X_selected)
+            # Aplicar transformações
+            X_selected = bundle['selector'].transform(X_latest)
+            X_scaled = bundle['scaler'].transform(X_selected)
             
             # Predição
-            model = self.ensemble_models[symbol]
+            model = bundle['ensemble']
             prediction = model.predict(X_scaled)[0]
             probabilities = model.predict_proba(X_scaled)[0]
             
@@ -567,6 +692,7 @@ class UltraEnhancedAIEngine(AITradingEngine):
                 'reason': f'UltraEnhanced ML prediction (conf: {final_confidence:.3f})',  # FIXADO: adicionar reason
                 'ai_features': len(feature_cols),  # FIXADO: contagem de features
                 'model_used': 'UltraEnhancedV2',
+                'model_version': entry.get('version'),
                 'ultra_enhanced': True,
                 'probabilities': probabilities.tolist(),
                 'confluence': df_enhanced.get('confluence_strength', pd.Series([0])).iloc[-1],
@@ -629,8 +755,12 @@ def test_ultra_engine():
             df_ultra = ultra_ai.create_ultra_features(df)
             print(f"✅ Features criadas: {len(df_ultra.columns)} colunas")
             
+            # Treino explícito: ultra_predict_signal só agenda treinos em segundo plano
+            if ultra_ai.get_ultra_model(symbol, '5m') is None:
+                ultra_ai.train_ultra_model(df_ultra.copy(), symbol, '5m')
+            
             # Fazer predição ultra
-            result = ultra_ai.ultra_predict_signal(df, symbol)
+            result = ultra_ai.ultra_predict_signal(df, symbol, '5m')
             
             print(f"\n🎯 RESULTADO:")
             print(f"   Sinal: {result.get('signal_type', 'N/A')}")
@@ -12,7 +12,6 @@ import warnings
 import time
 from pathlib import Path
 import pickle
-import hashlib
 
 # Suprimir warnings desnecessários
 warnings.filterwarnings('ignore')
@@ -31,6 +30,10 @@ try:
 except ImportError:
     XGB_AVAILABLE = False
 
+from src.feature_store import get_feature_store
+from src.ultra_model_registry import get_ultra_model_registry
+from src.dtype_policy import to_model_matrix
+
 logger = logging.getLogger(__name__)
 
 class UltraFastAIEngine:
@@ -38,15 +41,15 @@ class UltraFastAIEngine:
     
     def __init__(self, config):
         self.config = config
+        # Modelo, colunas e acurácia por série (símbolo, timeframe), como no registro
         self.models = {}
         self.scalers = {}
         self.feature_selectors = {}
         self.model_performance = {}
-        self.feature_cache = {}
-          # Cache para acelerar processamento
-        self.cache_ttl = 120  # 2 minutos (reduzido de 5)
-        self.data_cache = {}
-        self.feature_cache = {}  # Cache específico para features
+        self.feature_columns = {}
+        self.model_registry = get_ultra_model_registry(config, 'ultra_fast')
+        # Cache de features e predições por (símbolo, timeframe, último candle)
+        self.feature_store = get_feature_store(config)
         
         # Configurações otimizadas para velocidade
         self.min_confidence_threshold = 0.10  # Mais baixo ainda
@@ -87,26 +90,16 @@ class UltraFastAIEngine:
                 )
             }
     
-    def _get_cache_key(self, symbol: str, df_hash: str) -> str:
-        """Gerar chave de cache baseada no símbolo e hash dos dados"""
-        return f"{symbol}_{df_hash}"
+    def _create_fast_features(self, df: pd.DataFrame, symbol: Optional[str] = None,
+                              timeframe: Optional[str] = None) -> pd.DataFrame:
+        """Criar apenas features essenciais para máxima velocidade (cacheadas por série e candle)"""
+        if self.use_cache and symbol:
+            return self.feature_store.get_or_compute(symbol, timeframe or '1h', df, 'ultra_fast_features',
+                                                     self._compute_fast_features)
+        return self._compute_fast_features(df)
     
-    def _get_df_hash(self, df: pd.DataFrame) -> str:
-        """Gerar hash dos dados para cache"""
-        try:
-            # Hash apenas das últimas 10 linhas para velocidade
-            last_rows = df.tail(10).to_string()
-            return hashlib.md5(last_rows.encode()).hexdigest()[:8]
-        except:
-            return str(int(time.time()))
-    def _create_fast_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Criar apenas features essenciais para máxima velocidade"""
+    def _compute_fast_features(self, df: pd.DataFrame) -> Optional[pd.DataFrame]:
         try:
-            # Cache de features baseado no hash dos dados
-            df_hash = self._get_df_hash(df)
-            if df_hash in self.feature_cache:
-                return self.feature_cache[df_hash]
-            
             result = df.copy()
             
             # Features mínimas apenas
@@ -142,25 +135,21 @@ class UltraFastAIEngine:
             result = result.replace([np.inf, -np.inf], np.nan)
             result = result.fillna(method='bfill').fillna(0)
             
-            # Cache resultado
-            self.feature_cache[df_hash] = result
-            
-            # Limitar cache
-            if len(self.feature_cache) > 20:
-                oldest_key = list(self.feature_cache.keys())[0]
-                del self.feature_cache[oldest_key]
-            
             return result
             
         except Exception as e:
+            # None não entra no feature store (os candles sem features não viram cache)
             logger.error(f"Erro ao criar features rápidas: {e}")
-            return df
+            return None
     
-    def _prepare_training_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    def _prepare_training_data(self, df: pd.DataFrame, symbol: Optional[str] = None,
+                               timeframe: Optional[str] = None) -> Tuple[pd.DataFrame, pd.Series]:
         """Preparar dados de treino de forma rápida"""
         try:
             # Criar features rápidas
-            df_features = self._create_fast_features(df)
+            df_features = self._create_fast_features(df, symbol, timeframe)
+            if df_features is None:
+                return pd.DataFrame(), pd.Series()
             
             # Target simples baseado em retornos futuros
             future_returns = df['close'].shift(-3) / df['close'] - 1  # 3 períodos à frente
@@ -187,40 +176,41 @@ class UltraFastAIEngine:
             logger.error(f"Erro ao preparar dados de treino: {e}")
             return pd.DataFrame(), pd.Series()
     
-    def ultra_fast_predict(self, df: pd.DataFrame, symbol: str) -> Dict:
-        """Predição ultra rápida com cache agressivo"""
+    def ultra_fast_predict(self, df: pd.DataFrame, symbol: str, timeframe: str = '1h') -> Dict:
+        """Predição ultra rápida com cache agressivo (usa o modelo salvo pelo pipeline de treino)"""
         try:
             start_time = time.time()
             
-            # Verificar cache
-            df_hash = self._get_df_hash(df)
-            cache_key = self._get_cache_key(symbol, df_hash)
-            
-            if cache_key in self.data_cache:
-                cache_data = self.data_cache[cache_key]
-                if time.time() - cache_data['timestamp'] < self.cache_ttl:
-                    # logger.info(f"🚀 Cache hit para {symbol} - {time.time() - start_time:.2f}s")
-                    return cache_data['result']
+            # Verificar cache (mesmos candles da série = mesma predição)
+            if self.use_cache:
+                cached = self.feature_store.get(symbol, timeframe, df, 'ultra_fast_prediction')
+                if cached is not None:
+                    return cached
             
             # Preparar dados rapidamente
-            X, y = self._prepare_training_data(df)
+            X, y = self._prepare_training_data(df, symbol, timeframe)
             
             if X.empty or len(X) < 50:
                 return self._default_prediction()
-              # Treinar modelo leve se necessário
-            if symbol not in self.models or len(self.models) == 0:
-                self._train_ultra_fast_model(X, y, symbol)
+            key = (symbol, timeframe)
+            if key not in self.models:
+                self._load_saved_model(symbol, timeframe)
+            # Treinar modelo leve se necessário
+            if key not in self.models:
+                self._train_ultra_fast_model(X, y, symbol, timeframe)
+            if key not in self.models:
+                return self._default_prediction()
             
             # Predição
             try:
                 # Usar apenas último ponto para predição
-                X_pred = X.iloc[-1:].fillna(0)
+                X_pred = to_model_matrix(X.reindex(columns=self.feature_columns.get(key, X.columns)).iloc[-1:].fillna(0))
                 
-                # Ensemble rápido
+                # Ensemble rápido (modelo único da série)
                 predictions = []
                 confidences = []
                 
-                for model_name, model in self.ensemble_models.items():
+                for model_name, model in {'rf': self.models[key]}.items():
                     if model:
                         try:
                             pred = model.predict(X_pred)[0]
@@ -274,16 +264,8 @@ class UltraFastAIEngine:
                 }
                 
                 # Cache resultado
-                self.data_cache[cache_key] = {
-                    'result': result,
-                    'timestamp': time.time()
-                }
-                
-                # Limpar cache antigo
-                if len(self.data_cache) > 100:
-                    oldest_key = min(self.data_cache.keys(), 
-                                   key=lambda k: self.data_cache[k]['timestamp'])
-                    del self.data_cache[oldest_key]
+                if self.use_cache:
+                    self.feature_store.put(symbol, timeframe, df, 'ultra_fast_prediction', result)
                 
                 logger.info(f"🎯 {symbol}: {signal_type.upper()} (conf: {avg_confidence:.3f}, time: {time.time() - start_time:.2f}s)")
                 return result
@@ -295,7 +277,7 @@ class UltraFastAIEngine:
         except Exception as e:
             logger.error(f"Erro geral na predição ultra rápida: {e}")
             return self._default_prediction()
-    def _train_ultra_fast_model(self, X: pd.DataFrame, y: pd.Series, symbol: str):
+    def _train_ultra_fast_model(self, X: pd.DataFrame, y: pd.Series, symbol: str, timeframe: str = '1h'):
         """Treinar modelo ultra rápido"""
         try:
             # Remover NaN
@@ -320,26 +302,66 @@ class UltraFastAIEngine:
                 max_features='sqrt'  # Menos features
             )
             
-            model.fit(X_recent, y_recent)
+            X_matrix = to_model_matrix(X_recent)
+            model.fit(X_matrix, y_recent.to_numpy())
             
-            # Atualizar ensemble com modelo único para velocidade
-            self.ensemble_models = {'rf': model}  # Só um modelo
-            self.models[symbol] = model
+            # Modelo único por série para velocidade
+            key = (symbol, timeframe)
+            self.models[key] = model
+            self.feature_columns[key] = list(X.columns)
             
             # Calcular acurácia simples
             if len(X_recent) > 10:
-                train_pred = model.predict(X_recent[-10:])
+                train_pred = model.predict(X_matrix[-10:])
                 train_acc = accuracy_score(y_recent[-10:], train_pred)
-                self.model_performance[symbol] = {'accuracy': train_acc}
+                self.model_performance[key] = {'accuracy': train_acc}
             
             # logger.info(f"🚀 Modelo ultra rápido treinado para {symbol}")
             
         except Exception as e:
             logger.error(f"Erro ao treinar modelo ultra rápido para {symbol}: {e}")
     
-    def _train_fast_model(self, X: pd.DataFrame, y: pd.Series, symbol: str):
+    def train_model(self, df: pd.DataFrame, symbol: str, timeframe: str = '1h') -> Dict:
+        """Treinar o modelo do símbolo fora da predição e salvá-lo no registro"""
+        X, y = self._prepare_training_data(df, symbol, timeframe)
+        if X.empty or len(X) < 50:
+            return {'success': False, 'reason': 'Dados insuficientes'}
+        
+        key = (symbol, timeframe)
+        self.models.pop(key, None)
+        self._train_ultra_fast_model(X, y, symbol, timeframe)
+        model = self.models.get(key)
+        if model is None:
+            return {'success': False, 'reason': 'Treino não concluído'}
+        
+        # Predições em cache vieram do modelo anterior
+        self.feature_store.invalidate(symbol, timeframe)
+        accuracy = self.model_performance.get(key, {}).get('accuracy')
+        entry = {}
+        if self.model_registry is not None:
+            bundle = {'model': model, 'feature_cols': self.feature_columns[key]}
+            entry = self.model_registry.save(symbol, timeframe, bundle, df.index, accuracy=accuracy) or {}
+        
+        return {'success': True, 'accuracy': accuracy, 'version': entry.get('version'), 'n_samples': len(X)}
+    
+    def _load_saved_model(self, symbol: str, timeframe: str) -> bool:
+        """Carregar o modelo salvo do símbolo, se houver"""
+        if self.model_registry is None:
+            return False
+        loaded = self.model_registry.load(symbol, timeframe)
+        if loaded is None:
+            return False
+        
+        bundle, entry = loaded
+        key = (symbol, timeframe)
+        self.models[key] = bundle['model']
+        self.feature_columns[key] = bundle['feature_cols']
+        self.model_performance[key] = {'accuracy': entry.get('accuracy')}
+        return True
+    
+    def _train_fast_model(self, X: pd.DataFrame, y: pd.Series, symbol: str, timeframe: str = '1h'):
         """Método de compatibilidade"""
-        return self._train_ultra_fast_model(X, y, symbol)
+        return self._train_ultra_fast_model(X, y, symbol, timeframe)
     
     def _default_prediction(self) -> Dict:
         """Predição padrão quando há falhas"""
@@ -354,9 +376,14 @@ class UltraFastAIEngine:
             'optimized_v4': True
         }
     
-    def prepare_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def prepare_features(self, df: pd.DataFrame, symbol: Optional[str] = None,
+                         timeframe: Optional[str] = None) -> Optional[pd.DataFrame]:
         """Preparar features de forma super rápida"""
-        return self._create_fast_features(df)
+        return self._create_fast_features(df, symbol, timeframe)
+    
+    def get_cache_stats(self) -> Dict:
+        """Acertos, falhas e memória do cache de features/predições"""
+        return self.feature_store.get_stats()
     
     def load_models(self):
         """Método de compatibilidade - models são criados on-demand"""
@@ -364,14 +391,14 @@ class UltraFastAIEngine:
         return True
     
     # Métodos de compatibilidade
-    def optimized_predict_signal(self, df: pd.DataFrame, symbol: str) -> Dict:
+    def optimized_predict_signal(self, df: pd.DataFrame, symbol: str, timeframe: str = '1h') -> Dict:
         """Método de compatibilidade"""
-        return self.ultra_fast_predict(df, symbol)
+        return self.ultra_fast_predict(df, symbol, timeframe)
     
-    def ultra_predict_signal(self, df: pd.DataFrame, symbol: str) -> Dict:
+    def ultra_predict_signal(self, df: pd.DataFrame, symbol: str, timeframe: str = '1h') -> Dict:
         """Método de compatibilidade"""
-        return self.ultra_fast_predict(df, symbol)
+        return self.ultra_fast_predict(df, symbol, timeframe)
     
-    def predict_signal(self, df: pd.DataFrame, symbol: str) -> Dict:
+    def predict_signal(self, df: pd.DataFrame, symbol: str, timeframe: str = '1h') -> Dict:
         """Método de compatibilidade"""
-        return self.ultra_fast_predict(df, symbol)
+        return self.ultra_fast_predict(df, symbol, timeframe)
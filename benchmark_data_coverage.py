@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+⏱️ BENCHMARK - COBERTURA DE DADOS NO COLD START
+Compara a busca sequencial antiga (uma requisição por vez, pausa de 1s a cada
+5 chamadas) com o AsyncOHLCVFetcher, usando um servidor HTTP local que imita
+/api/v3/klines da Binance com latência configurável.
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from src.config import Config
+from src.async_ohlcv_fetcher import AsyncOHLCVFetcher, AIOHTTP_AVAILABLE
+from src.market_data import MarketDataManager
+
+LATENCY_SECONDS = 0.08  # Latência simulada por requisição
+
+
+class StubKlinesHandler(BaseHTTPRequestHandler):
+    """Servidor falso de klines: candles determinísticos por símbolo"""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    used_weight = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/api/v3/klines':
+            self.send_error(404)
+            return
+
+        params = parse_qs(url.query)
+        limit = int(params.get('limit', ['500'])[0])
+        base_price = 100.0 + sum(map(ord, params['symbol'][0]))
+        now_ms = int(time.time() // 60 * 60 * 1000)
+
+        rows = []
+        for i in range(limit):
+            price = base_price + (i % 50) * 0.1
+            rows.append([now_ms - (limit - i) * 60000, str(price), str(price + 1), str(price - 1),
+                         str(price + 0.5), '10.0', now_ms, '0', 0, '0', '0', '0'])
+
+        time.sleep(LATENCY_SECONDS)
+        body = json.dumps(rows).encode()
+
+        with StubKlinesHandler.lock:
+            StubKlinesHandler.used_weight += 5
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-MBX-USED-WEIGHT-1M', str(StubKlinesHandler.used_weight))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubKlinesHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def sequential_coverage(base_url, pairs, timeframes):
+    """Comportamento antigo de expand_data_coverage"""
+    cache = {}
+    for i, symbol in enumerate(pairs):
+        for j, timeframe in enumerate(timeframes):
+            response = requests.get(f"{base_url}/api/v3/klines", timeout=10,
+                                    params={'symbol': symbol.replace('/', ''), 'interval': timeframe,
+                                            'limit': 500})
+            cache[f"{symbol}_{timeframe}"] = response.json()
+            if (i * len(timeframes) + j) % 5 == 0:
+                time.sleep(1)
+    return cache
+
+
+def async_coverage(base_url, pairs, timeframes):
+    """Novo caminho: MarketDataManager.expand_data_coverage com o fetcher assíncrono"""
+    config = Config()
+    config.ALL_CRYPTO_PAIRS = pairs
+    config.ALL_TIMEFRAMES = timeframes
+    config.MARKET_DATA_FETCH['binance_rest_url'] = base_url
+
+    manager = MarketDataManager(config)
+    manager.use_public_apis = True
+    manager.demo_mode = False
+    try:
+        manager.expand_data_coverage()
+        return manager.data_cache, manager.ohlcv_fetcher.stats
+    finally:
+        manager.ohlcv_fetcher.close()
+
+
+def main():
+    print("⏱️ BENCHMARK - COBERTURA DE DADOS NO COLD START")
+    print("=" * 70)
+
+    if not AIOHTTP_AVAILABLE:
+        print("❌ aiohttp não disponível - instale as dependências de requirements.txt")
+        sys.exit(1)
+
+    config = Config()
+    pairs = config.get_all_pairs()
+    timeframes = config.get_all_timeframes()
+    server, base_url = start_stub_server()
+
+    print(f"📊 {len(pairs)} pares x {len(timeframes)} timeframes = {len(pairs) * len(timeframes)} séries")
+    print(f"🌐 Servidor local: {base_url} (latência {LATENCY_SECONDS * 1000:.0f}ms)")
+
+    try:
+        started = time.perf_counter()
+        sequential = sequential_coverage(base_url, pairs, timeframes)
+        sequential_time = time.perf_counter() - started
+        print(f"\n🐢 Sequencial (antigo): {sequential_time:.2f}s - {len(sequential)} séries")
+
+        started = time.perf_counter()
+        cache, stats = async_coverage(base_url, pairs, timeframes)
+        async_time = time.perf_counter() - started
+        print(f"🚀 Assíncrono (novo):   {async_time:.2f}s - {len(cache)} séries")
+        print(f"   Requisições: {stats['requests']} | Erros: {stats['errors']} | "
+              f"Peso usado: {stats['weight_used']}")
+
+        print(f"\n✅ Speedup: {sequential_time / async_time:.1f}x")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+⏱️ BENCHMARK - GRAVAÇÃO DE CANDLES NO SQLITE
+Compara a gravação antiga de save_market_data (iterrows + um INSERT OR
+REPLACE por candle, journal padrão) com a gravação em lote atual
+(executemany + upsert em uma transação, WAL) para 100k candles.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.database import DatabaseManager
+
+TOTAL_CANDLES = 100_000
+CANDLES_PER_FRAME = 500
+
+
+def make_frames():
+    """200 frames de 500 candles (20 pares x 10 timeframes)"""
+    rng = np.random.default_rng(42)
+    frames = []
+    for frame_id in range(TOTAL_CANDLES // CANDLES_PER_FRAME):
+        index = pd.date_range('2024-01-01', periods=CANDLES_PER_FRAME, freq='h', name='timestamp')
+        close = 100 + rng.standard_normal(CANDLES_PER_FRAME).cumsum()
+        frames.append((f"PAIR{frame_id // 10}USDT", f"tf{frame_id % 10}", pd.DataFrame({
+            'open': close + rng.standard_normal(CANDLES_PER_FRAME) * 0.1,
+            'high': close + 1,
+            'low': close - 1,
+            'close': close,
+            'volume': rng.uniform(1000, 10000, CANDLES_PER_FRAME)
+        }, index=index)))
+    return frames
+
+
+def legacy_save_market_data(db_path, symbol, timeframe, df):
+    """Implementação anterior (timestamp convertido para texto: sqlite3 não aceita pd.Timestamp)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        for index, row in df.iterrows():
+            conn.execute('''
+                INSERT OR REPLACE INTO market_data
+                (symbol, timeframe, timestamp, open_price, high_price, low_price, close_price, volume)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                symbol, timeframe, str(index),
+                row['open'], row['high'], row['low'], row['close'], row['volume']
+            ))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def create_legacy_database(db_path):
+    """Banco com o schema atual, mas no journal padrão (DELETE)"""
+    db = DatabaseManager(db_path)
+    with sqlite3.connect(db_path) as conn:
+        db._create_tables(conn)
+
+
+def run(label, save, frames):
+    started = time.perf_counter()
+    for symbol, timeframe, df in frames:
+        save(symbol, timeframe, df)
+    elapsed = time.perf_counter() - started
+    print(f"{label}: {elapsed:.2f}s - {TOTAL_CANDLES / elapsed:,.0f} candles/s")
+    return elapsed
+
+
+def main():
+    print("⏱️ BENCHMARK - GRAVAÇÃO DE CANDLES NO SQLITE")
+    print("=" * 70)
+
+    frames = make_frames()
+    workdir = tempfile.mkdtemp()
+    try:
+        legacy_path = os.path.join(workdir, 'legacy.db')
+        create_legacy_database(legacy_path)
+        legacy = run("🐢 iterrows + INSERT OR REPLACE",
+                     lambda symbol, timeframe, df: legacy_save_market_data(legacy_path, symbol, timeframe, df),
+                     frames)
+
+        db = DatabaseManager(os.path.join(workdir, 'bulk.db'))
+        db.initialize()
+        bulk = run("🚀 executemany + upsert (WAL)  ", db.save_market_data, frames)
+
+        print(f"\n✅ Speedup: {legacy / bulk:.1f}x")
+
+        # Atualização do candle aberto: apenas as últimas linhas de cada série
+        started = time.perf_counter()
+        for symbol, timeframe, df in frames:
+            db.save_market_data(symbol, timeframe, df, last_rows=2)
+        elapsed = time.perf_counter() - started
+        print(f"🔁 Upsert last_rows=2 em {len(frames)} séries: {elapsed * 1000:.0f}ms")
+
+        with sqlite3.connect(legacy_path) as legacy_conn, db.get_connection() as bulk_conn:
+            query = 'SELECT COUNT(*), SUM(close_price) FROM market_data'
+            print(f"📊 Linhas: antigo {legacy_conn.execute(query).fetchone()[0]} | "
+                  f"novo {bulk_conn.execute(query).fetchone()[0]}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+⏱️ BENCHMARK - PAYLOAD DE PREÇOS: price_batch JSON x price_frame COMPACTO
+Simula quadros de 250ms com metade dos símbolos mudando de preço (50 e 400
+símbolos) e mede bytes por quadro e custo de serialização (json.dumps, como
+o Socket.IO faz com o dict, contra PriceFrameEncoder.encode). Confere que o
+decodificador reconstrói exatamente os valores enviados.
+"""
+
+import json
+import random
+import time
+from datetime import datetime
+
+from src.price_wire import PriceFrameEncoder, decode_price_frame
+
+FRAMES = 1000
+
+
+def make_frames(symbol_count):
+    rng = random.Random(42)
+    symbols = [f"COIN{i}USDT" for i in range(symbol_count)]
+    prices = {symbol: round(rng.uniform(0.01, 60000), 2) for symbol in symbols}
+    frames = []
+    for _ in range(FRAMES):
+        timestamp = datetime.now().isoformat()
+        changed = {}
+        for symbol in rng.sample(symbols, symbol_count // 2):
+            prices[symbol] = round(prices[symbol] * (1 + rng.uniform(-0.001, 0.001)), 2) or 0.01
+            changed[symbol] = {'price': prices[symbol], 'change_24h': 0, 'change_percent': 0,
+                               'volume': 0, 'timestamp': timestamp}
+        frames.append((timestamp, changed))
+    return frames
+
+
+def measure(symbol_count):
+    frames = make_frames(symbol_count)
+
+    start = time.perf_counter()
+    json_bytes = sum(len(json.dumps({'timestamp': timestamp, 'prices': changed})) for timestamp, changed in frames)
+    json_time = time.perf_counter() - start
+
+    encoder = PriceFrameEncoder()
+    encoded = []
+    start = time.perf_counter()
+    for _, changed in frames:
+        encoded.append(encoder.encode(changed, time.time() * 1000))
+    compact_time = time.perf_counter() - start
+    compact_bytes = sum(len(frame) for frame, _ in encoded)
+    table_bytes = len(json.dumps({'offset': 0, 'symbols': encoder.symbols}))
+
+    symbols, values, mismatches = [], {}, 0
+    for (frame, new_symbols), (_, changed) in zip(encoded, frames):
+        symbols.extend(new_symbols)
+        prices = decode_price_frame(frame, symbols, values)[3]
+        mismatches += sum(prices[symbol]['price'] != data['price'] for symbol, data in changed.items())
+
+    print(f"\n📊 {symbol_count} símbolos, {symbol_count // 2} alterados por quadro")
+    print(f"{'Formato':<24}{'bytes/quadro':>14}{'µs/quadro':>14}")
+    print(f"{'price_batch (JSON)':<24}{json_bytes / FRAMES:>14,.0f}{json_time / FRAMES * 1e6:>14.1f}")
+    print(f"{'price_frame (binário)':<24}{compact_bytes / FRAMES:>14,.0f}{compact_time / FRAMES * 1e6:>14.1f}")
+    print(f"Tabela de símbolos (uma vez por assinatura): {table_bytes:,} bytes")
+    print(f"Quadro-chave: {len(encoder.keyframe()):,} bytes")
+    print(f"⚡ {json_bytes / compact_bytes:.1f}x menos bytes; "
+          f"codificação em {compact_time / json_time:.2f}x o tempo do json.dumps")
+    return mismatches
+
+
+def main():
+    print("⏱️ BENCHMARK - PAYLOAD DE PREÇOS")
+    print("=" * 64)
+    mismatches = measure(50) + measure(400)
+    print("=" * 64)
+    print(f"{'✅' if not mismatches else '❌'} Preços decodificados divergentes: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+⏱️ BENCHMARK - KERNELS DE JANELA MÓVEL
+Compara os rolling(...).apply(lambda ...) antigos (uma Series por janela) com
+os kernels de src/rolling_kernels.py, por frame de 500 e 1000 candles, e
+confere a diferença máxima entre os resultados.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.rolling_kernels import (rolling_endpoint_trend, rolling_lag1_autocorr,
+                                 rolling_rank_pct, rolling_slope)
+
+REPEATS = 20
+
+
+def make_series(n, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.Series(100 + rng.standard_normal(n).cumsum(),
+                     index=pd.date_range('2024-01-01', periods=n, freq='h'))
+
+
+def legacy_endpoint_trend(series):
+    return series.rolling(10).apply(lambda x: 1 if x.iloc[-1] > x.iloc[0] else -1, raw=False)
+
+
+def legacy_autocorr(series):
+    return series.rolling(50).apply(lambda x: x.autocorr(lag=1) if len(x) > 1 else 0, raw=False)
+
+
+def legacy_slope(series):
+    return series.rolling(20).apply(lambda x: np.polyfit(np.arange(len(x)), x, 1)[0], raw=True)
+
+
+def legacy_rank(series):
+    return series.rolling(50).rank(pct=True)
+
+
+CASES = [
+    ("Tendência nas extremidades (10)", legacy_endpoint_trend, lambda s: rolling_endpoint_trend(s, 10)),
+    ("Autocorrelação lag 1 (50)     ", legacy_autocorr, lambda s: rolling_lag1_autocorr(s, 50)),
+    ("Slope linear (20)             ", legacy_slope, lambda s: rolling_slope(s, 20)),
+    ("Rank percentual (50)          ", legacy_rank, lambda s: rolling_rank_pct(s, 50)),
+]
+
+
+def per_frame_ms(function, series):
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        result = function(series)
+    return (time.perf_counter() - started) / REPEATS * 1000, np.asarray(result, dtype=float)
+
+
+def main():
+    print("⏱️ BENCHMARK - KERNELS DE JANELA MÓVEL")
+    print("=" * 70)
+
+    for size in (500, 1000):
+        series = make_series(size)
+        print(f"\n📊 Frame de {size} candles (média de {REPEATS} execuções)")
+        for label, legacy, kernel in CASES:
+            legacy_ms, expected = per_frame_ms(legacy, series)
+            kernel_ms, result = per_frame_ms(kernel, series)
+            max_diff = np.nanmax(np.abs(expected - result))
+            print(f"   {label}: {legacy_ms:8.2f}ms -> {kernel_ms:6.3f}ms "
+                  f"({legacy_ms / kernel_ms:6.0f}x) | diferença máx {max_diff:.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -161,7 +161,11 @@ except Exception as e:
 
 # Inicializar sistema de notificações em tempo real
 from src.realtime_updates import RealTimeUpdates
-realtime_updates = RealTimeUpdates(socketio)
+price_feed_settings = getattr(config, 'REALTIME_PRICE_FEED', None) or {}
+realtime_updates = RealTimeUpdates(
+    socketio, price_frame_interval=price_feed_settings.get('broadcast_frame_ms', 250) / 1000,
+    compact_payloads=price_feed_settings.get('compact_payloads', True))
+realtime_updates.setup_events()
 
 signal_generator = SignalGenerator(ai_engine, market_data)
 paper_trading = PaperTradingManager(market_data, realtime_updates)
@@ -177,17 +181,8 @@ logger.info("✅ Componentes essenciais inicializados - sem data feed automátic
 def price_update_callback(symbol: str, price: float):
     """Callback para conectar preços em tempo real ao WebSocket"""
     try:
-        # Preparar dados de preço para broadcast
-        price_data = {
-            'price': price,
-            'change_24h': 0,  # Pode ser expandido futuramente
-            'change_percent': 0,
-            'volume': 0,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        # Transmitir via WebSocket para todos os clientes conectados
-        realtime_updates.broadcast_price_update(symbol, price_data)
+        # Ticks do mesmo quadro são agrupados em um único price_batch
+        realtime_updates.publish_price(symbol, price)
         
     except Exception as e:
         logger.error(f"❌ Erro no callback de preços: {e}")
@@ -195,6 +190,11 @@ def price_update_callback(symbol: str, price: float):
 # Adicionar callback ao sistema de preços em tempo real
 realtime_price_api.add_callback(price_update_callback)
 
+# Backup REST só para pares configurados, trades abertos e símbolos assinados
+realtime_price_api.configure(config)
+realtime_updates.add_subscription_listener(
+    lambda symbols: realtime_price_api.set_watch_symbols('clients', symbols))
+
 # Iniciar sistema de preços em tempo real
 realtime_price_api.start()
 
@@ -215,12 +215,18 @@ class SimpleTradingBot:
         market_data.start_data_feed()
         ai_engine.load_models()
         
+        # Pré-treino opcional dos modelos ultra em segundo plano (a API nunca treina na requisição)
+        ultra_settings = getattr(config, 'ULTRA_MODEL_REGISTRY', None) or {}
+        if hasattr(ai_engine, 'pretrain_ultra_models') and ultra_settings.get('pretrain_on_startup', False):
+            ai_engine.pretrain_ultra_models(market_data)
+        
         # Configurar eventos do WebSocket        realtime_updates.setup_events()
         
         # Garantir que o sistema de preços em tempo real esteja ativo
         if not realtime_price_api.running:
             realtime_price_api.start()
             logger.info("OK Sistema de precos em tempo real iniciado")
+        sync_active_trade_symbols()
         
         logger.info("OK Trading Bot AI iniciado com sucesso!")
         
@@ -252,6 +258,7 @@ def sync_active_trade_symbols():
     try:
         # Obter trades ativos do paper trading
         active_trades = paper_trading.get_active_trades()
+        realtime_price_api.set_watch_symbols('trades', [trade.get('symbol') for trade in active_trades or []])
         
         if active_trades:
             # Extrair símbolos únicos dos trades ativos
@@ -529,10 +536,12 @@ def api_generate_signals_all_pairs():
     try:
         data = request.get_json() or {}
         timeframe = data.get('timeframe', '1h')
+        timeframes = data.get('timeframes') or [timeframe]
         
-        logger.info(f"🔄 Gerando sinais para todos os pares (timeframe: {timeframe})")
-          # Gerar sinais para todos os pares
-        signals = signal_generator.generate_signals_for_all_pairs()
+        logger.info(f"🔄 Gerando sinais para todos os pares (timeframes: {timeframes})")
+          # Gerar sinais para todos os pares (varredura concorrente)
+        signals = signal_generator.generate_signals_for_all_pairs(timeframes)
+        scan_report = signal_generator.last_scan_report
           # DEBUG: Não converter HOLD para permitir sinais balanceados
         # converted_signals = []
         # for signal in signals:
@@ -571,7 +580,10 @@ def api_generate_signals_all_pairs():
             'message': f'{len(signals_data)} sinais gerados para múltiplos ativos',
             'signals': signals_data,
             'total_pairs_analyzed': len(config.get_all_pairs()),
-            'signals_generated': len(signals_data)
+            'signals_generated': len(signals_data),
+            'timed_out_pairs': scan_report.get('timed_out', []),
+            'failed_pairs': scan_report.get('failed', []),
+            'scan_duration_seconds': scan_report.get('duration_seconds')
         })
         
     except Exception as e:
@@ -903,16 +915,7 @@ def api_debug_force_signal():
 
 # ==================== WEBSOCKET EVENTS ====================
 
-@socketio.on('connect')
-def handle_connect():
-    """Cliente conectou"""
-    logger.info("🔗 Cliente WebSocket conectado")
-    emit('status', {'message': 'Conectado ao Trading Bot AI'})
-
-@socketio.on('disconnect')
-def handle_disconnect():
-    """Cliente desconectou"""
-    logger.info("🔌 Cliente WebSocket desconectado")
+# connect/disconnect e subscrições de preços: RealTimeUpdates.setup_events
 
 @socketio.on('request_status')
 def handle_status_request():
@@ -1058,6 +1061,25 @@ def api_stop_realtime():
             'error': str(e)
         }), 500
 
+@app.route('/api/realtime/stats')
+def api_realtime_stats():
+    """API com os contadores do feed de preços em tempo real"""
+    try:
+        return jsonify({
+            'success': True,
+            'running': realtime_price_api.running,
+            'watch_symbols': sorted(realtime_price_api.get_watch_symbols()),
+            'stats': realtime_price_api.get_stats(),
+            'broadcast': realtime_updates.get_price_stats()
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao obter estatísticas do feed de preços: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/realtime/sync-symbols', methods=['POST'])
 def api_sync_realtime_symbols():
     """API para sincronizar símbolos de trades ativos com sistema de preços"""
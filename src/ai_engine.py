@@ -36,6 +36,9 @@ from .technical_indicators import TechnicalIndicators
 from .lstm_temporal_engine import LSTMTimeSeriesAnalyzer
 from .market_regime import MarketRegimeDetector
 from .cross_correlation import CrossCorrelationAnalyzer
+from .feature_store import get_feature_store
+from .lstm_registry import get_lstm_registry
+from .dtype_policy import get_dtype_policy
 
 logger = logging.getLogger(__name__)
 
@@ -49,15 +52,28 @@ class AITradingEngine:
         self.feature_selectors = {}
         self.technical_indicators = TechnicalIndicators(config)
         self.lstm_analyzer = LSTMTimeSeriesAnalyzer(config)  # MELHORIA 4: Analisador LSTM
-        self.regime_detector = MarketRegimeDetector()  # MELHORIA 6: Detector de regime
+        self.regime_detector = MarketRegimeDetector(config)  # MELHORIA 6: Detector de regime
         self.correlation_analyzer = CrossCorrelationAnalyzer()  # MELHORIA 7: Analisador de correlação
+        self.feature_store = get_feature_store(config)
+        self.lstm_registry = get_lstm_registry(config)
+        self.dtype_policy = get_dtype_policy(config)
         self.is_trained = False
         
-    def prepare_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Preparar features para o modelo de IA"""
+    def prepare_features(self, df: pd.DataFrame, symbol: Optional[str] = None,
+                         timeframe: Optional[str] = None) -> pd.DataFrame:
+        """Preparar features para o modelo de IA
+
+        symbol/timeframe são opcionais e permitem reaproveitar os indicadores
+        já calculados para a série (feature store + cálculo incremental).
+        """
         try:
             # Calcular indicadores técnicos
-            df = self.technical_indicators.calculate_all_indicators(df)
+            if symbol and timeframe:
+                df = self.feature_store.get_or_compute(
+                    symbol, timeframe, df, 'indicators',
+                    lambda data: self.technical_indicators.calculate_all_indicators(data, symbol, timeframe))
+            else:
+                df = self.technical_indicators.calculate_all_indicators(df)
             
             # Adicionar features de preço
             df = self._add_price_features(df)
@@ -78,30 +94,20 @@ class AITradingEngine:
             df = self._add_pattern_features(df)
             
             # MELHORIA 6: Adicionar features de regime de mercado
-            df = self._add_regime_features(df)
+            df = self._add_regime_features(df, symbol, timeframe)
             
             # MELHORIA 7: Adicionar features de correlação cruzada
             df = self._add_correlation_features(df)
             
-            # Tratar valores NaN - usar forward fill seguido de backward fill
-            # e depois preencher valores restantes com a mediana
-            numeric_columns = df.select_dtypes(include=[np.number]).columns
-            for col in numeric_columns:
-                # Forward fill (corrigido para evitar FutureWarning)
-                df[col] = df[col].ffill()
-                # Backward fill para valores ainda NaN no início
-                df[col] = df[col].bfill()
-                # Se ainda houver NaN, preencher com mediana
-                if df[col].isna().any():
-                    df[col] = df[col].fillna(df[col].median())
-                # Se mediana for NaN (coluna vazia), preencher com 0
-                if df[col].isna().any():
-                    df[col] = df[col].fillna(0)
+            # Tratar valores NaN (forward fill, backward fill e 0 para colunas vazias)
+            # em uma passada sobre o bloco float; o frame final sai consolidado
+            df = self._fill_missing_values(df)
             
-            logger.info(f"Features preparadas: {len(df.columns)} colunas, {len(df)} linhas")
+            # float32, flags int8 e rótulos categóricos (config DTYPE_POLICY)
+            if self.dtype_policy is not None:
+                df = self.dtype_policy.apply(df)
             
-            # Otimizar DataFrame para reduzir fragmentação
-            df = self._optimize_dataframe(df)
+            logger.info(f"Features preparadas: {len(df.columns)} colunas, {len(df)} linhas")
             
             return df
             
@@ -132,87 +138,103 @@ class AITradingEngine:
         new_features['price_position'] = (df['close'] - df['low']) / (df['high'] - df['low'])
         
         # Concatenar todas as features de uma vez
-        new_df = pd.concat([df] + [pd.Series(data, name=name, index=df.index) 
-                                  for name, data in new_features.items()], axis=1)
-        
-        return new_df
+        return concat_features_optimized(df, new_features)
     
     def _add_volume_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Adicionar features baseadas em volume"""
+        new_features = {}
+        
         # Volume normalizado
-        df['volume_norm'] = df['volume'] / df['volume'].rolling(20).mean()
+        volume_norm = df['volume'] / df['volume'].rolling(20).mean()
+        new_features['volume_norm'] = volume_norm
         
         # Price-Volume trend
-        df['pv_trend'] = df['close'].pct_change() * df['volume_norm']
+        new_features['pv_trend'] = df['close'].pct_change() * volume_norm
         
         # Volume momentum
         for period in [5, 10, 20]:
-            df[f'volume_momentum_{period}'] = df['volume'].pct_change(period)
+            new_features[f'volume_momentum_{period}'] = df['volume'].pct_change(period)
         
-        return df
+        return concat_features_optimized(df, new_features)
     
     def _add_volatility_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Adicionar features de volatilidade"""
+        new_features = {}
+        
         # Volatilidade realizada
+        returns = df['close'].pct_change()
         for period in [5, 10, 20]:
-            df[f'volatility_{period}'] = df['close'].pct_change().rolling(period).std()
+            new_features[f'volatility_{period}'] = returns.rolling(period).std()
         
         # True Range
-        df['true_range'] = np.maximum(
+        previous_close = df['close'].shift(1)
+        new_features['true_range'] = np.maximum(
             df['high'] - df['low'],
             np.maximum(
-                abs(df['high'] - df['close'].shift(1)),
-                abs(df['low'] - df['close'].shift(1))
+                abs(df['high'] - previous_close),
+                abs(df['low'] - previous_close)
             )
         )
         
         # Volatility ratio
-        df['volatility_ratio'] = df['volatility_5'] / df['volatility_20']
+        new_features['volatility_ratio'] = new_features['volatility_5'] / new_features['volatility_20']
         
-        return df
+        return concat_features_optimized(df, new_features)
     
     def _add_temporal_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Adicionar features temporais"""
         if df.index.dtype == 'datetime64[ns]':
-            df['hour'] = df.index.hour
-            df['day_of_week'] = df.index.dayofweek
-            df['month'] = df.index.month
-            
-            # Sessões de trading
-            df['asian_session'] = ((df['hour'] >= 0) & (df['hour'] < 8)).astype(int)
-            df['european_session'] = ((df['hour'] >= 8) & (df['hour'] < 16)).astype(int)
-            df['american_session'] = ((df['hour'] >= 16) & (df['hour'] < 24)).astype(int)
+            hour = df.index.hour
+            new_features = {
+                'hour': hour,
+                'day_of_week': df.index.dayofweek,
+                'month': df.index.month,
+                
+                # Sessões de trading
+                'asian_session': ((hour >= 0) & (hour < 8)).astype(int),
+                'european_session': ((hour >= 8) & (hour < 16)).astype(int),
+                'american_session': ((hour >= 16) & (hour < 24)).astype(int),
+            }
+            df = concat_features_optimized(df, new_features)
         
         return df
     
     def _add_momentum_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Adicionar features de momentum"""
+        new_features = {}
+        
         # Rate of Change para diferentes períodos
         for period in [5, 10, 20]:
-            df[f'roc_{period}'] = ((df['close'] - df['close'].shift(period)) / df['close'].shift(period)) * 100
+            new_features[f'roc_{period}'] = ((df['close'] - df['close'].shift(period)) / df['close'].shift(period)) * 100
         
         # Momentum
         for period in [5, 10, 20]:
-            df[f'momentum_{period}'] = df['close'] - df['close'].shift(period)
-          # Acceleration
-        df['acceleration'] = df['momentum_5'] - df['momentum_5'].shift(1)
+            new_features[f'momentum_{period}'] = df['close'] - df['close'].shift(period)
         
-        return df
+        # Acceleration
+        new_features['acceleration'] = new_features['momentum_5'] - new_features['momentum_5'].shift(1)
+        
+        return concat_features_optimized(df, new_features)
     
     def _add_pattern_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Adicionar features de padrões"""
+        new_features = {}
+        previous_close = df['close'].shift(1)
+        
         # Sequências de alta/baixa
-        df['up_days'] = (df['close'] > df['close'].shift(1)).astype(int)
-        df['down_days'] = (df['close'] < df['close'].shift(1)).astype(int)
+        up_days = (df['close'] > previous_close).astype(int)
+        down_days = (df['close'] < previous_close).astype(int)
+        new_features['up_days'] = up_days
+        new_features['down_days'] = down_days
         
         # Contagem de dias consecutivos
-        df['consecutive_up'] = df['up_days'].groupby((df['up_days'] != df['up_days'].shift()).cumsum()).cumsum()
-        df['consecutive_down'] = df['down_days'].groupby((df['down_days'] != df['down_days'].shift()).cumsum()).cumsum()
+        new_features['consecutive_up'] = up_days.groupby((up_days != up_days.shift()).cumsum()).cumsum()
+        new_features['consecutive_down'] = down_days.groupby((down_days != down_days.shift()).cumsum()).cumsum()
         
         # Gap analysis
-        df['gap_up'] = (df['open'] > df['close'].shift(1)).astype(int)
-        df['gap_down'] = (df['open'] < df['close'].shift(1)).astype(int)
-        df['gap_size'] = abs(df['open'] - df['close'].shift(1)) / df['close'].shift(1)
+        new_features['gap_up'] = (df['open'] > previous_close).astype(int)
+        new_features['gap_down'] = (df['open'] < previous_close).astype(int)
+        new_features['gap_size'] = abs(df['open'] - previous_close) / previous_close
         
         # === MELHORIAS: PADRÕES DE CANDLESTICK ===
         
@@ -224,87 +246,82 @@ class AITradingEngine:
         ]
         
         # Adicionar features de padrões se existirem
+        volume_ratio = df['volume'] / df['volume'].rolling(window=20).mean() if 'volume' in df.columns else None
         for pattern in pattern_columns:
             if pattern in df.columns:
                 # Padrão atual
-                df[f'{pattern}_current'] = df[pattern]
+                new_features[f'{pattern}_current'] = df[pattern]
                 
                 # Padrões recentes (últimos 3 períodos)
-                df[f'{pattern}_recent'] = df[pattern].rolling(window=3).sum()
+                new_features[f'{pattern}_recent'] = df[pattern].rolling(window=3).sum()
                 
                 # Força do padrão (baseado em volume se disponível)
-                if 'volume' in df.columns:
-                    volume_avg = df['volume'].rolling(window=20).mean()
-                    df[f'{pattern}_strength'] = df[pattern] * (df['volume'] / volume_avg)
+                if volume_ratio is not None:
+                    new_features[f'{pattern}_strength'] = df[pattern] * volume_ratio
                 else:
-                    df[f'{pattern}_strength'] = df[pattern]
+                    new_features[f'{pattern}_strength'] = df[pattern]
         
         # Features de scores consolidados
-        if 'bullish_patterns_score' in df.columns:
-            df['bullish_score_current'] = df['bullish_patterns_score']
-            df['bullish_score_momentum'] = df['bullish_patterns_score'].diff()
-            df['bullish_score_sma'] = df['bullish_patterns_score'].rolling(window=5).mean()
-        
-        if 'bearish_patterns_score' in df.columns:
-            df['bearish_score_current'] = df['bearish_patterns_score']
-            df['bearish_score_momentum'] = df['bearish_patterns_score'].diff()
-            df['bearish_score_sma'] = df['bearish_patterns_score'].rolling(window=5).mean()
-        
-        if 'reversal_patterns_score' in df.columns:
-            df['reversal_score_current'] = df['reversal_patterns_score']
-            df['reversal_score_momentum'] = df['reversal_patterns_score'].diff()
-            df['reversal_score_sma'] = df['reversal_patterns_score'].rolling(window=5).mean()
+        for score, prefix in (('bullish_patterns_score', 'bullish'), ('bearish_patterns_score', 'bearish'),
+                              ('reversal_patterns_score', 'reversal')):
+            if score in df.columns:
+                new_features[f'{prefix}_score_current'] = df[score]
+                new_features[f'{prefix}_score_momentum'] = df[score].diff()
+                new_features[f'{prefix}_score_sma'] = df[score].rolling(window=5).mean()
         
         # Features combinadas
+        pattern_balance = None
         if 'bullish_patterns_score' in df.columns and 'bearish_patterns_score' in df.columns:
             # Saldo líquido de padrões
-            df['pattern_balance'] = df['bullish_patterns_score'] - df['bearish_patterns_score']
+            pattern_balance = df['bullish_patterns_score'] - df['bearish_patterns_score']
+            new_features['pattern_balance'] = pattern_balance
             
             # Dominância de padrões
             total_patterns = df['bullish_patterns_score'] + df['bearish_patterns_score'] + df.get('reversal_patterns_score', 0)
-            df['bullish_dominance'] = df['bullish_patterns_score'] / (total_patterns + 0.001)  # Evitar divisão por zero
-            df['bearish_dominance'] = df['bearish_patterns_score'] / (total_patterns + 0.001)
+            new_features['bullish_dominance'] = df['bullish_patterns_score'] / (total_patterns + 0.001)  # Evitar divisão por zero
+            new_features['bearish_dominance'] = df['bearish_patterns_score'] / (total_patterns + 0.001)
             
             # Intensidade total de padrões
-            df['pattern_intensity'] = total_patterns
+            new_features['pattern_intensity'] = total_patterns
         
         # Features de contexto de mercado baseadas em padrões
-        if 'pattern_balance' in df.columns:
+        if pattern_balance is not None:
             # Tendência de padrões
-            df['pattern_trend'] = df['pattern_balance'].rolling(window=5).mean()
+            new_features['pattern_trend'] = pattern_balance.rolling(window=5).mean()
             
             # Mudança de momentum de padrões
-            df['pattern_momentum_change'] = df['pattern_balance'].diff()
+            new_features['pattern_momentum_change'] = pattern_balance.diff()
             
             # Divergência de padrões (quando padrões contradizem preço)
             price_momentum = df['close'].pct_change(periods=3)
-            df['pattern_price_divergence'] = (
-                (df['pattern_balance'] > 0) & (price_momentum < 0) |
-                (df['pattern_balance'] < 0) & (price_momentum > 0)
+            new_features['pattern_price_divergence'] = (
+                (pattern_balance > 0) & (price_momentum < 0) |
+                (pattern_balance < 0) & (price_momentum > 0)
             ).astype(int)
         
         # Features de força de reversão
         if 'reversal_patterns_score' in df.columns and 'volatility_5' in df.columns:
             # Força de indecisão ponderada pela volatilidade
-            df['reversal_strength'] = df['reversal_patterns_score'] * df['volatility_5']
+            new_features['reversal_strength'] = df['reversal_patterns_score'] * df['volatility_5']
             
             # Sinal de mudança iminente
-            df['reversal_warning'] = (
+            new_features['reversal_warning'] = (
                 (df['reversal_patterns_score'] > 0.3) & 
                 (df['volatility_5'] > df['volatility_5'].rolling(10).mean())
             ).astype(int)
         
         logger.info("✅ Features de padrões de candlestick adicionadas ao modelo de IA")
         
-        return df
+        return concat_features_optimized(df, new_features)
     
-    def _add_regime_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _add_regime_features(self, df: pd.DataFrame, symbol: Optional[str] = None,
+                             timeframe: Optional[str] = None) -> pd.DataFrame:
         """MELHORIA 6: Adicionar features de regime de mercado"""
         try:
             logger.info("🏛️ Adicionando features de regime de mercado...")
             
             # Aplicar detecção de regimes de mercado
-            df = self.regime_detector.detect_market_regimes(df)
+            df = self.regime_detector.detect_market_regimes(df, symbol, timeframe)
             
             # === FEATURES DE REGIME CONSOLIDADAS ===
               # Scores numéricos dos regimes
@@ -648,12 +665,12 @@ class AITradingEngine:
             logger.error(f"Erro ao adicionar features temporais LSTM: {e}")
             return df
 
-    def train_lstm_model(self, df: pd.DataFrame, symbol: str) -> Dict:
+    def train_lstm_model(self, df: pd.DataFrame, symbol: str, timeframe: str = '1h') -> Dict:
         """Treinar modelo LSTM para previsão de séries temporais"""
         try:
             from .lstm_engine import SimpleLSTM
             
-            logger.info(f"🧠 Iniciando treinamento LSTM para {symbol}")
+            logger.info(f"🧠 Iniciando treinamento LSTM para {symbol} {timeframe}")
             
             # Preparar dados de preço
             price_data = df['close'].values
@@ -667,16 +684,30 @@ class AITradingEngine:
             train_data = price_data[:train_size]
             test_data = price_data[train_size:]
             
-            # Criar e treinar modelo LSTM
-            lstm_model = SimpleLSTM(
-                input_size=1,
-                hidden_size=50,
-                num_layers=1,
-                sequence_length=60
-            )
+            # Reaproveitar o modelo salvo enquanto os dados não avançarem além do limite
+            saved = None
+            if self.lstm_registry is not None:
+                saved = self.lstm_registry.get_fresh('price', symbol, timeframe, df.index,
+                                                     SimpleLSTM.from_weights)
             
-            # Treinar modelo
-            lstm_model.fit(train_data, epochs=50, learning_rate=0.001)
+            if saved is not None:
+                lstm_model = saved[0]
+                logger.info(f"♻️ Modelo LSTM reaproveitado para {symbol}")
+            else:
+                # Criar e treinar modelo LSTM
+                lstm_model = SimpleLSTM(
+                    input_size=1,
+                    hidden_size=50,
+                    num_layers=1,
+                    sequence_length=60
+                )
+                
+                # Treinar modelo
+                lstm_model.fit(train_data, epochs=50, learning_rate=0.001)
+                
+                if lstm_model.is_fitted and self.lstm_registry is not None:
+                    self.lstm_registry.save('price', symbol, timeframe, lstm_model, df.index,
+                                            train_rows=train_size)
             
             # Avaliar modelo
             evaluation = lstm_model.evaluate(test_data)
@@ -685,7 +716,7 @@ class AITradingEngine:
             predictions = lstm_model.predict(price_data, steps_ahead=5)
             
             # Salvar modelo
-            model_key = f'lstm_{symbol}'
+            model_key = f'lstm_{symbol}_{timeframe}'
             self.models[model_key] = lstm_model
             
             logger.info(f"✅ LSTM treinado para {symbol}: Accuracy={evaluation['directional_accuracy']:.3f}")
@@ -703,13 +734,21 @@ class AITradingEngine:
             logger.error(f"❌ Erro no treinamento LSTM: {e}")
             return {'model': None, 'accuracy': 0, 'predictions': None}
 
-    def predict_with_lstm(self, df: pd.DataFrame, symbol: str, steps_ahead: int = 1) -> np.ndarray:
-        """Fazer previsões usando modelo LSTM"""
+    def predict_with_lstm(self, df: pd.DataFrame, symbol: str, steps_ahead: int = 1,
+                          timeframe: str = '1h') -> np.ndarray:
+        """Fazer previsões usando o modelo LSTM treinado no timeframe de df"""
         try:
-            model_key = f'lstm_{symbol}'
+            model_key = f'lstm_{symbol}_{timeframe}'
+            
+            if self.models.get(model_key) is None and self.lstm_registry is not None:
+                # Modelo treinado em execução anterior (carregado na primeira vez)
+                from .lstm_engine import SimpleLSTM
+                saved_model = self.lstm_registry.load('price', symbol, timeframe, SimpleLSTM.from_weights)
+                if saved_model is not None:
+                    self.models[model_key] = saved_model
             
             if model_key not in self.models or self.models[model_key] is None:
-                logger.warning(f"❌ Modelo LSTM não encontrado para {symbol}")
+                logger.warning(f"❌ Modelo LSTM não encontrado para {symbol} {timeframe}")
                 return np.array([])
             
             lstm_model = self.models[model_key]
@@ -725,11 +764,11 @@ class AITradingEngine:
             logger.error(f"❌ Erro na previsão LSTM: {e}")
             return np.array([])
 
-    def get_lstm_signal(self, df: pd.DataFrame, symbol: str) -> Dict:
+    def get_lstm_signal(self, df: pd.DataFrame, symbol: str, timeframe: str = '1h') -> Dict:
         """Gerar sinal de trading baseado em LSTM"""
         try:
             # Fazer previsão LSTM
-            predictions = self.predict_with_lstm(df, symbol, steps_ahead=3)
+            predictions = self.predict_with_lstm(df, symbol, steps_ahead=3, timeframe=timeframe)
             
             if len(predictions) == 0:
                 return {'signal': 0, 'confidence': 0.0, 'price_target': None}
@@ -1260,16 +1299,61 @@ class AITradingEngine:
                 'ai_features': 0
             }
     
-    def _optimize_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Otimizar DataFrame para reduzir fragmentação"""
+    def _fill_missing_values(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Forward fill, backward fill e 0 para colunas sem nenhum valor, aplicados
+        de uma vez a cada bloco de colunas float (colunas inteiras não têm NaN).
+        Com nomes de coluna únicos o resultado é montado já consolidado.
+        """
         try:
-            # Copiar DataFrame para desfragmentar
-            df_optimized = df.copy()
-            logger.info(f"DataFrame otimizado: {len(df_optimized.columns)} colunas")
-            return df_optimized
+            dtypes = list(df.dtypes)
+            repaired = {}
+            for dtype in {dtype for dtype in dtypes if dtype.kind == 'f'}:
+                positions = [position for position, col_dtype in enumerate(dtypes) if col_dtype == dtype]
+                values = fill_missing_block(df.iloc[:, positions].to_numpy(dtype=dtype))
+                repaired.update((position, values[:, i]) for i, position in enumerate(positions))
+            
+            if not df.columns.is_unique:
+                for position, values in repaired.items():
+                    df.isetitem(position, values)
+                return df
+            
+            return pd.DataFrame({col: repaired[position] if position in repaired else df[col]
+                                 for position, col in enumerate(df.columns)}, index=df.index)
         except Exception as e:
-            logger.error(f"Erro na otimização do DataFrame: {e}")
+            logger.error(f"Erro ao tratar valores NaN: {e}")
             return df
+
+
+def fill_missing_block(values: np.ndarray) -> np.ndarray:
+    """
+    Forward fill, backward fill e 0 por coluna de uma matriz 2D (modificada
+    no lugar); equivale a ffill().bfill().fillna(0) em cada coluna
+    """
+    missing = np.isnan(values)
+    columns = np.flatnonzero(missing.any(axis=0))
+    if len(columns) == 0:
+        return values
+    
+    block = values[:, columns]
+    missing = missing[:, columns]
+    rows = np.arange(len(block))[:, None]
+    
+    # Forward fill: índice da última linha válida até cada posição
+    last_valid = np.where(missing, 0, rows)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    block = np.take_along_axis(block, last_valid, axis=0)
+    
+    # Backward fill do trecho inicial com o primeiro valor válido
+    first_valid = np.argmax(~missing, axis=0)
+    block = np.where(rows < first_valid, block[first_valid, np.arange(len(columns))], block)
+    
+    # Colunas sem nenhum valor válido
+    block[np.isnan(block)] = 0
+    values[:, columns] = block
+    return values
+
+
 def concat_features_optimized(df, new_features_dict):
     """
     Função otimizada para adicionar múltiplas features ao DataFrame
@@ -1288,11 +1372,19 @@ def concat_features_optimized(df, new_features_dict):
     try:
         import pandas as pd
         
+        # Colunas já existentes são substituídas, como em df[col] = valor
+        existing = [name for name in new_features_dict if name in df.columns]
+        for name in existing:
+            df[name] = new_features_dict[name]
+        if len(existing) == len(new_features_dict):
+            return df
+        
         # Criar DataFrame com as novas features
-        new_features_df = pd.DataFrame(new_features_dict, index=df.index)
+        new_features_df = pd.DataFrame({name: values for name, values in new_features_dict.items()
+                                        if name not in df.columns}, index=df.index)
         
         # Concatenar uma única vez
-        result_df = pd.concat([df, new_features_df], axis=1)
+        result_df = pd.concat([df, new_features_df], axis=1, copy=False)
         
         return result_df
         
@@ -1303,4 +1395,3 @@ def concat_features_optimized(df, new_features_dict):
         for col_name, col_data in new_features_dict.items():
             result_df[col_name] = col_data
         return result_df
-
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Busca assíncrona de candles (OHLCV) na API REST pública da Binance
+
+Uma única sessão HTTP com keep-alive, rodando em um event loop dedicado, é
+compartilhada por todas as threads do bot. As requisições são enviadas em
+paralelo (limitadas por max_concurrency) e controladas por um token bucket
+baseado no orçamento de peso por minuto da exchange, em vez de pausas fixas.
+"""
+
+import asyncio
+import concurrent.futures
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+
+import logging
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+MAX_KLINES_LIMIT = 1000  # Máximo de candles por requisição de /klines
+MAX_ATTEMPTS = 3         # Tentativas por requisição em rate limit (418/429)
+
+
+def klines_request_weight(limit: int) -> int:
+    """Peso de /api/v3/klines segundo a tabela da Binance"""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def klines_to_dataframe(rows: List[list]) -> pd.DataFrame:
+    """Converter a resposta de /klines no formato usado pelo data_cache"""
+    df = pd.DataFrame([row[:6] for row in rows], columns=['timestamp'] + OHLCV_COLUMNS)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df.set_index('timestamp', inplace=True)
+    return df.astype('float64')
+
+
+class WeightTokenBucket:
+    """
+    Token bucket assíncrono medido em peso de requisição.
+
+    A capacidade é o orçamento de peso por minuto e a recarga é contínua
+    (capacidade / 60 por segundo). O peso reportado pela exchange no header
+    de resposta sincroniza o saldo local quando outro cliente também consome.
+    """
+
+    def __init__(self, weight_per_minute: int):
+        self.capacity = float(weight_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, weight: int):
+        """Aguardar até haver saldo para a requisição e consumi-lo"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            self._refill()
+            if self.tokens < weight:
+                await asyncio.sleep((weight - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= weight
+
+    def sync_used_weight(self, used_weight: int):
+        """Ajustar o saldo ao peso já usado informado pela exchange"""
+        self._refill()
+        self.tokens = min(self.tokens, self.capacity - used_weight)
+
+
+class AsyncOHLCVFetcher:
+    """Cliente assíncrono de klines com sessão compartilhada e rate limit por peso"""
+
+    def __init__(self, base_url: str = 'https://api.binance.com', max_concurrency: int = 10,
+                 weight_limit_per_minute: int = 6000, request_timeout: float = 10,
+                 max_retry_after: float = 5):
+        self.base_url = base_url.rstrip('/')
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        # Retry-After maior que isso (ban de IP) falha na hora em vez de segurar o chamador
+        self.max_retry_after = max_retry_after
+        self._blocked_until = 0.0  # time.monotonic() até o fim do último Retry-After longo
+        self.bucket = WeightTokenBucket(weight_limit_per_minute)
+        self.stats = {'requests': 0, 'errors': 0, 'rate_limited': 0, 'weight_used': 0}
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._start_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> 'AsyncOHLCVFetcher':
+        settings = getattr(config, 'MARKET_DATA_FETCH', None) or {}
+        return cls(
+            base_url=settings.get('binance_rest_url', 'https://api.binance.com'),
+            max_concurrency=settings.get('max_concurrency', 10),
+            weight_limit_per_minute=settings.get('weight_limit_per_minute', 6000),
+            request_timeout=settings.get('request_timeout', 10),
+            max_retry_after=settings.get('max_retry_after', 5),
+        )
+
+    # === API síncrona (threads do bot) ===
+
+    def fetch_klines_sync(self, symbol: str, timeframe: str, limit: int = 500,
+                          start_time: Optional[int] = None) -> pd.DataFrame:
+        """Buscar os candles de um par a partir de código síncrono"""
+        return self._run(self.fetch_klines(symbol, timeframe, limit, start_time), self._request_budget())
+
+    def fetch_many_sync(self, pairs: Iterable[Tuple[str, str]], limit: int = 500,
+                        start_times: Optional[Dict[Tuple[str, str], int]] = None,
+                        limits: Optional[Dict[Tuple[str, str], int]] = None
+                        ) -> Dict[Tuple[str, str], Union[pd.DataFrame, Exception]]:
+        """Buscar vários (symbol, timeframe) em paralelo a partir de código síncrono"""
+        pairs = list(pairs)
+        rounds = max(1, math.ceil(len(pairs) / self.max_concurrency))
+        return self._run(self.fetch_many(pairs, limit, start_times, limits), self._request_budget() * rounds)
+
+    def close(self):
+        """Fechar a sessão HTTP e encerrar o event loop dedicado"""
+        with self._start_lock:
+            if self._loop is None:
+                return
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), loop).result(timeout=5)
+            self._session = None
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+
+    # === API assíncrona ===
+
+    async def fetch_klines(self, symbol: str, timeframe: str, limit: int = 500,
+                           start_time: Optional[int] = None) -> pd.DataFrame:
+        """Buscar candles de /api/v3/klines (start_time em ms, opcional)"""
+        params = {'symbol': symbol, 'interval': timeframe, 'limit': limit}
+        if start_time is not None:
+            params['startTime'] = int(start_time)
+
+        session = await self._get_session()
+        weight = klines_request_weight(limit)
+
+        for attempt in range(MAX_ATTEMPTS):
+            self._check_blocked(symbol, timeframe)
+            await self.bucket.acquire(weight)
+            retry_after = None
+            async with self._semaphore:
+                self.stats['requests'] += 1
+                self.stats['weight_used'] += weight
+                async with session.get(f"{self.base_url}/api/v3/klines", params=params) as response:
+                    used_weight = response.headers.get('X-MBX-USED-WEIGHT-1M')
+                    if used_weight is not None and used_weight.isdigit():
+                        self.bucket.sync_used_weight(int(used_weight))
+
+                    if response.status in (418, 429):
+                        self.stats['rate_limited'] += 1
+                        retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+                    else:
+                        response.raise_for_status()
+                        rows = await response.json()
+
+            if retry_after is not None:
+                # Rate limit da exchange: esperar fora do semáforo, e só esperas curtas
+                if retry_after > self.max_retry_after:
+                    self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+                    raise RuntimeError(f"Binance bloqueou as requisições por {retry_after:.0f}s "
+                                       f"({symbol} {timeframe})")
+                logger.warning(f"⏳ Rate limit da Binance para {symbol} {timeframe}, aguardando {retry_after}s")
+                await asyncio.sleep(retry_after)
+                continue
+
+            if not rows:
+                raise ValueError(f"Nenhum dado retornado para {symbol} {timeframe}")
+            return klines_to_dataframe(rows)
+
+        raise RuntimeError(f"Rate limit persistente para {symbol} {timeframe}")
+
+    async def fetch_many(self, pairs: Iterable[Tuple[str, str]], limit: int = 500,
+                         start_times: Optional[Dict[Tuple[str, str], int]] = None,
+                         limits: Optional[Dict[Tuple[str, str], int]] = None
+                         ) -> Dict[Tuple[str, str], Union[pd.DataFrame, Exception]]:
+        """
+        Buscar vários pares em paralelo; falhas voltam como Exception no resultado.
+        start_times e limits opcionais definem, por par, o primeiro candle (ms)
+        e a quantidade de candles a buscar.
+        """
+        pairs = list(pairs)
+        start_times = start_times or {}
+        limits = limits or {}
+        results = await asyncio.gather(
+            *(self.fetch_klines(symbol, timeframe, limits.get((symbol, timeframe), limit),
+                                start_times.get((symbol, timeframe)))
+              for symbol, timeframe in pairs),
+            return_exceptions=True,
+        )
+        for (symbol, timeframe), result in zip(pairs, results):
+            if isinstance(result, Exception):
+                self.stats['errors'] += 1
+                logger.warning(f"Falha ao buscar {symbol} {timeframe}: {result}")
+        return dict(zip(pairs, results))
+
+    # === Infraestrutura ===
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+            timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='ohlcv-fetcher', daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def _check_blocked(self, symbol: str, timeframe: str):
+        remaining = self._blocked_until - time.monotonic()
+        if remaining > 0:
+            raise RuntimeError(f"Binance bloqueada por mais {remaining:.0f}s ({symbol} {timeframe})")
+
+    def _request_budget(self) -> float:
+        """Pior caso de uma requisição: todas as tentativas e as esperas curtas entre elas"""
+        return self.request_timeout * MAX_ATTEMPTS + self.max_retry_after * (MAX_ATTEMPTS - 1)
+
+    def _run(self, coroutine, timeout: float):
+        if not AIOHTTP_AVAILABLE:
+            coroutine.close()
+            raise RuntimeError("aiohttp não disponível")
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            if future.done():
+                raise  # Timeout da própria requisição (mesma classe a partir do Python 3.11)
+            future.cancel()
+            raise TimeoutError(f"Busca de candles excedeu {timeout:.0f}s")
+
+
+def _parse_retry_after(value: Optional[str]) -> float:
+    """Retry-After em segundos (1s se ausente ou inválido)"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 1.0
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Gerenciador de assinaturas de streams WebSocket da Binance
+
+Mantém o conjunto de streams desejado (ex.: 'btcusdt@ticker') distribuído
+entre conexões ao endpoint de streams combinados, cada uma com no máximo
+max_streams_per_connection streams. Mudanças no conjunto viram mensagens
+SUBSCRIBE/UNSUBSCRIBE na conexão já aberta, sem reconectar: streams novos vão
+para uma conexão com espaço livre (ou para uma conexão nova) e conexões que
+ficam vazias são fechadas.
+
+Cada conexão reconecta com backoff exponencial e, ao reconectar, assina de
+novo todos os seus streams. O loop asyncio roda em uma thread própria;
+update_streams pode ser chamado de qualquer thread.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import websockets
+
+logger = logging.getLogger(__name__)
+
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443/stream"
+
+
+class _StreamConnection:
+    """Uma conexão WebSocket e os streams atribuídos a ela"""
+
+    def __init__(self, manager: 'BinanceStreamManager', connection_id: int):
+        self.manager = manager
+        self.connection_id = connection_id
+        self.streams: Set[str] = set()
+        self.websocket = None
+        self.control_queue: asyncio.Queue = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+
+    def subscribe(self, streams: Iterable[str]):
+        added = set(streams) - self.streams
+        self.streams |= added
+        # Desconectada: a reconexão assina todos os streams da conexão
+        if added and self.websocket is not None:
+            self.control_queue.put_nowait(('SUBSCRIBE', sorted(added)))
+
+    def unsubscribe(self, streams: Iterable[str]):
+        removed = self.streams & set(streams)
+        self.streams -= removed
+        if removed and self.websocket is not None:
+            self.control_queue.put_nowait(('UNSUBSCRIBE', sorted(removed)))
+
+    async def run(self):
+        """Conectar, assinar e ler mensagens até a conexão ser cancelada"""
+        manager = self.manager
+        backoff = manager.reconnect_base
+        while manager.running:
+            try:
+                async with websockets.connect(manager.url, ping_interval=20) as websocket:
+                    self.websocket = websocket
+                    self.control_queue = asyncio.Queue()
+                    if self.streams:
+                        self.control_queue.put_nowait(('SUBSCRIBE', sorted(self.streams)))
+                    manager._count(connects=1)
+                    logger.info(f"OK WebSocket #{self.connection_id} conectado ({len(self.streams)} streams)")
+
+                    writer = asyncio.create_task(self._write(websocket))
+                    try:
+                        async for message in websocket:
+                            backoff = manager.reconnect_base
+                            manager._dispatch(message)
+                    finally:
+                        writer.cancel()
+                        self.websocket = None
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ WebSocket #{self.connection_id} desconectado: {e}")
+
+            if not manager.running:
+                break
+            manager._count(reconnects=1)
+            manager._notify_disconnect()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, manager.reconnect_max)
+
+    async def _write(self, websocket):
+        """Enviar SUBSCRIBE/UNSUBSCRIBE respeitando o limite de mensagens de controle"""
+        manager = self.manager
+        while True:
+            method, streams = await self.control_queue.get()
+            for start in range(0, len(streams), manager.subscribe_batch):
+                await websocket.send(json.dumps({
+                    'method': method,
+                    'params': streams[start:start + manager.subscribe_batch],
+                    'id': next(manager._request_ids),
+                }))
+                manager._count(control_messages=1)
+                await asyncio.sleep(manager.control_interval)
+
+
+class BinanceStreamManager:
+    """Assinaturas dinâmicas de streams distribuídas entre conexões WebSocket"""
+
+    def __init__(self, on_message: Callable[[Dict, int], None], url: str = BINANCE_STREAM_URL,
+                 max_streams_per_connection: int = 200, subscribe_batch: int = 100,
+                 control_interval: float = 0.25, reconnect_base: float = 1.0,
+                 reconnect_max: float = 60.0, on_disconnect: Optional[Callable[[], None]] = None):
+        self.on_message = on_message
+        self.on_disconnect = on_disconnect
+        self.url = url
+        self.max_streams_per_connection = max(1, max_streams_per_connection)
+        self.subscribe_batch = max(1, subscribe_batch)
+        self.control_interval = control_interval
+        self.reconnect_base = reconnect_base
+        self.reconnect_max = max(reconnect_base, reconnect_max)
+
+        self.running = False
+        self.connections: List[_StreamConnection] = []
+        self._desired: Set[str] = set()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+        self._connection_ids = itertools.count(1)
+        self._request_ids = itertools.count(1)
+        self.stats = {'messages': 0, 'connects': 0, 'reconnects': 0, 'control_messages': 0, 'errors': 0}
+
+    def start(self):
+        """Iniciar o loop das conexões em uma thread própria"""
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run_loop, name='binance-streams', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Fechar todas as conexões"""
+        self.running = False
+        self._wake()
+        if timeout is not None and self._thread is not None:
+            self._thread.join(timeout)
+
+    def update_streams(self, streams: Iterable[str]):
+        """Substituir o conjunto de streams desejado (thread-safe)"""
+        with self._lock:
+            self._desired = set(streams)
+        self._wake()
+
+    def get_streams(self) -> Set[str]:
+        with self._lock:
+            return set(self._desired)
+
+    def get_stats(self) -> Dict:
+        """Contadores e estado das conexões"""
+        connections = list(self.connections)
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update({
+            'connections': len(connections),
+            'connected': sum(1 for connection in connections if connection.websocket is not None),
+            'streams': sum(len(connection.streams) for connection in connections),
+        })
+        return stats
+
+    def _run_loop(self):
+        try:
+            asyncio.run(self._main())
+        except Exception as e:
+            logger.error(f"❌ Erro no gerenciador de streams: {e}")
+
+    async def _main(self):
+        self._changed = asyncio.Event()
+        self._changed.set()
+        self._loop = asyncio.get_running_loop()
+        try:
+            while self.running:
+                await self._changed.wait()
+                self._changed.clear()
+                if self.running:
+                    self._rebalance()
+        finally:
+            self._loop = None
+            tasks = [connection.task for connection in self.connections]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.connections = []
+
+    def _wake(self):
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._changed.set)
+            except RuntimeError:
+                pass  # Loop já encerrado
+
+    def _rebalance(self):
+        """Levar as conexões ao conjunto desejado com o mínimo de mensagens"""
+        desired = self.get_streams()
+
+        for connection in self.connections:
+            connection.unsubscribe(connection.streams - desired)
+
+        assigned = set().union(*(connection.streams for connection in self.connections))
+        missing = sorted(desired - assigned)
+
+        # Preencher conexões existentes antes de abrir novas
+        for connection in self.connections:
+            room = self.max_streams_per_connection - len(connection.streams)
+            if room > 0 and missing:
+                connection.subscribe(missing[:room])
+                missing = missing[room:]
+
+        while missing:
+            connection = _StreamConnection(self, next(self._connection_ids))
+            connection.subscribe(missing[:self.max_streams_per_connection])
+            missing = missing[self.max_streams_per_connection:]
+            connection.task = asyncio.get_running_loop().create_task(connection.run())
+            self.connections.append(connection)
+
+        for connection in [connection for connection in self.connections if not connection.streams]:
+            connection.task.cancel()
+            self.connections.remove(connection)
+            logger.info(f"STOP WebSocket #{connection.connection_id} fechado (sem streams)")
+
+    def _dispatch(self, message):
+        """Entregar o payload de dados ao callback; respostas de controle são só registradas"""
+        self._count(messages=1)
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            self._count(errors=1)
+            return
+
+        if 'id' in payload and ('result' in payload or 'error' in payload):
+            if payload.get('error'):
+                self._count(errors=1)
+                logger.warning(f"⚠️ Binance rejeitou assinatura #{payload['id']}: {payload['error']}")
+            return
+
+        try:
+            self.on_message(payload.get('data', payload), len(message))
+        except Exception as e:
+            logger.error(f"Erro ao processar mensagem WS: {e}")
+
+    def _notify_disconnect(self):
+        if self.on_disconnect is not None:
+            try:
+                self.on_disconnect()
+            except Exception as e:
+                logger.error(f"Erro no callback de desconexão: {e}")
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self.stats[name] += value
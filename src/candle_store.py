@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Armazenamento colunar de candles em buffers NumPy de capacidade fixa
+
+Cada (symbol, timeframe) ocupa um CandleRingBuffer com timestamps int64 (ns)
+e OHLCV float64 em colunas contíguas. Leituras de arrays são views somente
+leitura, sem cópia; o DataFrame só é montado quando o consumidor precisa de um.
+Opcionalmente as séries são persistidas em disco (CandleDiskCache) para que
+um restart comece com o histórico já carregado.
+"""
+
+import os
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+COLUMN_POSITION = {name: position for position, name in enumerate(OHLCV_COLUMNS)}
+_COLUMNS_INDEX = pd.Index(OHLCV_COLUMNS)
+
+
+def frame_to_arrays(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Timestamps (int64 ns) e valores OHLCV (5 x n, float64) de um DataFrame de candles"""
+    index = df.index if isinstance(df.index, pd.DatetimeIndex) else pd.to_datetime(df.index)
+    timestamps = index.asi8
+    values = np.ascontiguousarray(df[OHLCV_COLUMNS].to_numpy(dtype=np.float64).T)
+    return timestamps, values
+
+
+class CandleRingBuffer:
+    """
+    Buffer circular linearizado de candles.
+
+    Mantém no máximo `capacity` candles em uma janela contígua dentro de
+    arrays com folga de capacity // 4 linhas. Um append ocupa a próxima linha
+    livre; quando a folga acaba, a janela é copiada para arrays novos
+    (O(1) amortizado). Views entregues antes continuam apontando para os arrays
+    antigos, então só mudam quando uma mesclagem reescreve candles da janela
+    (normalmente apenas o último, ainda aberto).
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = max(1, int(capacity))
+        self._size = self.capacity + max(16, self.capacity // 4)
+        self._timestamps = np.empty(self._size, dtype=np.int64)
+        self._values = np.empty((len(OHLCV_COLUMNS), self._size), dtype=np.float64)
+        self._start = 0
+        self._end = 0
+        self._version = 0
+        self._index_cache: Optional[Tuple[Tuple[int, int], pd.DatetimeIndex]] = None
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """Timestamp (ns) do último candle, ou None se vazio"""
+        return int(self._timestamps[self._end - 1]) if self._end > self._start else None
+
+    @property
+    def nbytes(self) -> int:
+        return self._timestamps.nbytes + self._values.nbytes
+
+    def append(self, timestamp: int, open_: float, high: float, low: float, close: float, volume: float):
+        """Adicionar um candle; mesmo timestamp do último substitui o candle aberto"""
+        last = self.last_timestamp
+        if last is not None and timestamp < last:
+            raise ValueError("Candle anterior ao último candle do buffer")
+        if last is None or timestamp > last:
+            self._reserve(1)
+            self._end += 1
+
+        position = self._end - 1
+        self._timestamps[position] = timestamp
+        self._values[:, position] = (open_, high, low, close, volume)
+        self._trim()
+        self._version += 1
+
+    def extend(self, timestamps: np.ndarray, values: np.ndarray):
+        """Adicionar candles em lote (timestamps crescentes, posteriores ao último)"""
+        count = len(timestamps)
+        if count == 0:
+            return
+        if len(self) and timestamps[0] <= self.last_timestamp:
+            raise ValueError("Candles devem ser posteriores ao último candle do buffer")
+
+        if count >= self.capacity:
+            # Janela inteira substituída: arrays novos, como em _reserve, para não
+            # reescrever views entregues antes (ex.: histórico completo mesclado)
+            timestamps, values, count = timestamps[-self.capacity:], values[:, -self.capacity:], self.capacity
+            self._timestamps = np.empty_like(self._timestamps)
+            self._values = np.empty_like(self._values)
+            self._start = self._end = 0
+
+        self._reserve(count)
+        self._timestamps[self._end:self._end + count] = timestamps
+        self._values[:, self._end:self._end + count] = values
+        self._end += count
+        self._trim()
+        self._version += 1
+
+    def merge(self, timestamps: np.ndarray, values: np.ndarray) -> bool:
+        """
+        Mesclar candles que continuam o buffer: o primeiro timestamp novo precisa
+        existir no buffer e, a partir dele, as linhas são substituídas.
+        Retorna False se os dados não continuam o buffer.
+        """
+        if len(timestamps) == 0:
+            return True
+        if len(self) == 0:
+            self.extend(timestamps, values)
+            return True
+
+        window = self._timestamps[self._start:self._end]
+        position = int(np.searchsorted(window, timestamps[0]))
+        if position >= len(window) or window[position] != timestamps[0]:
+            return False
+
+        # Truncar até o primeiro candle novo e reescrever a partir dele
+        self._end = self._start + position
+        self.extend(timestamps, values)
+        return True
+
+    def view(self, limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Views somente leitura (timestamps, valores 5 x n) dos últimos `limit` candles"""
+        start = self._window_start(limit)
+        timestamps = self._timestamps[start:self._end]
+        values = self._values[:, start:self._end]
+        timestamps.flags.writeable = False
+        values.flags.writeable = False
+        return timestamps, values
+
+    def column(self, name: str, limit: Optional[int] = None) -> np.ndarray:
+        """View somente leitura de uma coluna OHLCV"""
+        column = self._values[COLUMN_POSITION[name], self._window_start(limit):self._end]
+        column.flags.writeable = False
+        return column
+
+    def to_dataframe(self, limit: Optional[int] = None) -> pd.DataFrame:
+        """DataFrame independente (uma cópia contígua) dos últimos `limit` candles"""
+        start = self._window_start(limit)
+        values = self._values[:, start:self._end].copy()
+        return pd.DataFrame(values.T, index=self._index(start), columns=_COLUMNS_INDEX, copy=False)
+
+    def _index(self, start: int) -> pd.DatetimeIndex:
+        # DatetimeIndex é imutável: reaproveitado entre leituras até a próxima escrita
+        key = (self._version, start)
+        if self._index_cache is None or self._index_cache[0] != key:
+            index = pd.DatetimeIndex(self._timestamps[start:self._end].copy().view('datetime64[ns]'),
+                                     name='timestamp')
+            self._index_cache = (key, index)
+        return self._index_cache[1]
+
+    def _window_start(self, limit: Optional[int]) -> int:
+        if limit is None or limit >= len(self):
+            return self._start
+        return self._end - max(0, int(limit))
+
+    def _reserve(self, count: int):
+        if self._end + count <= self._size:
+            return
+        # Janela para arrays novos: views antigas continuam válidas
+        keep = min(len(self), self.capacity - count) if count < self.capacity else 0
+        timestamps = np.empty_like(self._timestamps)
+        values = np.empty_like(self._values)
+        timestamps[:keep] = self._timestamps[self._end - keep:self._end]
+        values[:, :keep] = self._values[:, self._end - keep:self._end]
+        self._timestamps, self._values = timestamps, values
+        self._start, self._end = 0, keep
+
+    def _trim(self):
+        if len(self) > self.capacity:
+            self._start = self._end - self.capacity
+
+
+class CandleDiskCache:
+    """
+    Um arquivo .npy por série (registros timestamp + OHLCV), lido via
+    memory-map. A escrita usa arquivo temporário + rename para nunca deixar
+    um arquivo parcial para trás.
+    """
+
+    DTYPE = np.dtype([('timestamp', '<i8')] + [(name, '<f8') for name in OHLCV_COLUMNS])
+    SUFFIX = '.npy'
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def keys(self) -> List[str]:
+        """Séries com arquivo em disco"""
+        return [unquote(name[:-len(self.SUFFIX)]) for name in sorted(os.listdir(self.directory))
+                if name.endswith(self.SUFFIX)]
+
+    def save(self, key: str, timestamps: np.ndarray, values: np.ndarray):
+        records = np.empty(len(timestamps), dtype=self.DTYPE)
+        records['timestamp'] = timestamps
+        for position, name in enumerate(OHLCV_COLUMNS):
+            records[name] = values[position]
+
+        path = self._path(key)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, 'wb') as handle:
+            np.save(handle, records)
+        os.replace(temporary, path)
+
+    def load(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Timestamps e valores (5 x n) da série, ou None se não houver arquivo"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        records = np.load(path, mmap_mode='r')
+        if records.dtype != self.DTYPE:
+            raise ValueError(f"Formato inesperado em {path}")
+        timestamps = np.array(records['timestamp'])
+        values = np.vstack([records[name] for name in OHLCV_COLUMNS])
+        return timestamps, values
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, quote(key, safe='') + self.SUFFIX)
+
+
+class CandleStore:
+    """
+    Buffers de candles por chave "SYMBOL_TIMEFRAME".
+
+    Mantém a interface de dicionário usada pelo antigo data_cache
+    (`key in store`, `store[key]`, `store[key] = df`), onde leitura por
+    índice devolve um DataFrame independente.
+    """
+
+    def __init__(self, capacity: int = 1000, disk_cache: Optional[CandleDiskCache] = None):
+        self.capacity = capacity
+        self.disk_cache = disk_cache
+        self._buffers: Dict[str, CandleRingBuffer] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._buffers
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._buffers))
+
+    def keys(self):
+        return list(self._buffers)
+
+    def __getitem__(self, key: str) -> pd.DataFrame:
+        if key not in self._buffers:
+            raise KeyError(key)
+        return self.to_dataframe(key)
+
+    def __setitem__(self, key: str, df: pd.DataFrame):
+        """Substituir a série inteira pelos candles de df"""
+        buffer = CandleRingBuffer(self.capacity)
+        if df is not None and not df.empty:
+            buffer.extend(*frame_to_arrays(df))
+        with self._lock:
+            self._buffers[key] = buffer
+
+    def __delitem__(self, key: str):
+        with self._lock:
+            del self._buffers[key]
+
+    def get(self, key: str, default=None):
+        return self.to_dataframe(key) if key in self._buffers else default
+
+    def merge(self, key: str, df: pd.DataFrame):
+        """
+        Mesclar candles novos na série: o candle aberto em cache é substituído
+        pela versão nova; dados que não continuam a série a substituem.
+        """
+        if df is None or df.empty:
+            return
+
+        timestamps, values = frame_to_arrays(df)
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is not None and buffer.merge(timestamps, values):
+                return
+
+        self[key] = df
+
+    def hydrate(self) -> int:
+        """Carregar do disco todas as séries persistidas; retorna quantas foram carregadas"""
+        if self.disk_cache is None:
+            return 0
+
+        loaded = 0
+        for key in self.disk_cache.keys():
+            try:
+                arrays = self.disk_cache.load(key)
+                if arrays is None or len(arrays[0]) == 0:
+                    continue
+                buffer = CandleRingBuffer(self.capacity)
+                buffer.extend(*arrays)
+                with self._lock:
+                    self._buffers[key] = buffer
+                loaded += 1
+            except Exception as e:
+                logger.warning(f"Cache em disco ignorado para {key}: {e}")
+        return loaded
+
+    def persist(self, key: str):
+        """Gravar a série atual no disco"""
+        if self.disk_cache is None:
+            return
+
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None or len(buffer) == 0:
+                return
+            timestamps, values = buffer.view()
+            timestamps, values = timestamps.copy(), values.copy()
+
+        try:
+            self.disk_cache.save(key, timestamps, values)
+        except Exception as e:
+            logger.error(f"Erro ao salvar cache em disco de {key}: {e}")
+
+    def to_dataframe(self, key: str, limit: Optional[int] = None) -> pd.DataFrame:
+        """DataFrame dos últimos `limit` candles (vazio se a série não existir)"""
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                return pd.DataFrame()
+            return buffer.to_dataframe(limit)
+
+    def view(self, key: str, limit: Optional[int] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Views somente leitura (timestamps, valores 5 x n) sem cópia"""
+        buffer = self._buffers.get(key)
+        return buffer.view(limit) if buffer is not None else None
+
+    def column(self, key: str, name: str, limit: Optional[int] = None) -> Optional[np.ndarray]:
+        """View somente leitura de uma coluna OHLCV da série"""
+        buffer = self._buffers.get(key)
+        return buffer.column(name, limit) if buffer is not None else None
+
+    def last_timestamp(self, key: str) -> Optional[int]:
+        """Timestamp (ns) do último candle da série"""
+        buffer = self._buffers.get(key)
+        return buffer.last_timestamp if buffer is not None else None
+
+    def series_length(self, key: str) -> int:
+        buffer = self._buffers.get(key)
+        return len(buffer) if buffer is not None else 0
+
+    def get_stats(self) -> Dict:
+        """Séries armazenadas e memória ocupada pelos buffers"""
+        with self._lock:
+            return {
+                'series': len(self._buffers),
+                'candles': sum(len(buffer) for buffer in self._buffers.values()),
+                'memory_mb': round(sum(buffer.nbytes for buffer in self._buffers.values()) / (1024 * 1024), 2),
+            }
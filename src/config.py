@@ -100,6 +100,28 @@ class Config:
         'weak_signal_threshold': 0.08     # Threshold para sinais fracos
     })
     
+    # Busca de candles na API REST pública da Binance
+    MARKET_DATA_FETCH: Dict = field(default_factory=lambda: {
+        'binance_rest_url': 'https://api.binance.com',
+        'max_concurrency': 10,              # Requisições simultâneas (conexões keep-alive)
+        'weight_limit_per_minute': 4800,    # 80% do limite de 6000/min da Binance
+        'request_timeout': 10,              # Segundos por requisição
+        'max_retry_after': 5,               # Retry-After maior (ban de IP) falha na hora
+        'delta_limit': 99,                  # Candles por atualização incremental (peso 1)
+        'max_history_candles': 1000,        # Histórico mantido por (symbol, timeframe)
+        'persist_candles': True,            # Gravar candles em disco para warm start
+        'candle_cache_dir': 'data/candles'
+    })
+    
+    # Varredura concorrente de múltiplos pares
+    SCAN_CONFIG: Dict = field(default_factory=lambda: {
+        'concurrent': True,            # False = varredura sequencial (comportamento antigo)
+        'io_workers': 8,               # Threads para busca de dados e geração do sinal
+        'cpu_workers': 2,              # Processos para indicadores (0 = usar threads)
+        'pair_timeout_seconds': 60,    # Tempo máximo de cada par (todas as etapas)
+        'scan_timeout_seconds': 180    # Tempo máximo da varredura completa
+    })
+    
     # Configurações de notificação
     NOTIFICATION_CONFIG: Dict = field(default_factory=lambda: {
         'telegram_enabled': False,
@@ -133,6 +155,81 @@ class Config:
         'cross_asset_correlation': True # Correlação entre ativos
     })
     
+    # Feature store compartilhado (indicadores/features por candle)
+    FEATURE_STORE: Dict = field(default_factory=lambda: {
+        'max_entries': 128,     # Séries/candles mantidos em memória
+        'ttl_seconds': 900,     # Validade de cada entrada
+        'max_memory_mb': 256    # Orçamento de memória dos frames
+    })
+    
+    # Clustering de regimes de mercado (modelo persistente por série)
+    REGIME_CLUSTERING: Dict = field(default_factory=lambda: {
+        'incremental': True,           # False = novo KMeans completo a cada chamada
+        'n_clusters': 4,
+        'batch_size': 256,             # Mini-batch do MiniBatchKMeans
+        'refit_every_candles': 500,    # Reajuste agendado após N candles novos
+        'drift_threshold': 2.0,        # Reajuste se a distância aos centróides dobrar
+        'drift_smoothing': 0.05,       # Peso de cada candle novo na média da distância
+        'drift_min_candles': 50,       # Candles novos mínimos entre reajustes por drift
+        'max_series': 128              # Modelos mantidos em memória
+    })
+    
+    # Registro de modelos LSTM treinados (pesos + scaler em .npz por símbolo)
+    LSTM_REGISTRY: Dict = field(default_factory=lambda: {
+        'enabled': True,
+        'directory': 'models/lstm',
+        'staleness_candles': 24    # Retreinar após N candles além da janela de treino
+    })
+
+    # Registro versionado dos modelos do UltraEnhancedAIEngine (ensemble + seletor + scaler)
+    ULTRA_MODEL_REGISTRY: Dict = field(default_factory=lambda: {
+        'enabled': True,
+        'directory': 'models/ultra',
+        'ultra_fast_directory': 'models/ultra_fast',
+        'keep_versions': 3,             # Versões mantidas em disco por (símbolo, timeframe)
+        'staleness_candles': 24,        # Retreinar em segundo plano após N candles novos
+        'train_in_background': True,    # False = só usar modelos do pipeline offline
+        # Pré-treinar CRYPTO_PAIRS x STARTUP_TIMEFRAMES ao iniciar; desligado porque a rota de
+        # sinais usa predict_signal, não ultra_predict_signal (o ensemble do registro)
+        'pretrain_on_startup': False,
+        'pretrain_candles': 1000        # Histórico usado no pré-treino
+    })
+
+    # Pipeline de treino offline (python training_pipeline.py)
+    TRAINING_PIPELINE: Dict = field(default_factory=lambda: {
+        'workers': 0,                   # Processos de treino (0 = um por núcleo)
+        'models': ['ultra', 'ultra_fast', 'lstm'],
+        'max_candles': 1000,            # Candles mais recentes usados por série
+        'min_candles': 200,             # Séries menores são ignoradas
+        'lstm_timeframe': '1h',         # LSTM (treino lento) só neste timeframe
+        'report_path': 'models/training_report.json'
+    })
+
+    # Feed de preços em tempo real (backup REST do WebSocket)
+    REALTIME_PRICE_FEED: Dict = field(default_factory=lambda: {
+        'rest_min_interval': 1.0,       # Polling quando algum símbolo observado está sem WebSocket
+        'rest_max_interval': 15.0,      # Teto do backoff enquanto o WebSocket cobre todos
+        'websocket_fresh_seconds': 2.0, # Preço do WebSocket mais novo que isso dispensa o REST
+        'requested_ttl_seconds': 600,   # Símbolo pedido via get_current_price sai do feed sem leituras
+        'websocket_url': 'wss://stream.binance.com:9443/stream',
+        'max_streams_per_connection': 200,  # Acima disso os streams vão para outra conexão
+        'subscribe_batch': 100,         # Streams por mensagem SUBSCRIBE/UNSUBSCRIBE
+        'control_interval': 0.25,       # Binance aceita até 5 mensagens de controle por segundo
+        'reconnect_base': 1.0,          # Backoff exponencial da reconexão (segundos)
+        'reconnect_max': 60.0,
+        'broadcast_frame_ms': 250,      # Ticks agrupados em um price_batch por sala a cada quadro
+        'compact_payloads': True        # Aceitar subscribe_prices {'format': 'compact'} (quadros binários delta)
+    })
+
+    # Dtypes do frame final de features (AITradingEngine.prepare_features)
+    DTYPE_POLICY: Dict = field(default_factory=lambda: {
+        'enabled': True,
+        'float_dtype': 'float32',
+        'keep_float64': ['open', 'high', 'low', 'close', 'volume'],  # Precisão do preço
+        'downcast_flags': True,         # Colunas inteiras 0/1 -> int8
+        'categorical_labels': True      # Rótulos de regime/sentimento -> category
+    })
+
     def __post_init__(self):
         """Validações pós-inicialização"""
         # Criar diretórios necessários
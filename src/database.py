@@ -7,18 +7,61 @@ import sqlite3
 import pandas as pd
 import json
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import logging
 import os
+import queue
+import threading
+import time
+import weakref
+import atexit
 from contextlib import contextmanager
+from itertools import groupby, repeat
 
 logger = logging.getLogger(__name__)
 
 class DatabaseManager:
     """Gerenciador principal do banco de dados"""
     
-    def __init__(self, db_path: str = 'data/trading_bot.db'):
+    # Pragmas aplicados a cada conexão (journal_mode=WAL é persistente no arquivo)
+    CONNECTION_PRAGMAS = {
+        'synchronous': 'NORMAL',   # Seguro com WAL; fsync apenas nos checkpoints
+        'temp_store': 'MEMORY',
+        'cache_size': -16000       # ~16MB de page cache
+    }
+    
+    def __init__(self, db_path: str = 'data/trading_bot.db', batch_interval: float = 0.5,
+                 batch_size: int = 500):
         self.db_path = db_path
+        self.batch_interval = batch_interval  # Intervalo entre commits da fila de escrita
+        self.batch_size = batch_size          # Máximo de escritas por commit
+        self._wal_enabled = False
+        
+        # Uma conexão persistente por thread (sqlite3 não compartilha conexões entre threads).
+        # O servidor atende cada requisição em uma thread nova: a conexão é fechada
+        # quando a thread dona termina, para não acumular conexões e descritores.
+        self._local = threading.local()
+        self._connections: Dict[sqlite3.Connection, weakref.ref] = {}  # conexão -> thread dona
+        self._connections_lock = threading.Lock()
+        
+        # Fila única de escritas pequenas (logs, sinais), gravadas em lote por uma thread
+        self._write_queue: 'queue.Queue[Optional[Tuple]]' = queue.Queue()
+        self._flush_event = threading.Event()
+        self._writer_thread: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'connections_opened': 0,
+            'connections_released': 0,
+            'writes_queued': 0,
+            'writes_committed': 0,
+            'write_batches': 0,
+            'write_errors': 0,
+            'write_latency_ms_total': 0.0,
+            'write_latency_ms_max': 0.0
+        }
+        
         self.ensure_directory_exists()
         
     def ensure_directory_exists(self):
@@ -27,11 +70,10 @@ class DatabaseManager:
     
     @contextmanager
     def get_connection(self):
-        """Context manager para conexões com o banco"""
+        """Context manager para a conexão persistente da thread atual"""
         conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row  # Para acessar colunas por nome
+            conn = self._thread_connection()
             yield conn
         except Exception as e:
             if conn:
@@ -39,8 +81,198 @@ class DatabaseManager:
             logger.error(f"Erro na conexão com banco: {e}")
             raise
         finally:
-            if conn:
+            # Como no fechamento da conexão antiga: o que não foi commitado é descartado
+            if conn is not None and conn.in_transaction:
+                conn.rollback()
+    
+    def _thread_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            self._release_dead_connections()
+            # Cache de statements por conexão: SQL repetido não é recompilado.
+            # check_same_thread=False só para poder fechá-la depois que a thread dona terminar
+            conn = sqlite3.connect(self.db_path, cached_statements=256, check_same_thread=False)
+            conn.row_factory = sqlite3.Row  # Para acessar colunas por nome
+            self._configure_connection(conn)
+            self._local.connection = conn
+            # Fechada quando o objeto da thread é coletado ou, antes disso, na próxima
+            # conexão aberta depois que a thread terminou
+            owner = weakref.ref(threading.current_thread(),
+                                lambda _ref, conn=conn: self._release_connection(conn))
+            with self._connections_lock:
+                self._connections[conn] = owner
+            self._count('connections_opened')
+        return conn
+    
+    def _release_connection(self, conn: sqlite3.Connection):
+        with self._connections_lock:
+            if self._connections.pop(conn, None) is None:
+                return
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._count('connections_released')
+    
+    def _release_dead_connections(self):
+        """Fechar as conexões de threads que já terminaram"""
+        with self._connections_lock:
+            dead = [conn for conn, owner in self._connections.items()
+                    if owner() is None or not owner().is_alive()]
+        for conn in dead:
+            self._release_connection(conn)
+    
+    def close(self):
+        """Gravar escritas pendentes, parar a thread de escrita e fechar as conexões"""
+        with self._writer_lock:
+            writer, self._writer_thread = self._writer_thread, None
+        if writer is not None and writer.is_alive():
+            self._write_queue.put(None)
+            self._flush_event.set()
+            writer.join(timeout=10)
+        
+        with self._connections_lock:
+            connections, self._connections = list(self._connections), {}
+        for conn in connections:
+            try:
                 conn.close()
+            except Exception:
+                pass  # Conexão de outra thread: o sqlite3 pode recusar o close
+        self._local = threading.local()
+    
+    # Fila de escrita em lote
+    def _enqueue_write(self, sql: str, params: Tuple):
+        """Agendar uma escrita pequena para o próximo commit em lote"""
+        self._ensure_writer()
+        self._write_queue.put((sql, params, time.perf_counter()))
+        self._count('writes_queued')
+    
+    def flush(self):
+        """Aguardar até que todas as escritas enfileiradas estejam gravadas"""
+        if self._write_queue.unfinished_tasks == 0:
+            return
+        writer = self._writer_thread
+        if writer is None or not writer.is_alive():
+            self._drain_queue_synchronously()
+            return
+        self._flush_event.set()
+        self._write_queue.join()
+    
+    def _ensure_writer(self):
+        if self._writer_thread is not None and self._writer_thread.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer_thread is None or not self._writer_thread.is_alive():
+                self._writer_thread = threading.Thread(target=self._writer_loop, name='db-writer', daemon=True)
+                self._writer_thread.start()
+                atexit.register(self.close)
+    
+    def _writer_loop(self):
+        while True:
+            item = self._write_queue.get()
+            if item is None:
+                self._write_queue.task_done()
+                break
+            
+            # Acumular escritas até o intervalo de commit (ou um flush explícito);
+            # com um lote cheio já na fila, gravar sem esperar
+            if self._write_queue.qsize() < self.batch_size:
+                self._flush_event.wait(self.batch_interval)
+            
+            batch, stop = [item], False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._write_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            if self._write_queue.empty():
+                self._flush_event.clear()
+            
+            self._commit_batch(batch)
+            for _ in batch:
+                self._write_queue.task_done()
+            if stop:
+                self._write_queue.task_done()
+                break
+        
+        conn = getattr(self._local, 'connection', None)
+        if conn is not None:
+            self._release_connection(conn)
+    
+    def _drain_queue_synchronously(self):
+        batch = []
+        while True:
+            try:
+                item = self._write_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                batch.append(item)
+            else:
+                self._write_queue.task_done()
+        if batch:
+            self._commit_batch(batch)
+            for _ in batch:
+                self._write_queue.task_done()
+    
+    def _commit_batch(self, batch: List[Tuple]):
+        """Gravar um lote em uma transação; escritas consecutivas iguais usam executemany"""
+        conn = self._thread_connection()
+        try:
+            for sql, items in groupby(batch, key=lambda item: item[0]):
+                conn.executemany(sql, [item[1] for item in items])
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Erro ao gravar lote de {len(batch)} escritas, gravando individualmente: {e}")
+            committed = []
+            for item in batch:
+                try:
+                    conn.execute(item[0], item[1])
+                    conn.commit()
+                    committed.append(item)
+                except Exception as item_error:
+                    conn.rollback()
+                    self._count('write_errors')
+                    logger.error(f"Erro em escrita enfileirada: {item_error}")
+            batch = committed
+        
+        now = time.perf_counter()
+        latencies = [(now - item[2]) * 1000 for item in batch]
+        with self._stats_lock:
+            self.stats['write_batches'] += 1
+            self.stats['writes_committed'] += len(batch)
+            self.stats['write_latency_ms_total'] += sum(latencies)
+            if latencies:
+                self.stats['write_latency_ms_max'] = max(self.stats['write_latency_ms_max'], max(latencies))
+    
+    def _count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+    
+    def get_pool_stats(self) -> Dict:
+        """Instrumentação do pool de conexões e da fila de escrita"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        committed = stats['writes_committed']
+        stats['write_latency_ms_avg'] = round(stats['write_latency_ms_total'] / committed, 2) if committed else 0.0
+        stats['write_latency_ms_total'] = round(stats['write_latency_ms_total'], 2)
+        stats['write_latency_ms_max'] = round(stats['write_latency_ms_max'], 2)
+        stats['queue_depth'] = self._write_queue.qsize()
+        stats['open_connections'] = len(self._connections)
+        return stats
+    
+    def _configure_connection(self, conn: sqlite3.Connection):
+        """Aplicar WAL e pragmas de performance"""
+        if not self._wal_enabled:
+            # WAL: leitores não bloqueiam o escritor e commits não reescrevem o arquivo principal
+            self._wal_enabled = conn.execute('PRAGMA journal_mode=WAL').fetchone()[0] == 'wal'
+        for pragma, value in self.CONNECTION_PRAGMAS.items():
+            conn.execute(f'PRAGMA {pragma}={value}')
     
     def initialize(self):
         """Inicializar banco de dados e criar tabelas"""
@@ -201,19 +433,48 @@ class DatabaseManager:
             conn.execute(index_sql)
     
     # Métodos para dados de mercado
-    def save_market_data(self, symbol: str, timeframe: str, df: pd.DataFrame):
-        """Salvar dados de mercado"""
+    def save_market_data(self, symbol: str, timeframe: str, df: pd.DataFrame,
+                         last_rows: Optional[int] = None):
+        """
+        Salvar dados de mercado em lote (uma transação, executemany).
+        
+        Candles já existentes são atualizados no lugar (upsert). Com last_rows,
+        apenas os últimos N candles de df são gravados - útil para atualizar o
+        candle aberto sem regravar o histórico inteiro; last_rows <= 0 não grava nada.
+        """
+        if df is None or df.empty:
+            return
+        
+        if last_rows is not None:
+            # df.iloc[-0:] seria o frame inteiro
+            if last_rows <= 0:
+                return
+            df = df.iloc[-last_rows:]
+        
         try:
+            index = df.index if isinstance(df.index, pd.DatetimeIndex) else pd.to_datetime(df.index)
+            rows = zip(
+                repeat(symbol), repeat(timeframe),
+                index.strftime('%Y-%m-%d %H:%M:%S').tolist(),
+                df['open'].to_numpy(dtype=float).tolist(),
+                df['high'].to_numpy(dtype=float).tolist(),
+                df['low'].to_numpy(dtype=float).tolist(),
+                df['close'].to_numpy(dtype=float).tolist(),
+                df['volume'].to_numpy(dtype=float).tolist()
+            )
+            
             with self.get_connection() as conn:
-                for index, row in df.iterrows():
-                    conn.execute('''
-                        INSERT OR REPLACE INTO market_data 
-                        (symbol, timeframe, timestamp, open_price, high_price, low_price, close_price, volume)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        symbol, timeframe, index, 
-                        row['open'], row['high'], row['low'], row['close'], row['volume']
-                    ))
+                conn.executemany('''
+                    INSERT INTO market_data 
+                    (symbol, timeframe, timestamp, open_price, high_price, low_price, close_price, volume)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(symbol, timeframe, timestamp) DO UPDATE SET
+                        open_price = excluded.open_price,
+                        high_price = excluded.high_price,
+                        low_price = excluded.low_price,
+                        close_price = excluded.close_price,
+                        volume = excluded.volume
+                ''', rows)
                 conn.commit()
                 logger.debug(f"Dados de mercado salvos: {symbol} {timeframe} - {len(df)} registros")
         except Exception as e:
@@ -253,31 +514,29 @@ class DatabaseManager:
     
     # Métodos para sinais
     def save_signal(self, signal_data: Dict):
-        """Salvar sinal"""
+        """Salvar sinal (gravado no próximo commit em lote)"""
         try:
-            with self.get_connection() as conn:
-                conn.execute('''
-                    INSERT OR REPLACE INTO signals 
-                    (id, symbol, signal_type, confidence, entry_price, stop_loss, take_profit, 
-                     timeframe, timestamp, reasons, status, ai_prediction, technical_analysis)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    signal_data['id'],
-                    signal_data['symbol'],
-                    signal_data['signal_type'],
-                    signal_data['confidence'],
-                    signal_data['entry_price'],
-                    signal_data['stop_loss'],
-                    signal_data['take_profit'],
-                    signal_data['timeframe'],
-                    signal_data['timestamp'],
-                    json.dumps(signal_data.get('reasons', [])),
-                    signal_data.get('status', 'active'),
-                    json.dumps(signal_data.get('ai_prediction', {})),
-                    json.dumps(signal_data.get('technical_analysis', {}))
-                ))
-                conn.commit()
-                logger.debug(f"Sinal salvo: {signal_data['id']}")
+            self._enqueue_write('''
+                INSERT OR REPLACE INTO signals 
+                (id, symbol, signal_type, confidence, entry_price, stop_loss, take_profit, 
+                 timeframe, timestamp, reasons, status, ai_prediction, technical_analysis)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                signal_data['id'],
+                signal_data['symbol'],
+                signal_data['signal_type'],
+                signal_data['confidence'],
+                signal_data['entry_price'],
+                signal_data['stop_loss'],
+                signal_data['take_profit'],
+                signal_data['timeframe'],
+                signal_data['timestamp'],
+                json.dumps(signal_data.get('reasons', [])),
+                signal_data.get('status', 'active'),
+                json.dumps(signal_data.get('ai_prediction', {})),
+                json.dumps(signal_data.get('technical_analysis', {}))
+            ))
+            logger.debug(f"Sinal enfileirado: {signal_data['id']}")
         except Exception as e:
             logger.error(f"Erro ao salvar sinal: {e}")
     
@@ -287,6 +546,7 @@ class DatabaseManager:
                    status: Optional[str] = None) -> List[Dict]:
         """Obter sinais"""
         try:
+            self.flush()
             with self.get_connection() as conn:
                 query = 'SELECT * FROM signals WHERE 1=1'
                 params = []
@@ -325,12 +585,10 @@ class DatabaseManager:
             return []
     
     def update_signal_status(self, signal_id: str, status: str):
-        """Atualizar status do sinal"""
+        """Atualizar status do sinal (gravado no próximo commit em lote)"""
         try:
-            with self.get_connection() as conn:
-                conn.execute('UPDATE signals SET status = ? WHERE id = ?', (status, signal_id))
-                conn.commit()
-                logger.debug(f"Status do sinal {signal_id} atualizado para {status}")
+            self._enqueue_write('UPDATE signals SET status = ? WHERE id = ?', (status, signal_id))
+            logger.debug(f"Status do sinal {signal_id} atualizado para {status}")
         except Exception as e:
             logger.error(f"Erro ao atualizar status do sinal: {e}")
     
@@ -498,15 +756,13 @@ class DatabaseManager:
     # Métodos para indicadores técnicos
     def save_technical_indicators(self, symbol: str, timeframe: str, 
                                 timestamp: datetime, indicators: Dict):
-        """Salvar indicadores técnicos"""
+        """Salvar indicadores técnicos (gravados no próximo commit em lote)"""
         try:
-            with self.get_connection() as conn:
-                conn.execute('''
-                    INSERT OR REPLACE INTO technical_indicators 
-                    (symbol, timeframe, timestamp, indicators)
-                    VALUES (?, ?, ?, ?)
-                ''', (symbol, timeframe, timestamp, json.dumps(indicators)))
-                conn.commit()
+            self._enqueue_write('''
+                INSERT OR REPLACE INTO technical_indicators 
+                (symbol, timeframe, timestamp, indicators)
+                VALUES (?, ?, ?, ?)
+            ''', (symbol, timeframe, timestamp, json.dumps(indicators)))
         except Exception as e:
             logger.error(f"Erro ao salvar indicadores técnicos: {e}")
     
@@ -539,14 +795,12 @@ class DatabaseManager:
     
     # Métodos para logs
     def save_log(self, level: str, message: str, module: Optional[str] = None):
-        """Salvar log do sistema"""
+        """Salvar log do sistema (gravado no próximo commit em lote)"""
         try:
-            with self.get_connection() as conn:
-                conn.execute('''
-                    INSERT INTO system_logs (level, message, module)
-                    VALUES (?, ?, ?)
-                ''', (level, message, module))
-                conn.commit()
+            self._enqueue_write('''
+                INSERT INTO system_logs (level, message, module)
+                VALUES (?, ?, ?)
+            ''', (level, message, module))
         except Exception as e:
             # Não logar erro de log para evitar recursão
             pass
@@ -555,6 +809,7 @@ class DatabaseManager:
                 hours: int = 24) -> List[Dict]:
         """Obter logs do sistema"""
         try:
+            self.flush()
             with self.get_connection() as conn:
                 start_time = datetime.now() - timedelta(hours=hours)
                 
@@ -577,6 +832,7 @@ class DatabaseManager:
     def cleanup_old_data(self, days_to_keep: int = 90):
         """Limpar dados antigos"""
         try:
+            self.flush()
             with self.get_connection() as conn:
                 cutoff_date = datetime.now() - timedelta(days=days_to_keep)
                 
@@ -597,8 +853,14 @@ class DatabaseManager:
     def backup_database(self, backup_path: str):
         """Fazer backup do banco de dados"""
         try:
-            import shutil
-            shutil.copy2(self.db_path, backup_path)
+            # Com WAL, copiar o arquivo não inclui o que ainda está no -wal: usar a API de backup
+            self.flush()
+            with self.get_connection() as conn:
+                target = sqlite3.connect(backup_path)
+                try:
+                    conn.backup(target)
+                finally:
+                    target.close()
             logger.info(f"Backup criado: {backup_path}")
         except Exception as e:
             logger.error(f"Erro ao criar backup: {e}")
@@ -606,6 +868,8 @@ class DatabaseManager:
     def get_database_stats(self) -> Dict:
         """Obter estatísticas do banco de dados"""
         try:
+            # Contagens incluem sinais, indicadores e logs ainda na fila
+            self.flush()
             with self.get_connection() as conn:
                 stats = {}
                 
@@ -618,6 +882,7 @@ class DatabaseManager:
                 
                 # Tamanho do arquivo
                 stats['file_size_mb'] = os.path.getsize(self.db_path) / (1024 * 1024)
+                stats['pool'] = self.get_pool_stats()
                 
                 return stats
         except Exception as e:
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Política de dtypes dos frames de features
+
+Os indicadores, features de padrões, sentimento e regime saem como float64,
+int64 e colunas object (rótulos como 'Uptrend' repetidos em todas as linhas).
+A política é aplicada ao frame final de features:
+  - float64 -> float32 (exceto OHLCV, que mantém a precisão do preço)
+  - flags 0/1 inteiras -> int8 (colunas bool continuam bool)
+  - rótulos de texto -> category (comparações com strings continuam valendo)
+
+O frame é remontado uma única vez, já consolidado. to_model_matrix entrega
+as entradas dos modelos como arrays float32 contíguos.
+"""
+
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class DtypePolicy:
+    """Conversão de dtypes de um frame de features"""
+
+    def __init__(self, float_dtype: str = 'float32', keep_float64: Iterable[str] = OHLCV_COLUMNS,
+                 downcast_flags: bool = True, categorical_labels: bool = True):
+        self.float_dtype = np.dtype(float_dtype)
+        self.keep_float64 = frozenset(keep_float64)
+        self.downcast_flags = downcast_flags
+        self.categorical_labels = categorical_labels
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Frame com os dtypes da política (o original não é modificado)"""
+        if df.empty or not df.columns.is_unique:
+            return df
+
+        try:
+            converted = {}
+            dtypes = df.dtypes
+
+            floats = [col for col, dtype in dtypes.items()
+                      if dtype == np.float64 and col not in self.keep_float64]
+            if floats and self.float_dtype != np.float64:
+                values = df[floats].to_numpy(dtype=self.float_dtype)
+                converted.update((col, values[:, i]) for i, col in enumerate(floats))
+
+            if self.downcast_flags:
+                integers = [col for col, dtype in dtypes.items() if dtype.kind in 'iu' and dtype.itemsize > 1]
+                if integers:
+                    values = df[integers].to_numpy(dtype=np.int64)
+                    flags = (values.min(axis=0) >= 0) & (values.max(axis=0) <= 1)
+                    converted.update((col, values[:, i].astype(np.int8))
+                                     for i, col in enumerate(integers) if flags[i])
+
+            if self.categorical_labels:
+                for col, dtype in dtypes.items():
+                    if dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) == 'string':
+                        codes, labels = pd.factorize(df[col].to_numpy(), sort=True)
+                        converted[col] = pd.Categorical.from_codes(codes, labels)
+
+            if not converted:
+                return df
+            return pd.DataFrame({col: converted[col] if col in converted else df[col] for col in df.columns},
+                                index=df.index)
+        except Exception as e:
+            logger.error(f"Erro ao aplicar política de dtypes: {e}")
+            return df
+
+
+def to_model_matrix(X, dtype=np.float32) -> np.ndarray:
+    """Entrada de modelo como array 2D contíguo (float32 por padrão)"""
+    values = X.to_numpy(dtype=dtype) if isinstance(X, pd.DataFrame) else np.asarray(X, dtype=dtype)
+    return np.ascontiguousarray(values)
+
+
+def get_dtype_policy(config=None) -> Optional[DtypePolicy]:
+    """Política configurada em DTYPE_POLICY (None se desabilitada)"""
+    settings: Dict = getattr(config, 'DTYPE_POLICY', None) or {}
+    if not settings.get('enabled', True):
+        return None
+
+    return DtypePolicy(
+        float_dtype=settings.get('float_dtype', 'float32'),
+        keep_float64=settings.get('keep_float64', OHLCV_COLUMNS),
+        downcast_flags=settings.get('downcast_flags', True),
+        categorical_labels=settings.get('categorical_labels', True),
+    )
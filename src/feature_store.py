@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Feature store compartilhado entre SignalGenerator, MarketAnalyzer e AITradingEngine
+
+Guarda os frames já calculados (indicadores técnicos e features da IA) por
+(symbol, timeframe, timestamp do último candle), para que cada fechamento de
+candle seja processado uma única vez por todo o pipeline de sinais. Resultados
+em dict (ex.: predições do UltraFastAIEngine) também podem ser guardados.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple, Union
+
+import pandas as pd
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class _FeatureEntry:
+    """Frames calculados para um mesmo conjunto de candles"""
+
+    def __init__(self, signature: Tuple):
+        self.signature = signature
+        self.frames: Dict[str, Union[pd.DataFrame, Dict]] = {}
+        self.nbytes = 0
+        self.created_at = time.monotonic()
+
+
+class FeatureStore:
+    """Cache LRU com TTL e orçamento de memória para frames de features"""
+
+    def __init__(self, max_entries: int = 128, ttl_seconds: float = 900,
+                 max_memory_mb: float = 256):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self._entries: 'OrderedDict[Tuple, _FeatureEntry]' = OrderedDict()
+        self._compute_locks: Dict[Tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._memory_bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+
+    def get_or_compute(self, symbol: str, timeframe: str, df: pd.DataFrame, kind: str,
+                       compute: Callable[[pd.DataFrame], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Retornar o frame `kind` para os candles de df, calculando-o apenas se
+        ainda não existir no store. O frame retornado é uma cópia do armazenado.
+        """
+        frame = self.get(symbol, timeframe, df, kind)
+        if frame is not None:
+            return frame
+
+        if df is None or df.empty:
+            return compute(df)
+
+        # Um cálculo por (série, candle, tipo): chamadas concorrentes esperam o primeiro
+        key = self._key(symbol, timeframe, df)
+        with self._lock:
+            compute_lock = self._compute_locks.setdefault(key + (kind,), threading.Lock())
+
+        try:
+            with compute_lock:
+                frame = self.get(symbol, timeframe, df, kind, count=False)
+                if frame is not None:
+                    return frame
+
+                frame = compute(df)
+                if frame is not None and not frame.empty:
+                    self.put(symbol, timeframe, df, kind, frame)
+                    frame = frame.copy()
+                return frame
+        finally:
+            # Também quando compute levanta: senão o lock da chave fica no dicionário para sempre
+            with self._lock:
+                self._compute_locks.pop(key + (kind,), None)
+
+    def get(self, symbol: str, timeframe: str, df: pd.DataFrame, kind: str,
+            count: bool = True) -> Optional[Union[pd.DataFrame, Dict]]:
+        """Frame (ou dict) armazenado para os candles de df, ou None"""
+        if df is None or df.empty:
+            return None
+
+        key = self._key(symbol, timeframe, df)
+        signature = self._signature(df)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                self._remove(key)
+                self.stats['expired'] += 1
+                entry = None
+
+            # O candle aberto muda sem trocar o timestamp: a assinatura protege contra frames velhos
+            if entry is None or entry.signature != signature or kind not in entry.frames:
+                if count:
+                    self.stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if count:
+                self.stats['hits'] += 1
+            return entry.frames[kind].copy()
+
+    def put(self, symbol: str, timeframe: str, df: pd.DataFrame, kind: str,
+            frame: Union[pd.DataFrame, Dict]):
+        """Armazenar um frame (ou dict de resultados) calculado para os candles de df"""
+        key = self._key(symbol, timeframe, df)
+        signature = self._signature(df)
+        nbytes = _nbytes(frame)
+
+        with self._lock:
+            # Só o último candle de cada série é útil: descartar os anteriores
+            for stale in [k for k in self._entries if k[:2] == key[:2] and k != key]:
+                self._remove(stale)
+
+            entry = self._entries.get(key)
+            if entry is None or entry.signature != signature or self._expired(entry):
+                if entry is not None:
+                    self._remove(key)
+                entry = _FeatureEntry(signature)
+                self._entries[key] = entry
+
+            if kind in entry.frames:
+                previous = _nbytes(entry.frames[kind])
+                entry.nbytes -= previous
+                self._memory_bytes -= previous
+
+            entry.frames[kind] = frame
+            entry.nbytes += nbytes
+            self._memory_bytes += nbytes
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def invalidate(self, symbol: Optional[str] = None, timeframe: Optional[str] = None):
+        """Remover entradas de uma série (ou todas)"""
+        with self._lock:
+            for key in list(self._entries):
+                if symbol is None or (key[0] == symbol and (timeframe is None or key[1] == timeframe)):
+                    self._remove(key)
+
+    def get_stats(self) -> Dict:
+        """Estatísticas de uso do store"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'entries': len(self._entries),
+                'memory_mb': round(self._memory_bytes / (1024 * 1024), 2),
+                'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+            }
+
+    @staticmethod
+    def _key(symbol: str, timeframe: str, df: pd.DataFrame) -> Tuple:
+        return (symbol, timeframe, df.index[-1])
+
+    @staticmethod
+    def _signature(df: pd.DataFrame) -> Tuple:
+        """Tamanho, primeiro candle e valores do último candle"""
+        columns = [col for col in OHLCV_COLUMNS if col in df.columns]
+        # Leitura escalar por coluna: df[columns].iloc[-1] copiaria as colunas inteiras
+        last_row = tuple(float(df[col].iat[-1]) for col in columns)
+        return (len(df), df.index[0], last_row)
+
+    def _expired(self, entry: _FeatureEntry) -> bool:
+        return self.ttl_seconds > 0 and time.monotonic() - entry.created_at > self.ttl_seconds
+
+    def _remove(self, key: Tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry.nbytes
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 self._memory_bytes > self.max_memory_bytes):
+            key, _ = next(iter(self._entries.items()))
+            self._remove(key)
+            self.stats['evictions'] += 1
+
+
+def _nbytes(value: Union[pd.DataFrame, Dict]) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    # dict de resultados: estimativa rasa (chaves e valores de primeiro nível)
+    return sys.getsizeof(value) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+
+
+_feature_store: Optional[FeatureStore] = None
+_feature_store_lock = threading.Lock()
+
+
+def get_feature_store(config=None) -> FeatureStore:
+    """Instância compartilhada do feature store (configurada na primeira chamada)"""
+    global _feature_store
+    with _feature_store_lock:
+        if _feature_store is None:
+            settings = getattr(config, 'FEATURE_STORE', None) or {}
+            _feature_store = FeatureStore(
+                max_entries=settings.get('max_entries', 128),
+                ttl_seconds=settings.get('ttl_seconds', 900),
+                max_memory_mb=settings.get('max_memory_mb', 256),
+            )
+        return _feature_store
+
+
+def _reset_locks_after_fork():
+    # Processos filhos (varredura concorrente) herdam locks possivelmente
+    # adquiridos por outras threads do pai no momento do fork
+    global _feature_store_lock
+    _feature_store_lock = threading.Lock()
+    if _feature_store is not None:
+        _feature_store._lock = threading.Lock()
+        _feature_store._compute_locks.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_locks_after_fork)
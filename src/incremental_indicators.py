@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Motor incremental de indicadores técnicos
+
+Mantém, por série (symbol, timeframe), o estado da última chamada de
+calculate_all_indicators. Quando o novo DataFrame apenas estende a série
+(novos candles e/ou revisão do candle aberto), os indicadores recursivos
+(EMA, MACD, RSI, ATR, ADX) são continuados a partir do estado carregado e os
+padrões de candlestick são avaliados apenas nas linhas novas.
+
+O resultado é idêntico, bit a bit, ao do cálculo completo.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import ta
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class ContinuationError(Exception):
+    """Estado insuficiente para continuar a série incrementalmente"""
+
+
+class IndicatorContext:
+    """
+    Contexto de cálculo passado para TechnicalIndicators.
+
+    Com start == 0 o contexto apenas calcula a série inteira e registra os
+    acumuladores; com start > 0 as linhas anteriores a start são reaproveitadas
+    da saída anterior e somente as linhas novas são calculadas.
+    """
+
+    def __init__(self, start: int = 0, previous: Optional[pd.DataFrame] = None,
+                 accumulators: Optional[Dict[str, np.ndarray]] = None):
+        self.start = start
+        self.previous = previous
+        self.previous_accumulators = accumulators or {}
+        self.accumulators: Dict[str, np.ndarray] = {}
+
+    @property
+    def continuing(self) -> bool:
+        return self.start > 0
+
+    def _seed(self, key: str) -> np.ndarray:
+        """Acumulador da chamada anterior para a chave informada"""
+        values = self.previous_accumulators.get(key)
+        if values is None or len(values) < self.start:
+            raise ContinuationError(f"acumulador ausente: {key}")
+        return values
+
+    def _store(self, key: str, values: np.ndarray, index: pd.Index) -> pd.Series:
+        self.accumulators[key] = values
+        return pd.Series(values, index=index)
+
+    def ema(self, key: str, series: pd.Series, window: int) -> pd.Series:
+        """EMA no formato do ta (span=window, min_periods=window, adjust=False)"""
+        return self._ewm(key, series, span=window, min_periods=window)
+
+    def _ewm(self, key: str, series: pd.Series, min_periods: int, **params) -> pd.Series:
+        if not self.continuing:
+            result = series.ewm(min_periods=min_periods, adjust=False, **params).mean()
+            return self._store(key, result.to_numpy(dtype=np.float64), series.index)
+
+        previous = self._seed(key)
+        seed = previous[self.start - 1]
+        if np.isnan(seed):
+            raise ContinuationError(f"semente indefinida: {key}")
+
+        # Com adjust=False cada passo depende apenas do valor anterior, então
+        # prefixar a semente reproduz exatamente a recursão do pandas
+        tail = np.concatenate(([seed], series.to_numpy(dtype=np.float64)[self.start:]))
+        continued = pd.Series(tail).ewm(adjust=False, **params).mean().to_numpy()[1:]
+        values = np.concatenate((previous[:self.start], continued))
+        return self._store(key, values, series.index)
+
+    def rsi(self, key: str, close: pd.Series, window: int) -> pd.Series:
+        """RSI no formato do ta.momentum.rsi"""
+        diff = close.diff(1)
+        up_direction = diff.where(diff > 0, 0.0)
+        down_direction = -diff.where(diff < 0, 0.0)
+        emaup = self._ewm(f'{key}_up', up_direction, alpha=1 / window, min_periods=window)
+        emadn = self._ewm(f'{key}_down', down_direction, alpha=1 / window, min_periods=window)
+        relative_strength = emaup / emadn
+        return pd.Series(
+            np.where(emadn == 0, 100, 100 - (100 / (1 + relative_strength))),
+            index=close.index,
+        )
+
+    def atr(self, key: str, high: pd.Series, low: pd.Series, close: pd.Series,
+            window: int) -> pd.Series:
+        """ATR de Wilder no formato do ta.volatility.average_true_range"""
+        if not self.continuing:
+            result = ta.volatility.average_true_range(high, low, close, window=window)
+            return self._store(key, result.to_numpy(dtype=np.float64), close.index)
+
+        if self.start <= window:
+            raise ContinuationError(f"histórico curto para {key}")
+
+        previous = self._seed(key)
+        h = high.to_numpy(dtype=np.float64)
+        l = low.to_numpy(dtype=np.float64)
+        c = close.to_numpy(dtype=np.float64)
+
+        atr = np.empty(len(c))
+        atr[:self.start] = previous[:self.start]
+        for i in range(self.start, len(c)):
+            true_range = max(h[i] - l[i], abs(h[i] - c[i - 1]), abs(l[i] - c[i - 1]))
+            atr[i] = (atr[i - 1] * (window - 1) + true_range) / float(window)
+
+        return self._store(key, atr, close.index)
+
+    def adx(self, key: str, high: pd.Series, low: pd.Series, close: pd.Series,
+            window: int) -> Tuple[pd.Series, pd.Series, pd.Series]:
+        """ADX, +DI e -DI no formato do ta.trend (adx, adx_pos, adx_neg)"""
+        index = close.index
+        length = len(close)
+
+        if not self.continuing:
+            indicator = ta.trend.ADXIndicator(high, low, close, window=window)
+            adx = indicator.adx().to_numpy(dtype=np.float64)
+            adx_pos = indicator.adx_pos().to_numpy(dtype=np.float64)
+            adx_neg = indicator.adx_neg().to_numpy(dtype=np.float64)
+
+            # Estados suavizados de Wilder alinhados por posição do candle
+            # (o ta guarda _trs[i] referente ao candle window + i)
+            trs = np.full(length, np.nan)
+            dip = np.full(length, np.nan)
+            din = np.full(length, np.nan)
+            valid = max(length - window, 0)
+            trs[window:window + valid] = indicator._trs[:valid]
+            dip[window:window + valid] = indicator._dip[:valid]
+            din[window:window + valid] = indicator._din[:valid]
+
+            self.accumulators[f'{key}_trs'] = trs
+            self.accumulators[f'{key}_dip'] = dip
+            self.accumulators[f'{key}_din'] = din
+            return (self._store(key, adx, index),
+                    self._store(f'{key}_pos', adx_pos, index),
+                    self._store(f'{key}_neg', adx_neg, index))
+
+        if self.start <= 2 * window:
+            raise ContinuationError(f"histórico curto para {key}")
+
+        trs = np.empty(length)
+        dip = np.empty(length)
+        din = np.empty(length)
+        adx = np.empty(length)
+        adx_pos = np.empty(length)
+        adx_neg = np.empty(length)
+        for name, target in ((f'{key}_trs', trs), (f'{key}_dip', dip), (f'{key}_din', din),
+                             (key, adx), (f'{key}_pos', adx_pos), (f'{key}_neg', adx_neg)):
+            target[:self.start] = self._seed(name)[:self.start]
+
+        h = high.to_numpy(dtype=np.float64)
+        l = low.to_numpy(dtype=np.float64)
+        c = close.to_numpy(dtype=np.float64)
+
+        for i in range(self.start, length):
+            directional_movement = max(h[i], c[i - 1]) - min(l[i], c[i - 1])
+            diff_up = h[i] - h[i - 1]
+            diff_down = l[i - 1] - l[i]
+            pos = abs(diff_up) if (diff_up > diff_down and diff_up > 0) else 0.0
+            neg = abs(diff_down) if (diff_down > diff_up and diff_down > 0) else 0.0
+
+            trs[i] = trs[i - 1] - (trs[i - 1] / float(window)) + directional_movement
+            dip[i] = dip[i - 1] - (dip[i - 1] / float(window)) + pos
+            din[i] = din[i - 1] - (din[i - 1] / float(window)) + neg
+
+            adx_pos[i] = 100 * (dip[i] / trs[i])
+            adx_neg[i] = 100 * (din[i] / trs[i])
+            directional_index = 100 * abs((adx_pos[i] - adx_neg[i]) / (adx_pos[i] + adx_neg[i]))
+            adx[i] = ((adx[i - 1] * (window - 1)) + directional_index) / float(window)
+
+        self.accumulators[f'{key}_trs'] = trs
+        self.accumulators[f'{key}_dip'] = dip
+        self.accumulators[f'{key}_din'] = din
+        return (self._store(key, adx, index),
+                self._store(f'{key}_pos', adx_pos, index),
+                self._store(f'{key}_neg', adx_neg, index))
+
+    def splice(self, df: pd.DataFrame, compute: Callable[[pd.DataFrame], pd.DataFrame],
+               context_rows: int) -> pd.DataFrame:
+        """
+        Aplicar um bloco de colunas locais (ex.: padrões de candlestick).
+
+        O bloco é calculado apenas sobre as linhas novas mais context_rows
+        candles anteriores; as demais linhas vêm da saída anterior.
+        """
+        if not self.continuing:
+            return compute(df)
+
+        begin = max(self.start - context_rows, 0)
+        tail = compute(df.iloc[begin:].copy())
+        new_columns = [col for col in tail.columns if col not in df.columns]
+
+        missing = [col for col in new_columns if col not in self.previous.columns]
+        if missing:
+            raise ContinuationError(f"colunas ausentes na saída anterior: {missing}")
+
+        for col in new_columns:
+            head = self.previous[col].iloc[:self.start]
+            df[col] = pd.concat([head, tail[col].iloc[self.start - begin:]]).to_numpy()
+
+        return df
+
+
+class _SeriesState:
+    """Snapshot da entrada, saída e acumuladores de uma série"""
+
+    def __init__(self, df: pd.DataFrame, output: pd.DataFrame,
+                 accumulators: Dict[str, np.ndarray]):
+        self.columns = tuple(df.columns)
+        self.index = df.index.to_numpy()
+        self.values = df.to_numpy(dtype=np.float64)
+        self.output = output
+        self.accumulators = accumulators
+
+
+class IncrementalIndicatorEngine:
+    """Cache de estado por (symbol, timeframe) para cálculo incremental"""
+
+    def __init__(self, max_series: int = 64, min_history: int = 100):
+        self.max_series = max_series
+        self.min_history = min_history
+        self._states: 'OrderedDict[Tuple[str, str], _SeriesState]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'full': 0, 'incremental': 0, 'unchanged': 0, 'bypass': 0}
+
+    def calculate(self, technical_indicators, df: pd.DataFrame,
+                  symbol: str, timeframe: str) -> pd.DataFrame:
+        """Calcular indicadores reaproveitando o estado da série, se possível"""
+        if not self._is_supported(df):
+            self._count('bypass')
+            return technical_indicators.calculate_all_indicators(df)
+
+        key = (symbol, timeframe)
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+
+        start = self._extension_start(state, df) if state is not None else None
+
+        if start is not None and start == len(df) and len(df) == len(state.index):
+            self._count('unchanged')
+            return state.output.copy()
+
+        if start is not None and start >= self.min_history:
+            context = IndicatorContext(start, state.output, state.accumulators)
+            try:
+                output = technical_indicators._calculate_indicators(df.copy(), context)
+                self._save(key, df, output, context)
+                self._count('incremental')
+                return output.copy()
+            except Exception as e:
+                logger.debug(f"Continuação incremental indisponível para {symbol} {timeframe}: {e}")
+
+        context = IndicatorContext()
+        result = df.copy()
+        try:
+            output = technical_indicators._calculate_indicators(result, context)
+        except Exception as e:
+            logger.error(f"Erro ao calcular indicadores: {e}")
+            self.reset(symbol, timeframe)
+            return result
+
+        self._save(key, df, output, context)
+        self._count('full')
+        return output.copy()
+
+    def reset(self, symbol: Optional[str] = None, timeframe: Optional[str] = None):
+        """Descartar o estado de uma série (ou de todas)"""
+        with self._lock:
+            if symbol is None:
+                self._states.clear()
+                return
+            for key in [k for k in self._states
+                        if k[0] == symbol and (timeframe is None or k[1] == timeframe)]:
+                del self._states[key]
+
+    def get_stats(self) -> Dict:
+        """Contadores de uso do motor incremental"""
+        with self._lock:
+            return {**self.stats, 'series': len(self._states)}
+
+    @staticmethod
+    def _is_supported(df: pd.DataFrame) -> bool:
+        # Só entradas OHLCV puras, sem NaN: colunas extras poderiam ser
+        # sobrescritas pelo cálculo e não fazem parte do snapshot
+        if df is None or df.empty or set(df.columns) != set(OHLCV_COLUMNS):
+            return False
+        try:
+            return not np.isnan(df.to_numpy(dtype=np.float64)).any()
+        except (TypeError, ValueError):
+            return False
+
+    @staticmethod
+    def _extension_start(state: _SeriesState, df: pd.DataFrame) -> Optional[int]:
+        """Primeira linha que difere do snapshot, ou None se não for extensão"""
+        if tuple(df.columns) != state.columns or len(df) < len(state.index):
+            return None
+
+        index = df.index.to_numpy()
+        if index.dtype != state.index.dtype or index[0] != state.index[0]:
+            return None
+
+        common = len(state.index)
+        values = df.to_numpy(dtype=np.float64)[:common]
+        changed = (values != state.values).any(axis=1) | (index[:common] != state.index)
+        positions = np.flatnonzero(changed)
+        return int(positions[0]) if len(positions) else common
+
+    def _save(self, key: Tuple[str, str], df: pd.DataFrame, output: pd.DataFrame,
+              context: IndicatorContext):
+        state = _SeriesState(df, output, context.accumulators)
+        with self._lock:
+            self._states[key] = state
+            self._states.move_to_end(key)
+            while len(self._states) > self.max_series:
+                self._states.popitem(last=False)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+
+# Instância global compartilhada pelos consumidores de indicadores
+incremental_indicator_engine = IncrementalIndicatorEngine()
+
+
+def _reset_lock_after_fork():
+    # Lock herdado no fork pode ter ficado adquirido por outra thread do pai
+    incremental_indicator_engine._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_lock_after_fork)
@@ -6,13 +6,17 @@ Implementação simplificada de LSTM sem TensorFlow
 
 import numpy as np
 import pandas as pd
-from typing import Tuple, List, Optional
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, Tuple, List, Optional
 import logging
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 
 logger = logging.getLogger(__name__)
 
+# Pesos de cada célula LSTM (serializados pelo registro de modelos)
+CELL_WEIGHT_NAMES = ('Wf', 'bf', 'Wi', 'bi', 'Wc', 'bc', 'Wo', 'bo')
+
 class SimpleLSTMCell:
     """Célula LSTM simplificada usando apenas NumPy"""
     
@@ -75,6 +79,40 @@ class SimpleLSTMCell:
         h = o * self.tanh(c)
         
         return h, c
+    
+    def forward_batch(self, inputs: np.ndarray) -> np.ndarray:
+        """Forward pass de um lote de sequências: (batch, passos, input) -> hidden (batch, passos, hidden)"""
+        batch_size, seq_length, _ = inputs.shape
+        hidden = self.hidden_size
+        
+        # Gates empilhados em uma única matriz: forget, input e output (sigmoid) e candidate (tanh)
+        weights = np.vstack((self.Wf, self.Wi, self.Wo, self.Wc))
+        bias = np.vstack((self.bf, self.bi, self.bo, self.bc)).ravel()
+        W_x = np.ascontiguousarray(weights[:, :self.input_size].T)
+        W_h = np.ascontiguousarray(weights[:, self.input_size:].T)
+        
+        # Projeção da entrada de todos os passos em uma multiplicação matriz-matriz,
+        # em ordem (passo, batch, gate) para que cada passo leia um bloco contíguo
+        time_major = np.ascontiguousarray(inputs.transpose(1, 0, 2))
+        input_gates = (time_major.reshape(-1, self.input_size) @ W_x + bias).reshape(seq_length, batch_size, -1)
+        
+        h = np.zeros((batch_size, hidden))
+        c = np.zeros((batch_size, hidden))
+        outputs = np.empty((seq_length, batch_size, hidden))
+        
+        for t in range(seq_length):
+            gates = input_gates[t] + h @ W_h
+            sigmoid_gates = self.sigmoid(gates[:, :3 * hidden])
+            f = sigmoid_gates[:, :hidden]
+            i = sigmoid_gates[:, hidden:2 * hidden]
+            o = sigmoid_gates[:, 2 * hidden:]
+            c_tilde = self.tanh(gates[:, 3 * hidden:])
+            
+            c = f * c + i * c_tilde
+            h = o * self.tanh(c)
+            outputs[t] = h
+        
+        return outputs.transpose(1, 0, 2)
 
 class SimpleLSTM:
     """Modelo LSTM simplificado para séries temporais"""
@@ -97,15 +135,39 @@ class SimpleLSTM:
         self.scaler = MinMaxScaler()
         self.is_fitted = False
         
+    @property
+    def architecture(self) -> dict:
+        """Parâmetros de construção do modelo"""
+        return {'input_size': self.input_size, 'hidden_size': self.hidden_size,
+                'num_layers': self.num_layers, 'sequence_length': self.sequence_length}
+    
+    def get_weights(self) -> Dict[str, np.ndarray]:
+        """Pesos das células e da camada de saída"""
+        weights = {f'layer{layer}.{name}': getattr(cell, name)
+                   for layer, cell in enumerate(self.cells) for name in CELL_WEIGHT_NAMES}
+        weights['W_out'] = self.W_out
+        weights['b_out'] = self.b_out
+        return weights
+    
+    @classmethod
+    def from_weights(cls, weights: Dict[str, np.ndarray], architecture: dict) -> 'SimpleLSTM':
+        """Recriar o modelo a partir de get_weights() (o scaler é restaurado à parte)"""
+        model = cls(**architecture)
+        for layer, cell in enumerate(model.cells):
+            for name in CELL_WEIGHT_NAMES:
+                setattr(cell, name, weights[f'layer{layer}.{name}'])
+        model.W_out = weights['W_out']
+        model.b_out = weights['b_out']
+        return model
+    
     def create_sequences(self, data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        """Criar sequências para treinamento"""
-        X, y = [], []
-        
-        for i in range(len(data) - self.sequence_length):
-            X.append(data[i:(i + self.sequence_length)])
-            y.append(data[i + self.sequence_length])
+        """Criar sequências para treinamento (janelas como view, sem cópia)"""
+        if len(data) <= self.sequence_length:
+            return np.array([]), np.array([])
         
-        return np.array(X), np.array(y)
+        X = sliding_window_view(data, self.sequence_length)[:-1]
+        y = data[self.sequence_length:]
+        return X, y
     
     def fit(self, data: np.ndarray, epochs: int = 50, learning_rate: float = 0.001):
         """Treinar o modelo LSTM"""
@@ -128,19 +190,13 @@ class SimpleLSTM:
             # Em um modelo real, implementaríamos backpropagation
             # Aqui vamos simular o processo de aprendizagem
             
+            # Sem backpropagation os pesos não mudam entre épocas:
+            # o erro de todas as sequências é calculado em um único forward pass
+            errors = (self._forward_batch(X) - y) ** 2
+            
             best_loss = float('inf')
             for epoch in range(epochs):
-                total_loss = 0
-                
-                for i in range(len(X)):
-                    # Forward pass
-                    prediction = self._forward_sequence(X[i])
-                    
-                    # Calcular erro
-                    error = (prediction - y[i]) ** 2
-                    total_loss += error
-                
-                avg_loss = total_loss / len(X)
+                avg_loss = np.sum(errors) / len(X)
                 
                 if avg_loss < best_loss:
                     best_loss = avg_loss
@@ -156,28 +212,17 @@ class SimpleLSTM:
     
     def _forward_sequence(self, sequence: np.ndarray) -> float:
         """Forward pass para uma sequência"""
-        # Inicializar estados ocultos e de célula
-        h_states = [np.zeros((self.hidden_size, 1)) for _ in range(self.num_layers)]
-        c_states = [np.zeros((self.hidden_size, 1)) for _ in range(self.num_layers)]
-        
-        # Processar sequência
-        for t in range(len(sequence)):
-            x = np.array([[sequence[t]]])
-            
-            # Passar por cada camada LSTM
-            for layer in range(self.num_layers):
-                if layer == 0:
-                    input_data = x
-                else:
-                    input_data = h_states[layer-1]
-                
-                h_states[layer], c_states[layer] = self.cells[layer].forward(
-                    input_data, h_states[layer], c_states[layer]
-                )
+        return self._forward_batch(sequence[np.newaxis])[0]
+    
+    def _forward_batch(self, sequences: np.ndarray) -> np.ndarray:
+        """Forward pass para um lote de sequências (batch, passos)"""
+        layer_output = sequences[:, :, np.newaxis]
+        for cell in self.cells:
+            layer_output = cell.forward_batch(layer_output)
         
-        # Camada de saída
-        output = np.dot(self.W_out, h_states[-1]) + self.b_out
-        return output[0, 0]
+        # Camada de saída a partir do último hidden state de cada sequência
+        output = layer_output[:, -1] @ self.W_out.T + self.b_out
+        return output[:, 0]
     
     def predict(self, data: np.ndarray, steps_ahead: int = 1) -> np.ndarray:
         """Fazer previsões"""
@@ -226,13 +271,8 @@ class SimpleLSTM:
             if len(X_test) == 0:
                 return {'mse': float('inf'), 'mae': float('inf'), 'accuracy': 0.0}
             
-            # Fazer previsões
-            predictions = []
-            for sequence in X_test:
-                pred = self._forward_sequence(sequence)
-                predictions.append(pred)
-            
-            predictions = np.array(predictions)
+            # Fazer previsões (todas as janelas em um único forward pass)
+            predictions = self._forward_batch(X_test)
             
             # Desnormalizar
             y_test_original = self.scaler.inverse_transform(y_test.reshape(-1, 1)).flatten()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Registro em disco dos modelos LSTM treinados
+
+Cada modelo (tipo, símbolo, timeframe) é salvo em um único arquivo .npz sem compressão
+com os pesos das células, a camada de saída, o MinMaxScaler e um JSON de
+metadados: arquitetura, janela de dados do treino (primeiro/último candle) e
+métricas. Na inicialização apenas os metadados são lidos; o .npz é aberto de
+forma preguiçosa (np.load só lê o diretório do zip) e os pesos de cada modelo
+são lidos na primeira vez que ele é usado.
+
+Um modelo salvo é reaproveitado enquanto os dados não avançarem mais que
+staleness_candles candles além do fim da janela de treino.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+META_KEY = '__meta__'
+SCALER_ATTRIBUTES = ('min_', 'scale_', 'data_min_', 'data_max_', 'data_range_', 'n_samples_seen_')
+
+# Constrói o modelo a partir dos arrays salvos e da arquitetura registrada
+ModelBuilder = Callable[[Dict[str, np.ndarray], Dict], object]
+
+
+class LSTMModelRegistry:
+    """Modelos LSTM por (tipo, símbolo, timeframe) persistidos em .npz"""
+
+    def __init__(self, directory: str = 'models/lstm', staleness_candles: int = 24):
+        self.directory = directory
+        self.staleness_candles = staleness_candles
+        self._entries: Dict[Tuple[str, str, str], Dict] = {}
+        self._models: Dict[Tuple[str, str, str], object] = {}
+        self._lock = threading.Lock()
+        self.stats = {'loaded': 0, 'reused': 0, 'stale': 0, 'saved': 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def get_entry(self, kind: str, symbol: str, timeframe: str) -> Optional[Dict]:
+        """Metadados do modelo salvo, se existir"""
+        with self._lock:
+            entry = self._entries.get((kind, symbol, timeframe))
+            return dict(entry) if entry is not None else None
+
+    def load(self, kind: str, symbol: str, timeframe: str, builder: ModelBuilder) -> Optional[object]:
+        """Modelo salvo (lido do disco na primeira chamada), independente da idade"""
+        key = (kind, symbol, timeframe)
+        with self._lock:
+            model = self._models.get(key)
+            entry = self._entries.get(key)
+        if model is not None or entry is None:
+            return model
+
+        try:
+            with np.load(self._path(kind, symbol, timeframe), allow_pickle=False) as arrays:
+                weights = {name: arrays[name] for name in arrays.files if name != META_KEY}
+            model = builder(weights, entry['architecture'])
+            _restore_scaler(model.scaler, weights)
+            model.is_fitted = True
+        except Exception as e:
+            logger.error(f"Erro ao carregar modelo LSTM {kind} de {symbol} {timeframe}: {e}")
+            return None
+
+        with self._lock:
+            self._models[key] = model
+            self.stats['loaded'] += 1
+        return model
+
+    def get_fresh(self, kind: str, symbol: str, timeframe: str, index: pd.Index, builder: ModelBuilder,
+                  **expected) -> Optional[Tuple[object, Dict]]:
+        """
+        Modelo salvo e seus metadados, se ainda estiver atual para os candles
+        de index e se os metadados coincidirem com `expected` (ex.: features)
+        """
+        entry = self.get_entry(kind, symbol, timeframe)
+        if entry is None or self.is_stale(entry, index):
+            # Outro processo (ex.: pipeline de treino offline) pode ter salvo uma versão mais nova
+            entry = self.refresh(kind, symbol, timeframe)
+        if entry is None:
+            return None
+
+        if any(entry.get(name) != value for name, value in expected.items()) or self.is_stale(entry, index):
+            self._count('stale')
+            return None
+
+        model = self.load(kind, symbol, timeframe, builder)
+        if model is None:
+            return None
+        self._count('reused')
+        return model, entry
+
+    def refresh(self, kind: str, symbol: str, timeframe: str) -> Optional[Dict]:
+        """Reler os metadados do arquivo; descarta o modelo em memória se o arquivo mudou"""
+        key = (kind, symbol, timeframe)
+        try:
+            with np.load(self._path(kind, symbol, timeframe), allow_pickle=False) as arrays:
+                entry = json.loads(str(arrays[META_KEY]))
+        except FileNotFoundError:
+            return self.get_entry(kind, symbol, timeframe)
+        except Exception as e:
+            logger.warning(f"Falha ao reler modelo LSTM {kind} de {symbol} {timeframe}: {e}")
+            return self.get_entry(kind, symbol, timeframe)
+
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is None or previous.get('saved_at') != entry.get('saved_at'):
+                self._entries[key] = entry
+                self._models.pop(key, None)
+        return dict(entry)
+
+    def is_stale(self, entry: Dict, index: pd.Index) -> bool:
+        """Os dados avançaram mais que staleness_candles além do fim do treino?"""
+        trained_to = entry.get('trained_to')
+        if trained_to is None or not isinstance(index, pd.DatetimeIndex) or len(index) == 0:
+            return True
+        new_candles = int(np.count_nonzero(index.asi8 > trained_to))
+        return new_candles > self.staleness_candles
+
+    def save(self, kind: str, symbol: str, timeframe: str, model, index: pd.Index, **metadata):
+        """Salvar pesos, scaler e janela de treino do modelo (escrita atômica)"""
+        key = (kind, symbol, timeframe)
+        is_datetime = isinstance(index, pd.DatetimeIndex) and len(index) > 0
+        entry = {
+            'kind': kind,
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'architecture': model.architecture,
+            'trained_from': int(index.asi8[0]) if is_datetime else None,
+            'trained_to': int(index.asi8[-1]) if is_datetime else None,
+            'rows': len(index),
+            'saved_at': time.time(),
+            **metadata,
+        }
+
+        arrays = dict(model.get_weights())
+        arrays.update(_scaler_arrays(model.scaler))
+        arrays[META_KEY] = np.array(json.dumps(entry, default=float))
+
+        path = self._path(kind, symbol, timeframe)
+        # Arquivo temporário único no mesmo diretório: escritas concorrentes não se sobrepõem
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                np.savez(file, **arrays)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.error(f"Erro ao salvar modelo LSTM {kind} de {symbol} {timeframe}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+
+        with self._lock:
+            self._entries[key] = json.loads(json.dumps(entry, default=float))
+            self._models[key] = model
+            self.stats['saved'] += 1
+
+    def get_stats(self) -> Dict:
+        """Contadores de uso do registro"""
+        with self._lock:
+            return {**self.stats, 'models': len(self._entries), 'in_memory': len(self._models)}
+
+    def _scan(self):
+        """Ler apenas os metadados dos modelos salvos"""
+        started = time.perf_counter()
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith('.npz'):
+                continue
+            try:
+                with np.load(os.path.join(self.directory, filename), allow_pickle=False) as arrays:
+                    entry = json.loads(str(arrays[META_KEY]))
+                if 'timeframe' not in entry:
+                    # Arquivo anterior ao timeframe na chave: o treino salva de novo por timeframe
+                    continue
+                self._entries[(entry['kind'], entry['symbol'], entry['timeframe'])] = entry
+            except Exception as e:
+                logger.warning(f"Modelo LSTM ignorado ({filename}): {e}")
+
+        if self._entries:
+            logger.info(f"💾 {len(self._entries)} modelos LSTM registrados em "
+                        f"{(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def _path(self, kind: str, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.directory, f"{kind}_{quote(symbol, safe='')}_{quote(timeframe, safe='')}.npz")
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+
+def _scaler_arrays(scaler) -> Dict[str, np.ndarray]:
+    arrays = {f'scaler.{name}': np.asarray(getattr(scaler, name)) for name in SCALER_ATTRIBUTES}
+    arrays['scaler.feature_range'] = np.asarray(scaler.feature_range, dtype=np.float64)
+    return arrays
+
+
+def _restore_scaler(scaler, arrays: Dict[str, np.ndarray]):
+    for name in SCALER_ATTRIBUTES:
+        value = np.array(arrays[f'scaler.{name}'])
+        setattr(scaler, name, value if value.ndim else value.item())
+    scaler.n_features_in_ = len(scaler.scale_)
+    scaler.feature_range = tuple(arrays['scaler.feature_range'].tolist())
+
+
+_lstm_registry: Optional[LSTMModelRegistry] = None
+_lstm_registry_lock = threading.Lock()
+
+
+def get_lstm_registry(config=None) -> Optional[LSTMModelRegistry]:
+    """Instância compartilhada do registro (None se desabilitado na configuração)"""
+    global _lstm_registry
+    settings = getattr(config, 'LSTM_REGISTRY', None) or {}
+    if not settings.get('enabled', True):
+        return None
+
+    with _lstm_registry_lock:
+        if _lstm_registry is None:
+            _lstm_registry = LSTMModelRegistry(
+                directory=settings.get('directory', os.path.join('models', 'lstm')),
+                staleness_candles=settings.get('staleness_candles', 24),
+            )
+        return _lstm_registry
+
+
+def _reset_locks_after_fork():
+    # Processos filhos (varredura concorrente) herdam locks possivelmente
+    # adquiridos por outras threads do pai no momento do fork
+    global _lstm_registry_lock
+    _lstm_registry_lock = threading.Lock()
+    if _lstm_registry is not None:
+        _lstm_registry._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_locks_after_fork)
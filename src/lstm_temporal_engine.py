@@ -6,12 +6,15 @@ Implementação manual de LSTM para sequências temporais sem TensorFlow
 
 import numpy as np
 import pandas as pd
-from typing import Tuple, List, Optional
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, Tuple, List, Optional
 import logging
 from datetime import datetime
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 
+from .lstm_registry import get_lstm_registry
+
 logger = logging.getLogger(__name__)
 
 def sigmoid(x):
@@ -22,6 +25,15 @@ def tanh(x):
     """Função tangente hiperbólica"""
     return np.tanh(np.clip(x, -500, 500))
 
+# Pesos de cada célula LSTM (serializados pelo registro de modelos)
+CELL_WEIGHT_NAMES = ('Wf', 'bf', 'Wi', 'bi', 'Wc', 'bc', 'Wo', 'bo')
+
+def sequence_windows(data: np.ndarray, sequence_length: int) -> np.ndarray:
+    """Todas as janelas data[i:i+sequence_length] como view (janelas, passos, features), sem cópia"""
+    if len(data) < sequence_length:
+        return np.empty((0, sequence_length) + data.shape[1:], dtype=data.dtype)
+    return np.moveaxis(sliding_window_view(data, sequence_length, axis=0), -1, 1)
+
 class SimpleLSTMCell:
     """Célula LSTM simplificada"""
     
@@ -74,6 +86,43 @@ class SimpleLSTMCell:
         h = o * tanh(c)
         
         return h, c
+    
+    def forward_batch(self, inputs: np.ndarray) -> np.ndarray:
+        """Forward pass de um lote de sequências: (batch, passos, input) -> hidden (batch, passos, hidden)"""
+        batch_size, seq_length, _ = inputs.shape
+        hidden = self.hidden_size
+        if batch_size == 0:
+            # Série menor que a janela: nenhum passo a calcular (reshape com lote vazio falharia)
+            return np.empty((0, seq_length, hidden))
+        
+        # Gates empilhados em uma única matriz: forget, input e output (sigmoid) e candidate (tanh)
+        weights = np.vstack((self.Wf, self.Wi, self.Wo, self.Wc))
+        bias = np.vstack((self.bf, self.bi, self.bo, self.bc)).ravel()
+        W_x = np.ascontiguousarray(weights[:, :self.input_size].T)
+        W_h = np.ascontiguousarray(weights[:, self.input_size:].T)
+        
+        # Projeção da entrada de todos os passos em uma multiplicação matriz-matriz,
+        # em ordem (passo, batch, gate) para que cada passo leia um bloco contíguo
+        time_major = np.ascontiguousarray(inputs.transpose(1, 0, 2))
+        input_gates = (time_major.reshape(-1, self.input_size) @ W_x + bias).reshape(seq_length, batch_size, -1)
+        
+        h = np.zeros((batch_size, hidden))
+        c = np.zeros((batch_size, hidden))
+        outputs = np.empty((seq_length, batch_size, hidden))
+        
+        for t in range(seq_length):
+            gates = input_gates[t] + h @ W_h
+            sigmoid_gates = sigmoid(gates[:, :3 * hidden])
+            f = sigmoid_gates[:, :hidden]
+            i = sigmoid_gates[:, hidden:2 * hidden]
+            o = sigmoid_gates[:, 2 * hidden:]
+            c_candidate = tanh(gates[:, 3 * hidden:])
+            
+            c = f * c + i * c_candidate
+            h = o * tanh(c)
+            outputs[t] = h
+        
+        return outputs.transpose(1, 0, 2)
 
 class CustomLSTM:
     """Modelo LSTM customizado para análise temporal"""
@@ -96,42 +145,50 @@ class CustomLSTM:
         self.scaler = MinMaxScaler()
         self.is_fitted = False
         
+    @property
+    def architecture(self) -> dict:
+        """Parâmetros de construção do modelo"""
+        return {'input_size': self.input_size, 'hidden_size': self.hidden_size,
+                'num_layers': self.num_layers, 'dropout': self.dropout}
+    
+    def get_weights(self) -> Dict[str, np.ndarray]:
+        """Pesos das células e da camada de saída"""
+        weights = {f'layer{layer}.{name}': getattr(cell, name)
+                   for layer, cell in enumerate(self.lstm_cells) for name in CELL_WEIGHT_NAMES}
+        weights['output_weights'] = self.output_weights
+        weights['output_bias'] = self.output_bias
+        return weights
+    
+    @classmethod
+    def from_weights(cls, weights: Dict[str, np.ndarray], architecture: dict) -> 'CustomLSTM':
+        """Recriar o modelo a partir de get_weights() (o scaler é restaurado à parte)"""
+        model = cls(**architecture)
+        for layer, cell in enumerate(model.lstm_cells):
+            for name in CELL_WEIGHT_NAMES:
+                setattr(cell, name, weights[f'layer{layer}.{name}'])
+        model.output_weights = weights['output_weights']
+        model.output_bias = weights['output_bias']
+        return model
+    
     def prepare_sequences(self, data: np.ndarray, sequence_length: int = 20, target_column: int = 0) -> Tuple[np.ndarray, np.ndarray]:
         """Preparar sequências para treinamento"""
-        sequences = []
-        targets = []
-        
-        for i in range(sequence_length, len(data)):
-            sequences.append(data[i-sequence_length:i])
-            targets.append(data[i, target_column])
-            
-        return np.array(sequences), np.array(targets)
+        sequences = sequence_windows(data, sequence_length)[:-1]
+        targets = data[sequence_length:, target_column]
+        return sequences, targets
     
     def forward(self, sequence: np.ndarray) -> float:
         """Forward pass para uma sequência"""
-        seq_length, features = sequence.shape
-        
-        # Estados iniciais
-        h_states = [np.zeros((self.hidden_size, 1)) for _ in range(self.num_layers)]
-        c_states = [np.zeros((self.hidden_size, 1)) for _ in range(self.num_layers)]
-        
-        # Processar sequência
-        for t in range(seq_length):
-            x = sequence[t]
-            
-            for layer in range(self.num_layers):
-                if layer == 0:
-                    input_data = x
-                else:
-                    input_data = h_states[layer-1].flatten()
-                
-                h_states[layer], c_states[layer] = self.lstm_cells[layer].forward(
-                    input_data, h_states[layer], c_states[layer]
-                )
+        return self.forward_batch(sequence[np.newaxis])[0]
+    
+    def forward_batch(self, sequences: np.ndarray) -> np.ndarray:
+        """Forward pass para um lote de sequências (batch, passos, features)"""
+        layer_output = sequences
+        for cell in self.lstm_cells:
+            layer_output = cell.forward_batch(layer_output)
         
-        # Saída final
-        output = np.dot(self.output_weights, h_states[-1]) + self.output_bias
-        return output[0, 0]
+        # Saída final a partir do último hidden state de cada sequência
+        output = layer_output[:, -1] @ self.output_weights.T + self.output_bias
+        return output[:, 0]
     
     def fit(self, X: np.ndarray, y: np.ndarray, sequence_length: int = 20, epochs: int = 50) -> dict:
         """Treinar o modelo LSTM"""
@@ -153,28 +210,18 @@ class CustomLSTM:
             X_train, X_val = X_seq[:split_idx], X_seq[split_idx:]
             y_train, y_val = y_seq[:split_idx], y_seq[split_idx:]
             
-            # Treinamento simplificado (sem backpropagation completa)
+            # Treinamento simplificado (sem backpropagation completa): os pesos não
+            # mudam entre épocas, então as predições são calculadas uma única vez
+            train_preds = self.forward_batch(X_train)
+            val_preds = self.forward_batch(X_val)
+            
             train_losses = []
             val_losses = []
             
             for epoch in range(min(epochs, 20)):  # Limitar épocas para performance
-                # Predições de treino
-                train_preds = []
-                for i in range(len(X_train)):
-                    pred = self.forward(X_train[i])
-                    train_preds.append(pred)
-                
-                train_preds = np.array(train_preds)
                 train_loss = mean_squared_error(y_train, train_preds)
                 train_losses.append(train_loss)
                 
-                # Predições de validação
-                val_preds = []
-                for i in range(len(X_val)):
-                    pred = self.forward(X_val[i])
-                    val_preds.append(pred)
-                
-                val_preds = np.array(val_preds)
                 val_loss = mean_squared_error(y_val, val_preds)
                 val_losses.append(val_loss)
                 
@@ -210,16 +257,11 @@ class CustomLSTM:
             # Normalizar dados
             X_scaled = self.scaler.transform(X)
             
-            # Preparar sequências para predição
-            predictions = []
-            
-            for i in range(sequence_length, len(X_scaled)):
-                sequence = X_scaled[i-sequence_length:i]
-                pred = self.forward(sequence)
-                predictions.append(pred)
+            # Todas as janelas em um único forward pass
+            predictions = self.forward_batch(sequence_windows(X_scaled, sequence_length)[:-1])
             
             # Preencher primeiros valores com média
-            full_predictions = np.full(len(X), np.mean(predictions) if predictions else 0)
+            full_predictions = np.full(len(X), np.mean(predictions) if len(predictions) else 0)
             full_predictions[sequence_length:] = predictions
             
             return full_predictions
@@ -251,10 +293,11 @@ class LSTMTimeSeriesAnalyzer:
     def __init__(self, config):
         self.config = config
         self.models = {}
+        self.registry = get_lstm_registry(config)  # Modelos treinados persistidos em disco
         self.sequence_length = 20
         self.prediction_horizon = [1, 3, 6, 12]  # Horizontes de predição em períodos
         
-    def analyze_temporal_patterns(self, df: pd.DataFrame, symbol: str) -> dict:
+    def analyze_temporal_patterns(self, df: pd.DataFrame, symbol: str, timeframe: str = '1h') -> dict:
         """Analisar padrões temporais com LSTM"""
         try:
             logger.info(f"🕰️ Iniciando análise temporal LSTM para {symbol}")
@@ -275,18 +318,37 @@ class LSTMTimeSeriesAnalyzer:
             # Target: retorno futuro
             y = df['close'].pct_change(periods=3).shift(-3).fillna(0).values
             
-            # Criar e treinar modelo
-            lstm_model = CustomLSTM(
-                input_size=len(available_features),
-                hidden_size=30,
-                num_layers=2
-            )
-            
-            # Treinar modelo
-            training_result = lstm_model.fit(X, y, self.sequence_length)
-            
-            if not training_result['success']:
-                return training_result
+            # Reaproveitar o modelo salvo enquanto os dados não avançarem além do limite
+            saved = None
+            if self.registry is not None:
+                saved = self.registry.get_fresh('temporal', symbol, timeframe, df.index, CustomLSTM.from_weights,
+                                                features=available_features,
+                                                sequence_length=self.sequence_length)
+            
+            if saved is not None:
+                lstm_model, entry = saved
+                training_result = entry['training_metrics']
+                logger.info(f"♻️ Modelo LSTM reaproveitado para {symbol} (treinado até "
+                            f"{pd.Timestamp(entry['trained_to'])})")
+            else:
+                # Criar e treinar modelo
+                lstm_model = CustomLSTM(
+                    input_size=len(available_features),
+                    hidden_size=30,
+                    num_layers=2
+                )
+                
+                # Treinar modelo
+                training_result = lstm_model.fit(X, y, self.sequence_length)
+                
+                if not training_result['success']:
+                    return training_result
+                
+                if self.registry is not None:
+                    self.registry.save('temporal', symbol, timeframe, lstm_model, df.index,
+                                       features=available_features,
+                                       sequence_length=self.sequence_length,
+                                       training_metrics=training_result)
             
             # Fazer predições
             predictions = lstm_model.predict(X, self.sequence_length)
@@ -300,7 +362,7 @@ class LSTMTimeSeriesAnalyzer:
             volatility_forecast = self._calculate_volatility_forecast(predictions)
             
             # Salvar modelo
-            self.models[symbol] = lstm_model
+            self.models[(symbol, timeframe)] = lstm_model
             
             result = {
                 'success': True,
@@ -358,12 +420,19 @@ class LSTMTimeSeriesAnalyzer:
         # Volatilidade das predições
         return float(np.std(predictions[-10:]))
     
-    def get_lstm_features(self, df: pd.DataFrame, symbol: str) -> dict:
+    def get_lstm_features(self, df: pd.DataFrame, symbol: str, timeframe: str = '1h') -> dict:
         """Extrair features LSTM para integração com IA"""
         try:
+            # Modelo em memória ou salvo no registro (carregado na primeira vez)
+            key = (symbol, timeframe)
+            if key not in self.models and self.registry is not None:
+                saved_model = self.registry.load('temporal', symbol, timeframe, CustomLSTM.from_weights)
+                if saved_model is not None:
+                    self.models[key] = saved_model
+            
             # Se modelo já existe, usar para predições
-            if symbol in self.models:
-                model = self.models[symbol]
+            if key in self.models:
+                model = self.models[key]
                 
                 # Features básicas
                 features = ['close', 'volume', 'rsi', 'macd', 'bb_upper', 'bb_lower']
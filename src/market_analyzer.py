@@ -28,17 +28,20 @@ from .technical_indicators import TechnicalIndicators
 from .market_data import MarketDataManager
 from .ai_engine import AITradingEngine
 from .config import Config
+from .feature_store import FeatureStore, get_feature_store
 
 logger = logging.getLogger(__name__)
 
 class MarketAnalyzer:
     """Analisador de mercado com IA para identificar oportunidades de alta precisão"""
     
-    def __init__(self, config: Config, market_data_manager: MarketDataManager, ai_engine: AITradingEngine):
+    def __init__(self, config: Config, market_data_manager: MarketDataManager, ai_engine: AITradingEngine,
+                 feature_store: Optional[FeatureStore] = None):
         self.config = config
         self.market_data = market_data_manager
         self.ai_engine = ai_engine
         self.technical_indicators = TechnicalIndicators(config)
+        self.feature_store = feature_store or get_feature_store(config)
         self.market_context = {}
         self.last_analysis_time = {}
         self.market_regimes = {}
@@ -47,8 +50,12 @@ class MarketAnalyzer:
         self.sentiment_scores = {}
         self.liquidity_scores = {}
         
-    def analyze_market_context(self, symbol: str, timeframe: str) -> Dict:
-        """Analisa o contexto geral do mercado para o ativo"""
+    def analyze_market_context(self, symbol: str, timeframe: str,
+                               candles: Optional[pd.DataFrame] = None) -> Dict:
+        """Analisa o contexto geral do mercado para o ativo
+
+        candles permite reaproveitar os dados já obtidos pelo chamador.
+        """
         try:
             # Verificar se precisamos atualizar a análise
             current_time = datetime.now()
@@ -63,13 +70,13 @@ class MarketAnalyzer:
                 return self.market_context.get(key, {})
             
             # Obter dados históricos
-            df = self.market_data.get_historical_data(symbol, timeframe, limit=500)
+            df = candles if candles is not None else self.market_data.get_historical_data(symbol, timeframe, limit=500)
             if df.empty:
                 logger.error(f"Sem dados para análise de mercado: {symbol} {timeframe}")
                 return {}
             
-            # Calcular indicadores técnicos
-            df = self.technical_indicators.calculate_all_indicators(df)
+            # Calcular indicadores técnicos (uma vez por candle via feature store)
+            df = self.get_indicator_frame(symbol, timeframe, df)
             
             # Análises específicas
             market_context = {}
@@ -817,11 +824,25 @@ class MarketAnalyzer:
             logger.error(f"Erro no cálculo do score de mercado: {e}")
             return 0.5
     
-    def get_trade_recommendation(self, symbol: str, timeframe: str) -> Dict:
-        """Gera uma recomendação de trade com base na análise de mercado e IA"""
+    def get_indicator_frame(self, symbol: str, timeframe: str, candles: pd.DataFrame) -> pd.DataFrame:
+        """Indicadores técnicos dos candles, calculados uma única vez por candle"""
+        return self.feature_store.get_or_compute(
+            symbol, timeframe, candles, 'indicators',
+            lambda data: self.technical_indicators.calculate_all_indicators(data, symbol, timeframe))
+    
+    def get_trade_recommendation(self, symbol: str, timeframe: str,
+                                 candles: Optional[pd.DataFrame] = None) -> Dict:
+        """Gera uma recomendação de trade com base na análise de mercado e IA
+
+        candles permite reaproveitar os dados já obtidos pelo chamador.
+        """
         try:
+            # Obter dados históricos uma única vez para todo o pipeline
+            if candles is None:
+                candles = self.market_data.get_historical_data(symbol, timeframe, limit=500)
+            
             # Analisar contexto de mercado
-            market_context = self.analyze_market_context(symbol, timeframe)
+            market_context = self.analyze_market_context(symbol, timeframe, candles)
             market_score = market_context.get('market_score', 0.5)
             
             # Verificar se o score de mercado atende ao mínimo configurado
@@ -843,12 +864,14 @@ class MarketAnalyzer:
                 }
             
             # Obter dados históricos
-            df = self.market_data.get_historical_data(symbol, timeframe, limit=500)
+            df = candles
             if df.empty:
                 logger.error(f"Sem dados para recomendação de trade: {symbol} {timeframe}")
                 return {}
               # Preparar features para o modelo de IA
-            df = self.ai_engine.prepare_features(df)            # Obter previsão do modelo de IA (sem timeframe - não usado pelo método)
+            df = self.feature_store.get_or_compute(
+                symbol, timeframe, candles, 'features',
+                lambda data: self.ai_engine.prepare_features(data, symbol, timeframe))            # Obter previsão do modelo de IA (sem timeframe - não usado pelo método)
             ai_prediction = self.ai_engine.predict_signal(df, symbol)
             
             # Extrair sinal e confiança do modelo de IA
@@ -861,11 +884,9 @@ class MarketAnalyzer:
             # IMPORTANTE: Respeitar decisão da IA e não sobrescrever BUY/SELL explícitos
             logger.info(f"🧠 IA decidiu: '{signal_text}' → Recomendação final: '{recommendation}' (confiança: {confidence:.3f})")            # Se IA decidiu HOLD, tentar usar análise técnica como backup
             if recommendation == 'hold':  # Sempre tentar melhorar HOLD, independente da confiança
-                # Calcular indicadores técnicos se ainda não foi feito
+                # Indicadores técnicos já calculados para este candle
                 if 'df_with_tech' not in locals():
-                    from .technical_indicators import TechnicalIndicators
-                    tech_indicators = TechnicalIndicators(self.config)
-                    df_with_tech = tech_indicators.calculate_all_indicators(df.copy())
+                    df_with_tech = self.get_indicator_frame(symbol, timeframe, candles)
                 
                 # Análise técnica como backup para HOLD
                 tech_backup = self._simple_technical_analysis(df_with_tech)
@@ -933,9 +954,7 @@ class MarketAnalyzer:
                 risk_reward = abs(take_profit - current_price) / abs(current_price - stop_loss)
               # Obter análise técnica separadamente para incluir no resultado
             if 'df_with_tech' not in locals():
-                from .technical_indicators import TechnicalIndicators
-                tech_indicators = TechnicalIndicators(self.config)
-                df_with_tech = tech_indicators.calculate_all_indicators(df.copy())
+                df_with_tech = self.get_indicator_frame(symbol, timeframe, candles)
             
             # Análise técnica simplificada para usar como tiebreaker
             tech_analysis = self._simple_technical_analysis(df_with_tech)
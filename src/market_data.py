@@ -14,9 +14,18 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from .realtime_price_api import realtime_price_api
+from .async_ohlcv_fetcher import AsyncOHLCVFetcher, AIOHTTP_AVAILABLE, MAX_KLINES_LIMIT
+from .candle_store import CandleDiskCache, CandleStore
 
 logger = logging.getLogger(__name__)
 
+# Origem dos candles (df.attrs['source']); sem marcação = endpoint de klines da exchange
+KLINES_SOURCE = 'klines'
+
+def candle_source(df: pd.DataFrame) -> str:
+    """Origem marcada no DataFrame de candles"""
+    return df.attrs.get('source', KLINES_SOURCE)
+
 @dataclass
 class MarketData:
     """Estrutura de dados de mercado"""
@@ -34,12 +43,17 @@ class MarketDataManager:
     def __init__(self, config):
         self.config = config
         self.exchanges = {}
-        self.data_cache = {}
+        self.data_cache = self._create_candle_store()
         self.is_running = False
         self.update_thread = None
         self.demo_mode = False
         self.use_public_apis = True  # Usar APIs públicas por padrão
         self.startup_mode = True  # Modo startup para otimização inicial
+        self.fallback_series = set()  # Séries servidas com dados de fallback (CoinGecko, demo)
+        
+        # Cliente assíncrono de klines (sessão HTTP compartilhada + rate limit por peso)
+        self.ohlcv_fetcher = AsyncOHLCVFetcher.from_config(config) if AIOHTTP_AVAILABLE else None
+        self.http_session = requests.Session()  # keep-alive para o backup CoinGecko
         
         # Inicializar exchanges e APIs públicas
         self._initialize_exchanges()
@@ -107,7 +121,11 @@ class MarketDataManager:
         self.is_running = False
         if self.update_thread:
             self.update_thread.join()
-          # Parar API de preços em tempo real
+        
+        if self.ohlcv_fetcher:
+            self.ohlcv_fetcher.close()
+        
+        # Parar API de preços em tempo real
         realtime_price_api.stop()
         
         logger.info("Feed de dados parado")
@@ -121,9 +139,9 @@ class MarketDataManager:
                 startup_timeframes = self.config.get_startup_timeframes()  # Apenas 1h
                 
                 # Atualizar dados de criptomoedas (reduzido de 140 para 3 chamadas)
-                for symbol in startup_pairs:
-                    for timeframe in startup_timeframes:
-                        self._update_crypto_data(symbol, timeframe)
+                self._update_crypto_data_batch([(symbol, timeframe)
+                                                for symbol in startup_pairs
+                                                for timeframe in startup_timeframes])
                 
                 # Não atualizar forex (já removido)
                 # time.sleep(60) - aumentar intervalo para 5 minutos durante startup
@@ -134,55 +152,189 @@ class MarketDataManager:
                 time.sleep(30)
     
     def _update_crypto_data(self, symbol: str, timeframe: str):
-        """Atualizar dados de criptomoeda usando APIs públicas"""
+        """Atualizar dados de criptomoeda usando APIs públicas (apenas candles novos se já houver cache)"""
+        cache_key = f"{symbol}_{timeframe}"
+        delta = self._delta_request(cache_key, timeframe)
         try:
-            # Priorizar APIs públicas sobre dados simulados
-            if not self.demo_mode and self.use_public_apis:
-                # Tentar Binance público primeiro
-                df = self._fetch_from_binance_public(symbol, timeframe)
-            elif not self.demo_mode and not self.use_public_apis:
-                # Usar API privada com chaves
-                exchange = self.exchanges['binance']
-                ohlcv = exchange.fetch_ohlcv(symbol, timeframe, limit=500)
-                
-                df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                df.set_index('timestamp', inplace=True)
+            if delta is not None:
+                since, limit = delta
+                df = self._fetch_crypto_candles(symbol, timeframe, since, limit)
+                if len(df) >= limit:
+                    # Mais candles faltando que o previsto (relógio, falha de rede): histórico completo
+                    df = self._fetch_crypto_candles(symbol, timeframe)
             else:
-                # Fallback para dados simulados
-                df = self._generate_demo_data(symbol, timeframe)
+                df = self._fetch_crypto_candles(symbol, timeframe)
             
             # Armazenar no cache
-            cache_key = f"{symbol}_{timeframe}"
-            self.data_cache[cache_key] = df
+            self._store_candles(cache_key, df)
             
         except Exception as e:
             logger.error(f"Erro ao atualizar dados crypto {symbol} {timeframe}: {e}")
+            if cache_key in self.data_cache:
+                return  # Manter o histórico já obtido
             # Fallback para dados simulados
             try:
                 df = self._generate_demo_data(symbol, timeframe)
-                cache_key = f"{symbol}_{timeframe}"
-                self.data_cache[cache_key] = df
+                self._store_candles(cache_key, df)
             except Exception as e2:
                 logger.error(f"Erro ao gerar dados simulados: {e2}")
     
-    def _fetch_from_binance_public(self, symbol: str, timeframe: str) -> pd.DataFrame:
-        """Buscar dados da Binance pública (método simplificado)"""
-        try:
-            if 'binance_public' not in self.exchanges:
-                raise ValueError("Binance público não inicializado")
-                
-            exchange = self.exchanges['binance_public']
-            logger.info(f"Buscando {symbol} da Binance pública")
-              # Buscar dados
-            ohlcv = exchange.fetch_ohlcv(symbol, timeframe, limit=500)
-            
-            if not ohlcv or len(ohlcv) == 0:
-                raise ValueError("Nenhum dado retornado")
+    def _fetch_crypto_candles(self, symbol: str, timeframe: str, since: Optional[int] = None,
+                              limit: int = 500) -> pd.DataFrame:
+        """Buscar candles na fonte ativa; com since (ms) busca apenas a partir desse candle"""
+        # Priorizar APIs públicas sobre dados simulados
+        if not self.demo_mode and self.use_public_apis:
+            # Tentar Binance público primeiro
+            return self._fetch_from_binance_public(symbol, timeframe, since, limit)
+        elif not self.demo_mode and not self.use_public_apis:
+            # Usar API privada com chaves
+            exchange = self.exchanges['binance']
+            ohlcv = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
             
             df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
             df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
             df.set_index('timestamp', inplace=True)
+            return df
+        else:
+            # Fallback para dados simulados
+            return self._generate_demo_data(symbol, timeframe)
+    
+    def _delta_request(self, cache_key: str, timeframe: str) -> Optional[Tuple[int, int]]:
+        """
+        (since em ms, limit) para buscar apenas os candles que faltam na série,
+        ou None quando é preciso o histórico completo (série vazia ou lacuna longa).
+        """
+        last_timestamp = self.data_cache.last_timestamp(cache_key)
+        if last_timestamp is None or cache_key in self.fallback_series:
+            return None  # Série de fallback é substituída pelo histórico real completo
+        
+        since = last_timestamp // 1_000_000
+        timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        missing = int(max(0, time.time() * 1000 - since) // timeframe_ms) + 1
+        if missing >= MAX_KLINES_LIMIT:
+            return None
+        
+        # Limite sempre acima do esperado: resposta completa tem menos linhas que o limite
+        delta_limit = self.config.MARKET_DATA_FETCH.get('delta_limit', 99)
+        return since, max(delta_limit, missing + 1)
+    
+    def _store_candles(self, cache_key: str, df: pd.DataFrame):
+        """
+        Mesclar candles novos no histórico da série.
+        
+        O último candle em cache (ainda aberto) é substituído pela versão nova;
+        dados que não continuam o histórico o substituem. O histórico fica
+        limitado a max_history_candles por série e só vai para o cache em
+        disco quando os candles vieram do endpoint de klines da exchange.
+        
+        Dados de fallback (CoinGecko sem since/limit, granularidade própria e
+        volume fictício; dados simulados) nunca são mesclados ao histórico da
+        exchange nem o substituem: só preenchem uma série vazia, e a próxima
+        busca bem-sucedida na exchange troca a série inteira.
+        """
+        source = candle_source(df)
+        if source != KLINES_SOURCE and not self.demo_mode:
+            if cache_key in self.data_cache and cache_key not in self.fallback_series:
+                logger.warning(f"⚠️ Dados de {source} ignorados para {cache_key}: histórico da exchange mantido")
+                return
+            self.data_cache[cache_key] = df
+            self.fallback_series.add(cache_key)
+            return
+        
+        if cache_key in self.fallback_series:
+            self.fallback_series.discard(cache_key)
+            self.data_cache[cache_key] = df
+        else:
+            self.data_cache.merge(cache_key, df)
+        # Disco hidrata o histórico no próximo boot: nada de demo/fallback lá
+        if source == KLINES_SOURCE and not self.demo_mode:
+            self.data_cache.persist(cache_key)
+    
+    def _create_candle_store(self) -> CandleStore:
+        """Store de candles, hidratado a partir do cache em disco quando habilitado"""
+        settings = self.config.MARKET_DATA_FETCH
+        disk_cache = None
+        if settings.get('persist_candles', True):
+            try:
+                disk_cache = CandleDiskCache(settings.get('candle_cache_dir', 'data/candles'))
+            except Exception as e:
+                logger.error(f"Erro ao abrir cache de candles em disco: {e}")
+        
+        store = CandleStore(settings.get('max_history_candles', 1000), disk_cache)
+        started = time.perf_counter()
+        loaded = store.hydrate()
+        if loaded:
+            logger.info(f"💾 {loaded} séries carregadas do disco em {(time.perf_counter() - started) * 1000:.0f}ms")
+        return store
+    
+    def _update_crypto_data_batch(self, pairs: List[Tuple[str, str]]):
+        """Atualizar vários (symbol, timeframe) de uma vez, com requisições em paralelo"""
+        if not pairs:
+            return
+
+        if self.ohlcv_fetcher is None or self.demo_mode or not self.use_public_apis:
+            for symbol, timeframe in pairs:
+                self._update_crypto_data(symbol, timeframe)
+            return
+
+        requests_by_pair = {(self._to_binance_symbol(symbol), timeframe): (symbol, timeframe)
+                            for symbol, timeframe in pairs}
+        start_times, limits = {}, {}
+        for request, (symbol, timeframe) in requests_by_pair.items():
+            delta = self._delta_request(f"{symbol}_{timeframe}", timeframe)
+            if delta is not None:
+                start_times[request], limits[request] = delta
+
+        # Séries em cache só buscam os candles que faltam; as demais, o histórico completo
+        results = {}
+        try:
+            results = self.ohlcv_fetcher.fetch_many_sync(list(requests_by_pair), limit=500,
+                                                         start_times=start_times, limits=limits)
+        except Exception as e:
+            logger.warning(f"Busca em lote falhou, usando busca sequencial: {e}")
+
+        fetched = 0
+        for request, (symbol, timeframe) in requests_by_pair.items():
+            df = results.get(request)
+            complete = (isinstance(df, pd.DataFrame) and not df.empty and
+                        (request not in limits or len(df) < limits[request]))
+            if complete:
+                self._store_candles(f"{symbol}_{timeframe}", df)
+                fetched += 1
+            else:
+                # Par que falhou (ou delta incompleto) segue a cadeia de fallback (CoinGecko / demo)
+                self._update_crypto_data(symbol, timeframe)
+
+        logger.info(f"📦 Lote de dados: {fetched}/{len(pairs)} séries da Binance pública "
+                    f"({len(start_times)} incrementais)")
+
+    @staticmethod
+    def _to_binance_symbol(symbol: str) -> str:
+        """BTC/USDT -> BTCUSDT (formato da API REST da Binance)"""
+        return symbol.replace('/', '').upper()
+
+    def _fetch_from_binance_public(self, symbol: str, timeframe: str, since: Optional[int] = None,
+                                   limit: int = 500) -> pd.DataFrame:
+        """Buscar dados da Binance pública (método simplificado)"""
+        try:
+            logger.info(f"Buscando {symbol} da Binance pública")
+
+            if self.ohlcv_fetcher is not None:
+                df = self.ohlcv_fetcher.fetch_klines_sync(self._to_binance_symbol(symbol), timeframe,
+                                                          limit=limit, start_time=since)
+            else:
+                if 'binance_public' not in self.exchanges:
+                    raise ValueError("Binance público não inicializado")
+
+                exchange = self.exchanges['binance_public']
+                ohlcv = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+
+                if not ohlcv or len(ohlcv) == 0:
+                    raise ValueError("Nenhum dado retornado")
+
+                df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+                df.set_index('timestamp', inplace=True)
             
             logger.info(f"OK Dados reais da Binance obtidos: {len(df)} registros")
             logger.info(f"OK Ultimo preco: ${df['close'].iloc[-1]:.2f}")
@@ -221,6 +373,8 @@ class MarketDataManager:
                     df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
                     df.set_index('timestamp', inplace=True)
                     
+                    if exchange_name != 'binance_public':
+                        df.attrs['source'] = exchange_name
                     logger.info(f"OK Dados obtidos de {exchange_name}: {len(df)} registros")
                     return df
                     
@@ -301,7 +455,7 @@ class MarketDataManager:
             'days': days
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        response = self.http_session.get(url, params=params, timeout=10)
         response.raise_for_status()
         
         data = response.json()
@@ -323,6 +477,7 @@ class MarketDataManager:
         
         df = pd.DataFrame(df_data)
         df.set_index('timestamp', inplace=True)
+        df.attrs['source'] = 'coingecko'
         
         logger.info(f"OK Dados CoinGecko obtidos: {len(df)} registros")
         return df
@@ -415,6 +570,7 @@ class MarketDataManager:
                 current_price = close_price
             
             df = pd.DataFrame(data, index=timestamps)
+            df.attrs['source'] = 'demo'
             return df
             
         except Exception as e:
@@ -425,10 +581,9 @@ class MarketDataManager:
         """Obter dados históricos com carregamento sob demanda"""
         cache_key = f"{symbol}_{timeframe}"
         
-        # Se dados estão no cache, retornar
+        # Se dados estão no cache, retornar (cópia apenas dos últimos `limit` candles)
         if cache_key in self.data_cache:
-            df = self.data_cache[cache_key].copy()
-            return df.tail(limit) if len(df) > limit else df
+            return self.data_cache.to_dataframe(cache_key, limit)
         
         # Se não estiver no cache, carregar sob demanda
         logger.info(f"📊 Carregando dados sob demanda: {symbol} {timeframe}")
@@ -436,8 +591,7 @@ class MarketDataManager:
         
         # Retornar dados do cache ou DataFrame vazio
         if cache_key in self.data_cache:
-            df = self.data_cache[cache_key].copy()
-            return df.tail(limit) if len(df) > limit else df
+            return self.data_cache.to_dataframe(cache_key, limit)
         
         logger.warning(f"⚠️ Não foi possível carregar dados para {symbol} {timeframe}")
         return pd.DataFrame()
@@ -461,9 +615,9 @@ class MarketDataManager:
                     self._update_crypto_data(symbol, '1h')
                 
                 if cache_key in self.data_cache:
-                    df = self.data_cache[cache_key]
-                    if not df.empty:
-                        return df['close'].iloc[-1]
+                    closes = self.data_cache.column(cache_key, 'close', 1)  # view, sem cópia
+                    if len(closes):
+                        return closes[-1]
             else:
                 if self.config.is_crypto_pair(symbol):
                     exchange = self.exchanges['binance']
@@ -473,9 +627,9 @@ class MarketDataManager:
                     # Para forex, usar último preço do cache
                     cache_key = f"{symbol}_1h"
                     if cache_key in self.data_cache:
-                        df = self.data_cache[cache_key]
-                        if not df.empty:
-                            return df['close'].iloc[-1]
+                        closes = self.data_cache.column(cache_key, 'close', 1)  # view, sem cópia
+                        if len(closes):
+                            return closes[-1]
         except Exception as e:
             logger.error(f"Erro ao obter preço atual {symbol}: {e}")
             # Fallback para dados simulados
@@ -484,11 +638,12 @@ class MarketDataManager:
                 if cache_key not in self.data_cache:
                     df = self._generate_demo_data(symbol, '1h', 100)
                     self.data_cache[cache_key] = df
+                    self.fallback_series.add(cache_key)
                 
                 if cache_key in self.data_cache:
-                    df = self.data_cache[cache_key]
-                    if not df.empty:
-                        return df['close'].iloc[-1]
+                    closes = self.data_cache.column(cache_key, 'close', 1)  # view, sem cópia
+                    if len(closes):
+                        return closes[-1]
             except Exception as e2:
                 logger.error(f"Erro ao obter preço simulado: {e2}")
         
@@ -648,15 +803,11 @@ class MarketDataManager:
             all_pairs = self.config.get_all_pairs()
             all_timeframes = self.config.get_all_timeframes()
             
-            # Carregar em lotes pequenos para não sobrecarregar
-            for i, symbol in enumerate(all_pairs):
-                for j, timeframe in enumerate(all_timeframes):
-                    if f"{symbol}_{timeframe}" not in self.data_cache:
-                        self._update_crypto_data(symbol, timeframe)
-                        
-                        # Pausa entre chamadas para não sobrecarregar API
-                        if (i * len(all_timeframes) + j) % 5 == 0:
-                            time.sleep(1)  # Pausa a cada 5 chamadas
+            # Buscar tudo que falta em um único lote: o rate limit por peso do
+            # fetcher substitui as pausas fixas entre chamadas
+            missing = [(symbol, timeframe) for symbol in all_pairs for timeframe in all_timeframes
+                       if f"{symbol}_{timeframe}" not in self.data_cache]
+            self._update_crypto_data_batch(missing)
             
             logger.info("✅ Cobertura de dados expandida com sucesso")
             
@@ -13,18 +13,32 @@ from sklearn.preprocessing import StandardScaler
 from scipy import stats
 from datetime import datetime, timedelta
 
+from .regime_clustering import IncrementalRegimeClusterer
+from .rolling_kernels import rolling_lag1_autocorr
+
 logger = logging.getLogger(__name__)
 
+
 class MarketRegimeDetector:
     """Detector de regimes de mercado usando múltiplas metodologias"""
     
-    def __init__(self):
+    def __init__(self, config=None):
         self.regime_history = []
         self.regime_models = {}
         self.scaler = StandardScaler()
         
-    def detect_market_regimes(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Detectar regimes de mercado usando múltiplas metodologias"""
+        # Modelos de clustering persistentes por (symbol, timeframe)
+        clustering_settings = getattr(config, 'REGIME_CLUSTERING', None) or {}
+        self.clusterer = (IncrementalRegimeClusterer.from_config(config)
+                          if clustering_settings.get('incremental', True) else None)
+        
+    def detect_market_regimes(self, df: pd.DataFrame, symbol: Optional[str] = None,
+                              timeframe: Optional[str] = None) -> pd.DataFrame:
+        """Detectar regimes de mercado usando múltiplas metodologias
+
+        Com symbol/timeframe o clustering reaproveita o modelo da série e só
+        classifica os candles novos.
+        """
         try:
             logger.info("🏛️ Detectando regimes de mercado...")
             
@@ -38,7 +52,7 @@ class MarketRegimeDetector:
             df = self._detect_momentum_regimes(df)
             
             # 4. Detecção baseada em clustering
-            df = self._detect_clustering_regimes(df)
+            df = self._detect_clustering_regimes(df, symbol, timeframe)
             
             # 5. Detecção baseada em correlações
             df = self._detect_correlation_regimes(df)
@@ -88,26 +102,17 @@ class MarketRegimeDetector:
             if ma_signals:
                 ma_consensus = np.mean(ma_signals, axis=0)
                 slope_consensus = np.mean(slopes, axis=0) if slopes else np.zeros(len(df))
-                  # Classificar regime de tendência
-                trend_regime = []
-                for i in range(len(df)):
-                    ma_val = ma_consensus[i] if i < len(ma_consensus) else 0
-                    slope_val = slope_consensus[i] if i < len(slope_consensus) else 0
-                    
-                    if ma_val > 0.5 and slope_val > 0.001:
-                        regime = 'Strong Uptrend'
-                    elif ma_val > 0 and slope_val > 0:
-                        regime = 'Uptrend'
-                    elif ma_val < -0.5 and slope_val < -0.001:
-                        regime = 'Strong Downtrend'
-                    elif ma_val < 0 and slope_val < 0:
-                        regime = 'Downtrend'
-                    else:
-                        regime = 'Sideways'
-                    
-                    trend_regime.append(regime)
-                
-                df['trend_regime'] = trend_regime
+                # Classificar regime de tendência
+                df['trend_regime'] = np.select(
+                    [
+                        (ma_consensus > 0.5) & (slope_consensus > 0.001),
+                        (ma_consensus > 0) & (slope_consensus > 0),
+                        (ma_consensus < -0.5) & (slope_consensus < -0.001),
+                        (ma_consensus < 0) & (slope_consensus < 0)
+                    ],
+                    ['Strong Uptrend', 'Uptrend', 'Strong Downtrend', 'Downtrend'],
+                    default='Sideways'
+                )
             else:
                 df['trend_regime'] = 'Unknown'
             
@@ -144,55 +149,12 @@ class MarketRegimeDetector:
                 vol = returns.rolling(window).std() * np.sqrt(24)  # Anualizar (assumindo dados horários)
                 volatilities[f'vol_{window}'] = vol
                 df[f'volatility_{window}h'] = vol
-              # Percentis de volatilidade para classificação
-            vol_20 = volatilities['vol_20']
-              # Classificar regime de volatilidade
-            volatility_regime = []
-            for i, vol in enumerate(vol_20):
-                if pd.isna(vol):
-                    regime = 'Unknown'
-                else:
-                    try:
-                        if i < 100:
-                            # Usar percentis globais para início da série
-                            if len(vol_20.dropna()) < 5:  # Dados insuficientes
-                                regime = 'Unknown'
-                            else:
-                                p20 = vol_20.quantile(0.2)
-                                p40 = vol_20.quantile(0.4)
-                                p60 = vol_20.quantile(0.6)
-                                p80 = vol_20.quantile(0.8)
-                        else:
-                            # Usar percentis móveis
-                            recent_vol = vol_20.iloc[max(0, i-100):i]
-                            if len(recent_vol.dropna()) < 5:  # Dados insuficientes
-                                regime = 'Unknown'
-                            else:
-                                p20 = recent_vol.quantile(0.2)
-                                p40 = recent_vol.quantile(0.4)
-                                p60 = recent_vol.quantile(0.6)
-                                p80 = recent_vol.quantile(0.8)
-                        
-                        # Classificar apenas se temos percentis válidos
-                        if regime != 'Unknown':
-                            if pd.isna(p20) or pd.isna(p40) or pd.isna(p60) or pd.isna(p80):
-                                regime = 'Unknown'
-                            elif vol <= p20:
-                                regime = 'Very Low Vol'
-                            elif vol <= p40:
-                                regime = 'Low Vol'
-                            elif vol <= p60:
-                                regime = 'Normal Vol'
-                            elif vol <= p80:
-                                regime = 'High Vol'
-                            else:
-                                regime = 'Very High Vol'
-                    except Exception:
-                        regime = 'Unknown'
-                
-                volatility_regime.append(regime)
-            
-            df['volatility_regime'] = volatility_regime
+            # O loop de classificação por percentis (móveis de 100 períodos) nunca
+            # classificava: a variável do regime herdava 'Unknown' das primeiras
+            # linhas (vol_20 sempre NaN no início) e os percentis só eram usados
+            # quando ela era diferente de 'Unknown'. O resultado foi mantido para
+            # não alterar as features vistas pelos modelos já treinados.
+            df['volatility_regime'] = 'Unknown'
             
             # Score numérico da volatilidade
             vol_scores = {
@@ -223,17 +185,8 @@ class MarketRegimeDetector:
             vol_ratio = vol_5 / (vol_20 + 0.001)
             vol_persistence = vol_ratio.rolling(10).std()
             
-            # Clustering score
-            clustering_score = []
-            for i in range(len(vol_persistence)):
-                if pd.isna(vol_persistence.iloc[i]):
-                    clustering_score.append(0)
-                else:
-                    # Alta persistência = baixo clustering, baixa persistência = alto clustering
-                    score = 1 / (1 + vol_persistence.iloc[i])
-                    clustering_score.append(score)
-            
-            df['volatility_clustering'] = clustering_score
+            # Clustering score: alta persistência = baixo clustering, baixa persistência = alto clustering
+            df['volatility_clustering'] = np.where(vol_persistence.isna(), 0, 1 / (1 + vol_persistence))
             
             return df
             
@@ -273,24 +226,12 @@ class MarketRegimeDetector:
                 momentum_score = np.mean(momentum_indicators, axis=0)
                 
                 # Classificar regime de momentum
-                momentum_regime = []
-                for score in momentum_score:
-                    if pd.isna(score):
-                        regime = 'Unknown'
-                    elif score > 0.5:
-                        regime = 'Strong Bullish'
-                    elif score > 0.2:
-                        regime = 'Bullish'
-                    elif score > -0.2:
-                        regime = 'Neutral'
-                    elif score > -0.5:
-                        regime = 'Bearish'
-                    else:
-                        regime = 'Strong Bearish'
-                    
-                    momentum_regime.append(regime)
-                
-                df['momentum_regime'] = momentum_regime
+                df['momentum_regime'] = np.select(
+                    [np.isnan(momentum_score), momentum_score > 0.5, momentum_score > 0.2,
+                     momentum_score > -0.2, momentum_score > -0.5],
+                    ['Unknown', 'Strong Bullish', 'Bullish', 'Neutral', 'Bearish'],
+                    default='Strong Bearish'
+                )
                 df['momentum_regime_score'] = momentum_score
             else:
                 df['momentum_regime'] = 'Unknown'
@@ -304,7 +245,8 @@ class MarketRegimeDetector:
             df['momentum_regime_score'] = 0
             return df
     
-    def _detect_clustering_regimes(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _detect_clustering_regimes(self, df: pd.DataFrame, symbol: Optional[str] = None,
+                                   timeframe: Optional[str] = None) -> pd.DataFrame:
         """Detectar regimes usando clustering K-means"""
         try:
             # Features para clustering
@@ -344,21 +286,28 @@ class MarketRegimeDetector:
                 clean_features = feature_matrix[mask]
                 
                 if len(clean_features) > 10:
-                    # Normalizar features
-                    scaled_features = self.scaler.fit_transform(clean_features)
-                    
-                    # K-means clustering (4 regimes)
-                    kmeans = KMeans(n_clusters=4, random_state=42, n_init=10)
-                    clusters = kmeans.fit_predict(scaled_features)
+                    if self.clusterer is not None and symbol and timeframe and df.index.is_unique:
+                        # Modelo persistente da série: predict/partial_fit só nos candles novos
+                        clusters, cluster_interpretations = self.clusterer.assign(
+                            symbol, timeframe, df.index[mask], clean_features,
+                            feature_names, self._interpret_clusters
+                        )
+                    else:
+                        # Normalizar features
+                        scaled_features = self.scaler.fit_transform(clean_features)
+                        
+                        # K-means clustering (4 regimes)
+                        kmeans = KMeans(n_clusters=4, random_state=42, n_init=10)
+                        clusters = kmeans.fit_predict(scaled_features)
+                        
+                        # Interpretar clusters baseado nas características
+                        cluster_interpretations = self._interpret_clusters(
+                            scaled_features, clusters, feature_names
+                        )
                     
                     # Mapear clusters de volta para DataFrame
                     cluster_labels = np.full(len(df), -1)  # -1 para dados faltantes
                     cluster_labels[mask] = clusters
-                    
-                    # Interpretar clusters baseado nas características
-                    cluster_interpretations = self._interpret_clusters(
-                        scaled_features, clusters, feature_names
-                    )
                       # Mapear para nomes de regime
                     regime_names = [cluster_interpretations.get(c, f'Regime_{c}') 
                                   for c in cluster_labels]
@@ -445,9 +394,7 @@ class MarketRegimeDetector:
             
             if 'close' in df.columns:
                 # Auto-correlação do preço (persistence)
-                price_autocorr = df['close'].rolling(50).apply(
-                    lambda x: x.autocorr(lag=1) if len(x) > 1 else 0, raw=False
-                )
+                price_autocorr = pd.Series(rolling_lag1_autocorr(df['close'], 50), index=df.index)
                 correlation_features.append(('price_autocorr', price_autocorr))
             
             # Regime baseado em correlações
@@ -455,17 +402,12 @@ class MarketRegimeDetector:
                 # Média das correlações absolutas
                 corr_values = [abs(corr.fillna(0)) for _, corr in correlation_features]
                 avg_correlation = np.mean(corr_values, axis=0)
-                  # Classificar regime de correlação
-                correlation_regime = []
-                for corr in avg_correlation:
-                    if corr > 0.7:
-                        regime = 'High Correlation'
-                    elif corr > 0.4:
-                        regime = 'Medium Correlation'
-                    else:
-                        regime = 'Low Correlation'
-                    
-                    correlation_regime.append(regime)
+                # Classificar regime de correlação
+                correlation_regime = np.select(
+                    [avg_correlation > 0.7, avg_correlation > 0.4],
+                    ['High Correlation', 'Medium Correlation'],
+                    default='Low Correlation'
+                )
                 
                 # Preparar todas as features de correlação para concatenação
                 correlation_data = {
@@ -561,42 +503,26 @@ class MarketRegimeDetector:
             regime_stability = 1 - change_frequency
             df['regime_stability'] = regime_stability.fillna(0.5)
             
-            # Duração do regime atual
-            regime_duration = []
-            current_duration = 0
-            last_regime = None
-            
-            for regime in df['ensemble_regime']:
-                if regime == last_regime:
-                    current_duration += 1
-                else:
-                    current_duration = 1
-                    last_regime = regime
-                
-                regime_duration.append(current_duration)
-            
-            df['regime_duration'] = regime_duration
+            # Duração do regime atual: posição dentro da sequência corrente de regimes iguais
+            positions = np.arange(len(df))
+            run_starts = np.maximum.accumulate(np.where(regime_changes.to_numpy() == 1, positions, 0))
+            df['regime_duration'] = positions - run_starts + 1
             
             # Persistência (probabilidade de continuar no mesmo regime)
             persistence_window = 50
             if len(df) >= persistence_window:
-                persistence_scores = []
-                
-                for i in range(len(df)):
-                    if i < persistence_window:
-                        persistence_scores.append(0.5)
-                    else:
-                        recent_regimes = df['ensemble_regime'].iloc[i-persistence_window:i]
-                        current_regime = df['ensemble_regime'].iloc[i]
-                        
-                        # Calcular probabilidade de persistência
-                        regime_counts = recent_regimes.value_counts()
-                        total_periods = len(recent_regimes)
-                        current_regime_count = regime_counts.get(current_regime, 0)
-                        
-                        persistence = current_regime_count / total_periods
-                        persistence_scores.append(persistence)
+                # Fração dos últimos 50 períodos (sem o atual) no regime atual,
+                # via somas acumuladas do one-hot dos regimes
+                codes, _ = pd.factorize(df['ensemble_regime'])
+                one_hot = np.zeros((len(df) + 1, codes.max() + 1), dtype=np.int64)
+                one_hot[positions + 1, codes] = 1
+                cumulative = np.cumsum(one_hot, axis=0)
+                current = positions[persistence_window:]
+                window_counts = (cumulative[current, codes[current]] -
+                                 cumulative[current - persistence_window, codes[current]])
                 
+                persistence_scores = np.full(len(df), 0.5)
+                persistence_scores[persistence_window:] = window_counts / persistence_window
                 df['regime_persistence'] = persistence_scores
             else:
                 df['regime_persistence'] = 0.5
@@ -617,43 +543,22 @@ class MarketRegimeDetector:
                 df['transition_probability'] = 0
                 return df
             
-            # Calcular matriz de transição
+            # Calcular matriz de transição (contagem vetorizada das transições consecutivas)
             regimes = df['ensemble_regime'].dropna()
-            unique_regimes = regimes.unique()
-            
-            transition_matrix = pd.DataFrame(
-                index=unique_regimes, 
-                columns=unique_regimes, 
-                data=0.0
-            )
-            
-            # Contar transições
-            for i in range(len(regimes) - 1):
-                current_regime = regimes.iloc[i]
-                next_regime = regimes.iloc[i + 1]
-                
-                if current_regime in transition_matrix.index and next_regime in transition_matrix.columns:
-                    transition_matrix.loc[current_regime, next_regime] += 1
+            codes, unique_regimes = pd.factorize(regimes)
             
-            # Normalizar para probabilidades
-            for regime in transition_matrix.index:
-                row_sum = transition_matrix.loc[regime].sum()
-                if row_sum > 0:
-                    transition_matrix.loc[regime] = transition_matrix.loc[regime] / row_sum
-            
-            # Calcular probabilidade de mudança para próximo período
-            transition_probs = []
+            counts = np.zeros((len(unique_regimes), len(unique_regimes)))
+            np.add.at(counts, (codes[:-1], codes[1:]), 1)
             
-            for i, current_regime in enumerate(df['ensemble_regime']):
-                if pd.isna(current_regime) or current_regime not in transition_matrix.index:
-                    transition_probs.append(0.5)
-                else:
-                    # Probabilidade de mudança = 1 - probabilidade de permanecer
-                    stay_prob = transition_matrix.loc[current_regime, current_regime]
-                    change_prob = 1 - stay_prob
-                    transition_probs.append(change_prob)
-            
-            df['transition_probability'] = transition_probs
+            # Normalizar para probabilidades
+            row_sums = counts.sum(axis=1, keepdims=True)
+            probabilities = np.divide(counts, row_sums, out=counts.copy(), where=row_sums > 0)
+            transition_matrix = pd.DataFrame(probabilities, index=unique_regimes, columns=unique_regimes)
+            
+            # Probabilidade de mudança = 1 - probabilidade de permanecer
+            current_codes = pd.Index(unique_regimes).get_indexer(df['ensemble_regime'])
+            stay_prob = np.diag(probabilities)[current_codes]
+            df['transition_probability'] = np.where(current_codes >= 0, 1 - stay_prob, 0.5)
             
             # Salvar matriz de transição para referência
             self.regime_models['transition_matrix'] = transition_matrix
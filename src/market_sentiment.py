@@ -11,6 +11,8 @@ import logging
 import requests
 from datetime import datetime, timedelta
 
+from .rolling_kernels import rolling_endpoint_trend, rolling_rank_pct
+
 logger = logging.getLogger(__name__)
 
 class MarketSentimentAnalyzer:
@@ -182,7 +184,7 @@ class MarketSentimentAnalyzer:
             # VIX-like indicator (volatilidade implícita simulada)
             atr = df.get('atr', pd.Series(0, index=df.index))
             atr_normalized = atr / df['close'] * 100
-            atr_percentile = atr_normalized.rolling(50).rank(pct=True)
+            atr_percentile = pd.Series(rolling_rank_pct(atr_normalized, 50), index=df.index)
             
             # Volatility clustering
             vol_cluster = vol_5.rolling(10).std()
@@ -294,26 +296,22 @@ class MarketSentimentAnalyzer:
         try:
             divergence_signals = []
             
+            # Direção de cada série na janela de 10 períodos (1 = alta, -1 = queda)
+            def window_trend(column):
+                return pd.Series(rolling_endpoint_trend(df[column], 10), index=df.index)
+            
             if 'close' in df.columns and 'rsi' in df.columns:
                 # Price vs RSI divergence
-                price_trend = df['close'].rolling(10).apply(
-                    lambda x: 1 if x.iloc[-1] > x.iloc[0] else -1, raw=False
-                )
-                rsi_trend = df['rsi'].rolling(10).apply(
-                    lambda x: 1 if x.iloc[-1] > x.iloc[0] else -1, raw=False
-                )
+                price_trend = window_trend('close')
+                rsi_trend = window_trend('rsi')
                 
                 price_rsi_div = (price_trend != rsi_trend).astype(int) * np.sign(price_trend)
                 divergence_signals.append(price_rsi_div * 0.5)
             
             if 'close' in df.columns and 'macd' in df.columns:
                 # Price vs MACD divergence
-                price_trend = df['close'].rolling(10).apply(
-                    lambda x: 1 if x.iloc[-1] > x.iloc[0] else -1, raw=False
-                )
-                macd_trend = df['macd'].rolling(10).apply(
-                    lambda x: 1 if x.iloc[-1] > x.iloc[0] else -1, raw=False
-                )
+                price_trend = window_trend('close')
+                macd_trend = window_trend('macd')
                 
                 price_macd_div = (price_trend != macd_trend).astype(int) * np.sign(price_trend)
                 divergence_signals.append(price_macd_div * 0.5)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Tabela de preços em memória para o RealTimePriceAPI
+
+Cada símbolo recebe um slot fixo (índice interno) em arrays NumPy
+pré-alocados: preço, timestamp monotônico em ns, código da fonte e um
+contador de sequência. Escritores publicam com seqlock (contador ímpar
+durante a escrita) e leitores repetem a leitura até ver o mesmo contador par
+antes e depois, obtendo sempre uma tupla (preço, timestamp, fonte)
+consistente sem adquirir lock. As leituras usam memoryviews dos arrays, que
+devolvem floats/ints Python sem criar escalares NumPy.
+
+Só escritores se serializam entre si (WebSocket, REST e busca imediata); a
+idade de um preço é calculada com time.monotonic_ns(), sem datetime.
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+NS_PER_SECOND = 1_000_000_000
+
+
+class PriceTable:
+    """Preço, timestamp e fonte por símbolo em arrays pré-alocados (seqlock por slot)"""
+
+    def __init__(self, capacity: int = 256):
+        self._slots: Dict[str, int] = {}
+        self._symbols: List[str] = []
+        self._sources: List[str] = []
+        self._source_codes: Dict[str, int] = {}
+        self._write_lock = threading.Lock()
+        # Converte o relógio monotônico em horário de parede só quando exibido
+        self._wall_offset_ns = time.time_ns() - time.monotonic_ns()
+        self._allocate(max(1, capacity))
+
+    def update(self, symbol: str, price: float, source: str, timestamp_ns: Optional[int] = None):
+        """Publicar um preço (timestamp_ns padrão: time.monotonic_ns())"""
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        with self._write_lock:
+            slot = self._slots.get(symbol)
+            is_new = slot is None
+            if is_new:
+                slot = self._reserve_slot(symbol)
+            code = self._source_codes.get(source)
+            if code is None:
+                code = self._source_codes[source] = len(self._sources)
+                self._sources.append(source)
+
+            prices, timestamps, sources, sequence = self._views
+            sequence[slot] += 1  # Ímpar: escrita em andamento
+            prices[slot] = price
+            timestamps[slot] = timestamp_ns
+            sources[slot] = code
+            sequence[slot] += 1
+            if is_new:
+                # Leitores só enxergam o símbolo depois do primeiro preço completo
+                self._slots[symbol] = slot
+
+    def get(self, symbol: str) -> Optional[Tuple[float, int, str]]:
+        """(preço, timestamp monotônico em ns, fonte) consistentes, sem lock"""
+        slot = self._slots.get(symbol)
+        if slot is None:
+            return None
+        while True:
+            prices, timestamps, sources, sequence = self._views
+            before = sequence[slot]
+            if not before & 1:
+                price = prices[slot]
+                timestamp_ns = timestamps[slot]
+                code = sources[slot]
+                if sequence[slot] == before and self._views[3] is sequence:
+                    return price, timestamp_ns, self._sources[code]
+            # Escrita em andamento: ceder o GIL para o escritor terminar
+            time.sleep(0)
+
+    def get_fresh(self, symbol: str, max_age_seconds: float) -> Optional[float]:
+        """Preço se tiver no máximo max_age_seconds"""
+        entry = self.get(symbol)
+        if entry is None or time.monotonic_ns() - entry[1] > max_age_seconds * NS_PER_SECOND:
+            return None
+        return entry[0]
+
+    def age_seconds(self, timestamp_ns: int) -> float:
+        return (time.monotonic_ns() - timestamp_ns) / NS_PER_SECOND
+
+    def to_datetime(self, timestamp_ns: int) -> datetime:
+        """Horário de parede de um timestamp monotônico da tabela"""
+        return datetime.fromtimestamp((timestamp_ns + self._wall_offset_ns) / NS_PER_SECOND)
+
+    def symbols(self) -> List[str]:
+        return list(self._slots)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._slots
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _reserve_slot(self, symbol: str) -> int:
+        """Reservar o próximo slot (com o lock de escrita)"""
+        slot = len(self._symbols)
+        if slot >= len(self._prices):
+            self._allocate(len(self._prices) * 2)
+        self._symbols.append(symbol)
+        return slot
+
+    def _allocate(self, capacity: int):
+        """(Re)alocar os arrays; leitores do array antigo repetem a leitura"""
+        old = getattr(self, '_prices', None)
+        prices = np.zeros(capacity, dtype=np.float64)
+        timestamps = np.zeros(capacity, dtype=np.int64)
+        sources = np.zeros(capacity, dtype=np.int8)
+        sequence = np.zeros(capacity, dtype=np.int64)
+        if old is not None:
+            used = len(self._symbols)
+            prices[:used] = self._prices[:used]
+            timestamps[:used] = self._timestamps[:used]
+            sources[:used] = self._source_array[:used]
+            sequence[:used] = self._sequence[:used]
+        self._prices, self._timestamps, self._source_array, self._sequence = prices, timestamps, sources, sequence
+        # Publicados de uma vez: um leitor vê o conjunto antigo ou o novo
+        self._views = (memoryview(prices), memoryview(timestamps), memoryview(sources), memoryview(sequence))
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Formato compacto dos quadros de preço enviados aos dashboards
+
+Os símbolos viram índices de uma tabela enviada uma vez na subscrição
+(evento price_symbols) e aumentada só quando um símbolo novo aparece. Cada
+campo numérico é guardado como inteiro em ponto fixo (preço com 8 casas, como
+a Binance) e o quadro leva só a diferença para o último valor enviado, em
+varint zigzag: um tick de preço ocupa poucos bytes em vez de um dict JSON com
+chaves repetidas e timestamp ISO.
+
+Quadro binário (little-endian):
+  cabeçalho  uint8 versão | uint8 tipo | uint32 sequência | float64 timestamp ms | uint16 entradas
+  entrada    varint índice do símbolo | uint8 máscara de campos | varint zigzag por campo da máscara
+
+Quadros-chave (KEYFRAME) trazem valores absolutos de todos os símbolos e são
+enviados só ao cliente que acabou de assinar; quadros delta vão para a sala.
+O cliente descarta deltas já incluídos no quadro-chave (sequência menor ou
+igual) e pede um novo quadro-chave se encontrar um buraco na sequência.
+Campos sem bit na máscara não mudaram (delta) ou são zero (quadro-chave): o
+decodificador entrega só o preço e os campos presentes no quadro.
+"""
+
+import itertools
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+FRAME_VERSION = 1
+KEYFRAME = 0
+DELTA = 1
+
+# Campos do quadro, na ordem dos bits da máscara, e casas decimais de cada um
+FIELDS = ('price', 'change_24h', 'change_percent', 'volume')
+FIELD_DECIMALS = (8, 8, 4, 2)
+FIELD_SCALES = tuple(10 ** decimals for decimals in FIELD_DECIMALS)
+
+# Maior inteiro que o Number do JavaScript representa sem perda
+MAX_SAFE_INTEGER = 2 ** 53 - 1
+
+_HEADER = struct.Struct('<BBIdH')
+_SCALES = np.array(FIELD_SCALES, dtype=np.float64)
+_MASK_BITS = np.array([1 << bit for bit in range(len(FIELDS))], dtype=np.int64)
+# Varint de até 9 grupos de 7 bits: um grupo por coluna, bytes a mais acima de cada limite
+_VARINT_SHIFTS = np.arange(0, 63, 7, dtype=np.int64)
+_VARINT_COLUMNS = np.arange(len(_VARINT_SHIFTS))
+_VARINT_LIMITS = (1 << _VARINT_SHIFTS[1:]) - 1
+
+
+def _to_fixed(rows: List[List]) -> np.ndarray:
+    """Linhas de campos -> inteiros em ponto fixo (não finitos viram 0, extremos são limitados)"""
+    try:
+        values = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.float64,
+                             count=len(rows) * len(FIELDS)).reshape(-1, len(FIELDS))
+    except (TypeError, ValueError):
+        values = np.array([[_to_float(value) for value in row] for row in rows],
+                          dtype=np.float64).reshape(-1, len(FIELDS))
+    values *= _SCALES
+    finite = np.isfinite(values)
+    if not finite.all():
+        values[~finite] = 0
+    np.minimum(values, MAX_SAFE_INTEGER, out=values)
+    np.maximum(values, -MAX_SAFE_INTEGER, out=values)
+    return np.rint(values).astype(np.int64)
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _varints(values: np.ndarray) -> bytes:
+    """Varints (7 bits por byte, bit alto = continua) de inteiros não negativos, vetorizado"""
+    counts = np.searchsorted(_VARINT_LIMITS, values) + 1
+    groups = (values[:, None] >> _VARINT_SHIFTS) & 0x7F
+    groups |= (_VARINT_COLUMNS < (counts - 1)[:, None]) << 7
+    return groups[_VARINT_COLUMNS < counts[:, None]].astype(np.uint8).tobytes()
+
+
+class PriceFrameEncoder:
+    """Tabela de símbolos e últimos valores enviados, para codificar quadros delta"""
+
+    def __init__(self, capacity: int = 64):
+        self.symbols: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.values = np.zeros((max(1, capacity), len(FIELDS)), dtype=np.int64)  # índice -> ponto fixo
+        self.sequence = 0
+        self.timestamp_ms = 0.0
+
+    def encode(self, prices: Dict[str, Dict], timestamp_ms: float) -> Tuple[bytes, List[str]]:
+        """Quadro delta dos preços alterados e símbolos novos que ele introduz"""
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        self.timestamp_ms = timestamp_ms
+        new_symbols = []
+        slots = []
+        rows = []
+        index = self.index
+        for symbol, data in prices.items():
+            slot = index.get(symbol)
+            if slot is None:
+                slot = self._add_symbol(symbol)
+                new_symbols.append(symbol)
+            slots.append(slot)
+            rows.append([data.get(field, 0) for field in FIELDS])
+
+        slots = np.array(slots, dtype=np.int64)
+        current = _to_fixed(rows)
+        deltas = current - self.values[slots]
+        self.values[slots] = current
+        return self._pack(DELTA, slots, deltas), new_symbols
+
+    def keyframe(self) -> bytes:
+        """Quadro com os valores absolutos de todos os símbolos (estado após o último delta)"""
+        count = len(self.symbols)
+        return self._pack(KEYFRAME, np.arange(count, dtype=np.int64), self.values[:count])
+
+    def _add_symbol(self, symbol: str) -> int:
+        slot = self.index[symbol] = len(self.symbols)
+        self.symbols.append(symbol)
+        if slot >= len(self.values):
+            self.values = np.concatenate([self.values, np.zeros_like(self.values)])
+        return slot
+
+    def _pack(self, kind: int, slots: np.ndarray, deltas: np.ndarray) -> bytes:
+        header = _HEADER.pack(FRAME_VERSION, kind, self.sequence, self.timestamp_ms, len(slots))
+        if not len(slots):
+            return header
+        # Cada entrada vira a sequência de varints [índice, máscara, zigzag dos campos da máscara]
+        # (máscara < 128: o varint é o próprio byte)
+        changed = deltas != 0
+        tokens = np.empty((len(slots), 2 + len(FIELDS)), dtype=np.int64)
+        tokens[:, 0] = slots
+        tokens[:, 1] = changed @ _MASK_BITS
+        tokens[:, 2:] = (deltas << 1) ^ (deltas >> 63)
+        keep = np.ones(tokens.shape, dtype=bool)
+        keep[:, 2:] = changed
+        return header + _varints(tokens[keep])
+
+
+def decode_price_frame(frame: bytes, symbols: Sequence[str],
+                       values: Optional[Dict[str, List[int]]] = None) -> Tuple[int, int, float, Dict[str, Dict]]:
+    """Decodificar um quadro (mesma lógica de static/js/price-frame-decoder.js)
+
+    values guarda os inteiros em ponto fixo por símbolo entre quadros e é
+    atualizado no lugar. Retorna (tipo, sequência, timestamp ms, preços).
+    """
+    if values is None:
+        values = {}
+    version, kind, sequence, timestamp_ms, count = _HEADER.unpack_from(frame, 0)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Versão de quadro não suportada: {version}")
+
+    position = _HEADER.size
+    prices = {}
+
+    def read_varint():
+        nonlocal position
+        result = shift = 0
+        while True:
+            byte = frame[position]
+            position += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    for _ in range(count):
+        slot = read_varint()
+        mask = frame[position]
+        position += 1
+        symbol = symbols[slot]
+        previous = [0] * len(FIELDS) if kind == KEYFRAME else values.get(symbol, [0] * len(FIELDS))
+        current = list(previous)
+        for bit in range(len(FIELDS)):
+            if mask & (1 << bit):
+                zigzag = read_varint()
+                current[bit] += zigzag >> 1 if not zigzag & 1 else -((zigzag + 1) >> 1)
+        values[symbol] = current
+        # Preço sempre; demais campos só se vieram no quadro (bit da máscara)
+        prices[symbol] = {field: value / scale
+                          for bit, (field, value, scale) in enumerate(zip(FIELDS, current, FIELD_SCALES))
+                          if bit == 0 or mask & (1 << bit)}
+    return kind, sequence, timestamp_ms, prices
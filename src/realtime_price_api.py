@@ -4,18 +4,34 @@ API de preços em tempo real otimizada para alta velocidade
 Usa WebSockets e APIs públicas mais rápidas - APENAS CRYPTO
 """
 
-import asyncio
-import websockets
 import json
 import requests
 import logging
 import threading
 import time
-from typing import Dict, Optional, Callable
-from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from .binance_stream_manager import BINANCE_STREAM_URL, BinanceStreamManager
+from .price_table import PriceTable
 
 logger = logging.getLogger(__name__)
 
+# Observados até configure() trocar pelos pares configurados
+DEFAULT_WATCH_SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'ADAUSDT', 'BNBUSDT', 'SOLUSDT',
+                         'XRPUSDT', 'DOTUSDT', 'LINKUSDT', 'MATICUSDT', 'AVAXUSDT']
+
+# Código de erro da Binance para símbolo inválido no parâmetro symbols
+INVALID_SYMBOL_CODE = -1121
+
+
+def _parse_retry_after(value: Optional[str]) -> float:
+    """Retry-After em segundos (0 se ausente ou inválido)"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 0.0
+
+
 class RealTimePriceAPI:
     """API de preços em tempo real usando WebSockets e REST APIs rápidas"""
     
@@ -23,16 +39,86 @@ class RealTimePriceAPI:
         self.prices = {}
         self.callbacks = []
         self.running = False
-        self.websocket_thread = None
+        self.stream_manager = None
         self.rest_thread = None
         
-        # Cache de preços com timestamp
-        self.price_cache = {}
+        # Último preço por símbolo (leitura sem lock, timestamps monotônicos)
+        self.price_table = PriceTable()
         
         # URLs das APIs mais rápidas
-        self.binance_ws_url = "wss://stream.binance.com:9443/ws/"
+        self.binance_ws_url = BINANCE_STREAM_URL
         self.binance_rest_url = "https://api.binance.com/api/v3/ticker/price"
         
+        # Conjunto observado: união dos símbolos de cada fonte ('config', 'trades',
+        # 'clients', 'requested'); cada símbolo tem um stream @ticker assinado e o
+        # backup REST consulta em uma requisição os que estão sem preço do WebSocket
+        self.watch_sources: Dict[str, Set[str]] = {'config': set(DEFAULT_WATCH_SYMBOLS)}
+        self.invalid_symbols: Set[str] = set()
+        self._watch_lock = threading.Lock()
+        
+        # Símbolos 'requested' expiram se não forem lidos por requested_ttl segundos
+        self.requested_ttl = 600.0
+        self._requested_reads: Dict[str, float] = {}  # símbolo -> última leitura (monotônico)
+        self._rest_wakeup = threading.Event()
+        
+        # Polling adaptativo: intervalo dobra enquanto o WebSocket cobre todos
+        # os símbolos observados e volta ao mínimo quando algum fica sem preço
+        self.rest_min_interval = 1.0
+        self.rest_max_interval = 15.0
+        self.websocket_fresh_seconds = 2.0
+        self.rest_interval = self.rest_min_interval
+        self._rest_blocked_until = 0.0  # Fim do Retry-After (monotônico): nem mudanças no conjunto acordam antes
+        self.stream_settings: Dict = {}
+        
+        self.stats = {'messages_in': 0, 'updates_emitted': 0, 'bytes_received': 0,
+                      'rest_polls': 0, 'rest_errors': 0, 'rest_rate_limited': 0, 'requested_expired': 0}
+        self._stats_lock = threading.Lock()
+        
+    def configure(self, config):
+        """Aplicar REALTIME_PRICE_FEED e observar os pares configurados"""
+        settings = getattr(config, 'REALTIME_PRICE_FEED', None) or {}
+        self.rest_min_interval = settings.get('rest_min_interval', 1.0)
+        self.rest_max_interval = max(self.rest_min_interval, settings.get('rest_max_interval', 15.0))
+        self.websocket_fresh_seconds = settings.get('websocket_fresh_seconds', 2.0)
+        self.requested_ttl = settings.get('requested_ttl_seconds', 600.0)
+        self.rest_interval = self.rest_min_interval
+        self.binance_ws_url = settings.get('websocket_url', BINANCE_STREAM_URL)
+        self.stream_settings = {name: settings[name] for name in (
+            'max_streams_per_connection', 'subscribe_batch', 'control_interval',
+            'reconnect_base', 'reconnect_max') if name in settings}
+        self.set_watch_symbols('config', getattr(config, 'CRYPTO_PAIRS', None) or [])
+    
+    def set_watch_symbols(self, source: str, symbols: Iterable[str]):
+        """Substituir os símbolos observados de uma fonte"""
+        normalized = {symbol.upper() for symbol in symbols if symbol}
+        with self._watch_lock:
+            changed = self.watch_sources.get(source) != normalized
+            self.watch_sources[source] = normalized
+        if changed:
+            if self.stream_manager is not None:
+                self.stream_manager.update_streams(self._stream_names())
+            # Símbolo novo deve ter preço sem esperar o intervalo atual
+            self.rest_interval = self.rest_min_interval
+            self._rest_wakeup.set()
+    
+    def get_watch_symbols(self) -> Set[str]:
+        """União dos símbolos observados por todas as fontes"""
+        with self._watch_lock:
+            return set().union(*self.watch_sources.values())
+    
+    def get_stats(self) -> Dict:
+        """Contadores do feed de preços"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats.update({
+            'watch_symbols': len(self.get_watch_symbols()),
+            'invalid_symbols': sorted(self.invalid_symbols),
+            'rest_interval': self.rest_interval,
+        })
+        if self.stream_manager is not None:
+            stats['websocket'] = self.stream_manager.get_stats()
+        return stats
+    
     def start(self):
         """Iniciar feeds de preços em tempo real"""
         if self.running:
@@ -40,9 +126,12 @@ class RealTimePriceAPI:
             
         self.running = True
         
-        # Iniciar WebSocket em thread separada
-        self.websocket_thread = threading.Thread(target=self._start_websocket_feed, daemon=True)
-        self.websocket_thread.start()
+        # Streams @ticker do conjunto observado (assinaturas acompanham o conjunto)
+        self.stream_manager = BinanceStreamManager(
+            self._handle_stream_message, url=self.binance_ws_url,
+            on_disconnect=self._on_websocket_disconnect, **self.stream_settings)
+        self.stream_manager.update_streams(self._stream_names())
+        self.stream_manager.start()
         
         # Iniciar backup REST API em thread separada
         self.rest_thread = threading.Thread(target=self._start_rest_feed, daemon=True)
@@ -53,107 +142,134 @@ class RealTimePriceAPI:
     def stop(self):
         """Parar feeds de preços"""
         self.running = False
+        if self.stream_manager is not None:
+            self.stream_manager.stop()
+        self._rest_wakeup.set()
         logger.info("STOP Feed de precos parado")
     
-    def _start_websocket_feed(self):
-        """Iniciar feed WebSocket da Binance"""
-        try:
-            asyncio.run(self._websocket_handler())
-        except Exception as e:
-            logger.error(f"❌ Erro no WebSocket: {e}")
+    def _stream_names(self) -> List[str]:
+        return [f"{symbol.lower()}@ticker" for symbol in self.get_watch_symbols() - self.invalid_symbols]
     
-    async def _websocket_handler(self):
-        """Handler principal do WebSocket"""
-        symbols = ['btcusdt', 'ethusdt', 'adausdt', 'bnbusdt', 'solusdt', 
-                  'xrpusdt', 'dotusdt', 'linkusdt', 'maticusdt', 'avaxusdt']
-        
-        # Criar stream para múltiplos símbolos
-        streams = [f"{symbol}@ticker" for symbol in symbols]
-        stream_names = '/'.join(streams)
-        url = f"wss://stream.binance.com:9443/stream?streams={stream_names}"
-        
-        while self.running:
-            try:
-                async with websockets.connect(url) as websocket:
-                    logger.info("OK WebSocket conectado a Binance")
-                    
-                    while self.running:
-                        try:
-                            message = await asyncio.wait_for(websocket.recv(), timeout=5.0)
-                            response = json.loads(message)
-                            
-                            # Processar dados do ticker (formato combined stream)
-                            if 'data' in response:
-                                data = response['data']
-                                if 's' in data and 'c' in data:  # symbol e close price
-                                    symbol = data['s'].upper()
-                                    price = float(data['c'])
-                                    
-                                    # Atualizar cache
-                                    self.price_cache[symbol] = {
-                                        'price': price,
-                                        'timestamp': datetime.now(),
-                                        'source': 'websocket'
-                                    }
-                                    
-                                    # Notificar callbacks
-                                    self._notify_price_update(symbol, price)
-                                    
-                        except asyncio.TimeoutError:
-                            # Ping para manter conexão viva
-                            await websocket.ping()
-                            
-                        except Exception as e:
-                            logger.warning(f"Erro ao processar mensagem WS: {e}")
-                            break
-                            
-            except Exception as e:
-                logger.error(f"❌ Erro na conexão WebSocket: {e}")
-                if self.running:
-                    await asyncio.sleep(5)  # Aguardar antes de reconectar
+    def _handle_stream_message(self, data: Dict, size: int):
+        """Processar payload de ticker recebido pelo WebSocket"""
+        self._count(messages_in=1, bytes_received=size)
+        if 's' in data and 'c' in data:  # symbol e close price
+            symbol = data['s'].upper()
+            price = float(data['c'])
+            
+            # Atualizar tabela de preços
+            self.price_table.update(symbol, price, 'websocket')
+            
+            # Notificar callbacks
+            self._notify_price_update(symbol, price)
+    
+    def _on_websocket_disconnect(self):
+        # Backup REST assume imediatamente os símbolos do WebSocket
+        self.rest_interval = self.rest_min_interval
+        self._rest_wakeup.set()
     
     def _start_rest_feed(self):
-        """Feed REST como backup - apenas crypto"""
+        """Feed REST como backup - apenas símbolos observados sem preço recente do WebSocket"""
         while self.running:
             try:
-                # Atualizar preços crypto via REST (backup)
-                self._update_crypto_prices_rest()
+                self._rest_wakeup.clear()
+                blocked = self._rest_blocked_until - time.monotonic()
+                if blocked > 0:
+                    time.sleep(min(blocked, self.rest_max_interval))
+                    continue
+                self._expire_requested()
+                symbols = self._rest_symbols()
+                if symbols:
+                    retry_after = self._update_crypto_prices_rest(symbols)
+                    if retry_after is None:
+                        self.rest_interval = self.rest_min_interval
+                    else:
+                        # Rate limit/ban: recuar, respeitando o Retry-After da exchange
+                        self.rest_interval = min(self.rest_interval * 2, self.rest_max_interval)
+                        self._rest_blocked_until = time.monotonic() + retry_after
+                else:
+                    # WebSocket saudável para todo o conjunto observado
+                    self.rest_interval = min(self.rest_interval * 2, self.rest_max_interval)
                 
-                # Aguardar antes da próxima atualização
-                time.sleep(1)  # 1 segundo - muito mais rápido que before
+                # Aguardar (mudanças no conjunto observado ou queda do WebSocket acordam antes)
+                self._rest_wakeup.wait(self.rest_interval)
                 
             except Exception as e:
                 logger.error(f"❌ Erro no feed REST: {e}")
                 time.sleep(5)
     
-    def _update_crypto_prices_rest(self):
-        """Atualizar preços crypto via REST API rápida"""
+    def _rest_symbols(self) -> List[str]:
+        """Símbolos observados sem preço recente do WebSocket"""
+        return sorted(symbol for symbol in self.get_watch_symbols() - self.invalid_symbols
+                      if not self._has_fresh_websocket_price(symbol))
+    
+    def _has_fresh_websocket_price(self, symbol: str) -> bool:
+        entry = self.price_table.get(symbol)
+        return entry is not None and entry[2] == 'websocket' and \
+            self.price_table.age_seconds(entry[1]) <= self.websocket_fresh_seconds
+    
+    def _update_crypto_prices_rest(self, symbols: List[str]) -> Optional[float]:
+        """
+        Atualizar preços crypto via REST (forma multi-símbolo da Binance).
+        Retorna os segundos de espera pedidos pela exchange em rate limit, ou None.
+        """
         try:
-            # API da Binance - extremamente rápida
-            response = requests.get(self.binance_rest_url, timeout=2)
+            params = {'symbols': json.dumps(symbols, separators=(',', ':'))}
+            response = self._get_rest_prices(params)
             data = response.json()
             
+            if response.status_code in (418, 429) or (isinstance(data, dict) and data.get('code') == -1003):
+                self._count(rest_rate_limited=1)
+                retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+                logger.warning(f"⏳ Rate limit da Binance no backup REST, aguardando {retry_after:.0f}s")
+                return retry_after
+            
+            if isinstance(data, dict):
+                logger.warning(f"⚠️ Consulta de preços em lote rejeitada: {data.get('msg', data)}")
+                if data.get('code') != INVALID_SYMBOL_CODE:
+                    self._count(rest_errors=1)
+                    return None
+                # Um símbolo inválido derruba o lote: buscar a lista completa uma
+                # vez e descartar os símbolos que a Binance não lista
+                data = self._get_rest_prices(None).json()
+                listed = {item['symbol'] for item in data}
+                invalid = set(symbols) - listed
+                if invalid:
+                    self.invalid_symbols.update(invalid)
+                    logger.warning(f"⚠️ Símbolos ignorados pelo backup REST: {sorted(invalid)}")
+                    if self.stream_manager is not None:
+                        self.stream_manager.update_streams(self._stream_names())
+            
+            wanted = set(symbols)
             for item in data:
                 symbol = item['symbol']
+                if symbol not in wanted:
+                    continue
                 price = float(item['price'])
                 
                 # Só atualizar se não temos preço recente do WebSocket
-                if symbol not in self.price_cache or \
-                   (datetime.now() - self.price_cache[symbol]['timestamp']).total_seconds() > 2:
-                    
-                    self.price_cache[symbol] = {
-                        'price': price,
-                        'timestamp': datetime.now(),
-                        'source': 'rest_binance'
-                    }
-                    
+                if not self._has_fresh_websocket_price(symbol):
+                    self.price_table.update(symbol, price, 'rest_binance')
                     self._notify_price_update(symbol, price)
                     
         except Exception as e:
+            self._count(rest_errors=1)
             logger.debug(f"Erro REST crypto: {e}")
+        return None
+    
+    def _get_rest_prices(self, params: Optional[Dict]) -> requests.Response:
+        response = requests.get(self.binance_rest_url, params=params, timeout=2)
+        self._count(messages_in=1, bytes_received=len(response.content), rest_polls=1)
+        return response
+    
+    def _count(self, **increments):
+        with self._stats_lock:
+            for name, value in increments.items():
+                self.stats[name] += value
     
     def _notify_price_update(self, symbol: str, price: float):
         """Notificar callbacks sobre atualização de preço"""
+        self._count(updates_emitted=1)
         for callback in self.callbacks:
             try:
                 callback(symbol, price)
@@ -164,13 +280,11 @@ class RealTimePriceAPI:
         """Obter preço atual mais recente"""
         symbol = symbol.upper()
         
-        if symbol in self.price_cache:
-            cache_entry = self.price_cache[symbol]
-            
-            # Verificar se o preço não é muito antigo (máximo 10 segundos)
-            age = (datetime.now() - cache_entry['timestamp']).total_seconds()
-            if age < 10:
-                return cache_entry['price']
+        # Preço com no máximo 10 segundos
+        price = self.price_table.get_fresh(symbol, 10)
+        if price is not None:
+            self._touch_requested(symbol)
+            return price
         
         # Se não temos preço recente, tentar buscar via REST imediatamente
         return self._fetch_price_immediate(symbol)
@@ -187,12 +301,11 @@ class RealTimePriceAPI:
                 if 'price' in data:
                     price = float(data['price'])
                     
-                    # Atualizar cache
-                    self.price_cache[symbol] = {
-                        'price': price,
-                        'timestamp': datetime.now(),
-                        'source': 'immediate_rest'
-                    }
+                    # Atualizar tabela de preços
+                    self.price_table.update(symbol, price, 'immediate_rest')
+                    
+                    # Próximas leituras do símbolo chegam pelo WebSocket
+                    self._watch_requested(symbol)
                     
                     return price
             
@@ -206,6 +319,32 @@ class RealTimePriceAPI:
         
         return None
     
+    def _watch_requested(self, symbol: str):
+        with self._watch_lock:
+            self._requested_reads[symbol] = time.monotonic()
+            requested = set(self.watch_sources.get('requested', ()))
+        if symbol not in requested:
+            self.set_watch_symbols('requested', requested | {symbol})
+    
+    def _touch_requested(self, symbol: str):
+        # Sem lock no caminho de leitura: só renova símbolos já registrados
+        if symbol in self._requested_reads:
+            self._requested_reads[symbol] = time.monotonic()
+    
+    def _expire_requested(self):
+        """Parar de observar símbolos 'requested' sem leitura há mais de requested_ttl"""
+        cutoff = time.monotonic() - self.requested_ttl
+        with self._watch_lock:
+            expired = {symbol for symbol, read_at in list(self._requested_reads.items()) if read_at < cutoff}
+            if not expired:
+                return
+            for symbol in expired:
+                self._requested_reads.pop(symbol, None)
+            remaining = self.watch_sources.get('requested', set()) - expired
+        self._count(requested_expired=len(expired))
+        logger.info(f"🧹 {len(expired)} símbolos sem leitura recente deixaram de ser observados")
+        self.set_watch_symbols('requested', remaining)
+    
     def add_callback(self, callback: Callable[[str, float], None]):
         """Adicionar callback para receber atualizações de preço"""
         self.callbacks.append(callback)
@@ -219,13 +358,16 @@ class RealTimePriceAPI:
         """Obter informações detalhadas do preço"""
         symbol = symbol.upper()
         
-        if symbol in self.price_cache:
+        entry = self.price_table.get(symbol)
+        if entry is not None:
+            self._touch_requested(symbol)
+            price, timestamp_ns, source = entry
             return {
                 'symbol': symbol,
-                'price': self.price_cache[symbol]['price'],
-                'timestamp': self.price_cache[symbol]['timestamp'].isoformat(),
-                'source': self.price_cache[symbol]['source'],
-                'age_seconds': (datetime.now() - self.price_cache[symbol]['timestamp']).total_seconds()
+                'price': price,
+                'timestamp': self.price_table.to_datetime(timestamp_ns).isoformat(),
+                'source': source,
+                'age_seconds': self.price_table.age_seconds(timestamp_ns)
             }
         
         return None
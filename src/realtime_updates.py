@@ -6,21 +6,46 @@ Implementa notificações push para trades, preços e sinais
 
 import asyncio
 import logging
+import threading
+import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Any, Callable, Dict, Optional, Set
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask import request
 
+from .price_wire import PriceFrameEncoder
+
 logger = logging.getLogger(__name__)
 
+# Sala dos clientes que recebem todos os preços (dashboards)
+ALL_PRICES_ROOM = 'prices'
+# Sala dos clientes que pediram o formato compacto (price_symbols + price_frame binário)
+COMPACT_PRICES_ROOM = 'prices_compact'
+
 class RealTimeUpdates:
     """Sistema de atualizações em tempo real via WebSocket"""
-    def __init__(self, socketio: SocketIO):
+    def __init__(self, socketio: SocketIO, price_frame_interval: float = 0.25, compact_payloads: bool = True):
         self.socketio = socketio
         self.connected_clients = set()
         self.subscribed_symbols = {}  # client_id -> [symbols]
         self.price_cache = {}  # symbol -> price data
         self.last_updates = {}  # symbol -> timestamp
+        self.subscription_listeners = []  # callbacks(symbols) quando as subscrições mudam
+        
+        # Ticks acumulados até o próximo quadro: só o último de cada símbolo é
+        # enviado, em um evento price_batch por sala a cada price_frame_interval
+        self.price_frame_interval = price_frame_interval
+        self.pending_prices = {}  # symbol -> preço ou price_data
+        self._pending_lock = threading.Lock()
+        self._price_flusher_started = False
+        self.price_stats = {'ticks': 0, 'coalesced': 0, 'unchanged': 0, 'frames': 0, 'batches': 0,
+                            'compact_frames': 0, 'compact_bytes': 0, 'keyframes': 0}
+        
+        # Formato compacto opcional: subscribe_prices com {'format': 'compact'}
+        self.compact_payloads = compact_payloads
+        self.price_encoder = PriceFrameEncoder()
+        self.compact_clients = set()
+        self._frame_lock = threading.Lock()  # Quadro-chave e deltas na mesma ordem da sequência
         
         logger.info("🔗 Sistema de WebSocket inicializado")
         
@@ -46,10 +71,12 @@ class RealTimeUpdates:
             """Cliente desconectado"""
             client_id = request.sid
             self.connected_clients.discard(client_id)
+            self.compact_clients.discard(client_id)
             
             # Limpar subscrições
             if client_id in self.subscribed_symbols:
                 del self.subscribed_symbols[client_id]
+                self._notify_subscriptions()
                 
             logger.info(f"🔌 Cliente desconectado: {client_id}")
             
@@ -65,14 +92,15 @@ class RealTimeUpdates:
             if symbol not in self.subscribed_symbols[client_id]:
                 self.subscribed_symbols[client_id].append(symbol)
                 join_room(f"symbol_{symbol}")
+                self._notify_subscriptions()
                 
                 logger.info(f"📊 Cliente {client_id} subscrito em {symbol}")
                 
                 # Enviar último preço se disponível
                 if symbol in self.price_cache:
-                    emit('price_update', {
-                        'symbol': symbol,
-                        'data': self.price_cache[symbol]
+                    emit('price_batch', {
+                        'timestamp': self.price_cache[symbol]['timestamp'],
+                        'prices': {symbol: self.price_cache[symbol]}
                     })
                     
         @self.socketio.on('unsubscribe_symbol')
@@ -85,36 +113,137 @@ class RealTimeUpdates:
                 if symbol in self.subscribed_symbols[client_id]:
                     self.subscribed_symbols[client_id].remove(symbol)
                     leave_room(f"symbol_{symbol}")
+                    self._notify_subscriptions()
                     logger.info(f"📊 Cliente {client_id} cancelou subscrição de {symbol}")
+        
+        @self.socketio.on('subscribe_prices')
+        def handle_subscribe_prices(data=None):
+            """Receber todos os preços (um price_batch ou price_frame por quadro)"""
+            client_id = request.sid
+            if self.compact_payloads and isinstance(data, dict) and data.get('format') == 'compact':
+                # Também usado pelo cliente para pedir um novo quadro-chave
+                leave_room(ALL_PRICES_ROOM)
+                with self._frame_lock:
+                    join_room(COMPACT_PRICES_ROOM)
+                    self.compact_clients.add(client_id)
+                    emit('price_symbols', {'offset': 0, 'symbols': list(self.price_encoder.symbols)})
+                    emit('price_frame', self.price_encoder.keyframe())
+                    self.price_stats['keyframes'] += 1
+                return
+            
+            if client_id in self.compact_clients:
+                leave_room(COMPACT_PRICES_ROOM)
+                self.compact_clients.discard(client_id)
+            join_room(ALL_PRICES_ROOM)
+            if self.price_cache:
+                emit('price_batch', {
+                    'timestamp': datetime.now().isoformat(),
+                    'prices': dict(self.price_cache)
+                })
+        
+        @self.socketio.on('unsubscribe_prices')
+        def handle_unsubscribe_prices(data=None):
+            leave_room(ALL_PRICES_ROOM)
+            leave_room(COMPACT_PRICES_ROOM)
+            self.compact_clients.discard(request.sid)
+        
+        # Quadros de preço: iniciado aqui, na thread do servidor. Com eventlet o
+        # greenlet vai para o hub da thread que chama, e as threads do feed
+        # (asyncio/REST) nunca rodam esse hub
+        self._start_price_flusher()
     
     def broadcast_price_update(self, symbol: str, price_data: Dict[str, Any]):
-        """Transmitir atualização de preço para clientes subscritos"""
+        """Agendar atualização de preço para o próximo quadro (substitui o tick pendente)"""
+        self._queue_price(symbol, price_data)
+    
+    def publish_price(self, symbol: str, price: float):
+        """Como broadcast_price_update, só com o preço (sem montar dict por tick)"""
+        self._queue_price(symbol, price)
+    
+    def _queue_price(self, symbol: str, data):
+        with self._pending_lock:
+            if symbol in self.pending_prices:
+                self.price_stats['coalesced'] += 1
+            self.pending_prices[symbol] = data
+            self.price_stats['ticks'] += 1
+    
+    def _start_price_flusher(self):
+        with self._pending_lock:
+            if self._price_flusher_started:
+                return
+            self._price_flusher_started = True
+        self.socketio.start_background_task(self._price_flush_loop)
+    
+    def _price_flush_loop(self):
+        while True:
+            self.socketio.sleep(self.price_frame_interval)
+            self.flush_prices()
+    
+    def flush_prices(self):
+        """Enviar o quadro atual: só símbolos cujo preço mudou desde o último envio"""
         try:
-            # Atualizar cache
-            self.price_cache[symbol] = {
-                'price': price_data.get('price', 0),
-                'change_24h': price_data.get('change_24h', 0),
-                'change_percent': price_data.get('change_percent', 0),
-                'volume': price_data.get('volume', 0),
-                'timestamp': datetime.now().isoformat()
-            }
+            with self._pending_lock:
+                pending, self.pending_prices = self.pending_prices, {}
+            if not pending:
+                return
             
-            # Transmitir para clientes subscritos
-            self.socketio.emit('price_update', {
-                'symbol': symbol,
-                'data': self.price_cache[symbol]
-            }, room=f"symbol_{symbol}")
+            now = time.time()
+            timestamp = datetime.fromtimestamp(now).isoformat()
+            changed = {}
+            for symbol, data in pending.items():
+                if not isinstance(data, dict):
+                    data = {'price': data}
+                price = data.get('price', 0)
+                previous = self.price_cache.get(symbol)
+                if previous is not None and previous['price'] == price:
+                    self.price_stats['unchanged'] += 1
+                    continue
+                # Ticks só com preço mantêm variação/volume do último envio (o quadro
+                # compacto não os repete); campos nunca informados ficam de fora
+                entry = dict(previous) if previous is not None else {}
+                entry.update({name: data[name] for name in ('change_24h', 'change_percent', 'volume')
+                              if name in data})
+                entry.update({'price': price, 'timestamp': timestamp})
+                changed[symbol] = self.price_cache[symbol] = entry
+            self.price_stats['frames'] += 1
+            if not changed:
+                return
             
-            # Log apenas a cada 30 segundos para evitar spam
-            now = datetime.now()
-            last_log = self.last_updates.get(f"price_{symbol}")
+            # Estado do codificador avança a cada quadro, mesmo sem clientes compactos,
+            # para o próximo quadro-chave refletir os últimos preços
+            with self._frame_lock:
+                frame, new_symbols = self.price_encoder.encode(changed, now * 1000)
+                if self.compact_clients:
+                    if new_symbols:
+                        self.socketio.emit('price_symbols', {
+                            'offset': len(self.price_encoder.symbols) - len(new_symbols),
+                            'symbols': new_symbols
+                        }, room=COMPACT_PRICES_ROOM)
+                    self.socketio.emit('price_frame', frame, room=COMPACT_PRICES_ROOM)
+                    self.price_stats['compact_frames'] += 1
+                    self.price_stats['compact_bytes'] += len(frame)
+            
+            # Dashboards: todos os símbolos alterados
+            self.socketio.emit('price_batch', {'timestamp': timestamp, 'prices': changed}, room=ALL_PRICES_ROOM)
+            batches = 1
+            
+            # Clientes com subscrições por símbolo: um evento com os seus símbolos alterados
+            for client_id, symbols in list(self.subscribed_symbols.items()):
+                if not isinstance(symbols, list):
+                    continue
+                prices = {symbol: changed[symbol] for symbol in symbols if symbol in changed}
+                if prices:
+                    self.socketio.emit('price_batch', {'timestamp': timestamp, 'prices': prices}, room=client_id)
+                    batches += 1
+            self.price_stats['batches'] += batches
             
-            if not last_log or (now - last_log).total_seconds() > 30:
-                logger.debug(f"📈 Preço atualizado: {symbol} = ${price_data.get('price', 0):.6f}")
-                self.last_updates[f"price_{symbol}"] = now
-                
         except Exception as e:
-            logger.error(f"❌ Erro ao transmitir preço: {e}")
+            logger.error(f"❌ Erro ao transmitir preços: {e}")
+    
+    def get_price_stats(self) -> Dict[str, int]:
+        """Contadores do envio de preços em quadros"""
+        with self._pending_lock:
+            return dict(self.price_stats)
     
     def broadcast_new_signal(self, signal_data: Dict[str, Any]):
         """Transmitir novo sinal para todos os clientes"""
@@ -216,6 +345,23 @@ class RealTimeUpdates:
         """Subscrições ativas por cliente"""
         return dict(self.subscribed_symbols)
     
+    def get_subscribed_symbols(self) -> Set[str]:
+        """Símbolos assinados por pelo menos um cliente"""
+        return {symbol for symbols in list(self.subscribed_symbols.values())
+                if isinstance(symbols, list) for symbol in symbols}
+    
+    def add_subscription_listener(self, callback: Callable[[Set[str]], None]):
+        """Receber o conjunto de símbolos assinados sempre que ele mudar"""
+        self.subscription_listeners.append(callback)
+    
+    def _notify_subscriptions(self):
+        symbols = self.get_subscribed_symbols()
+        for callback in self.subscription_listeners:
+            try:
+                callback(symbols)
+            except Exception as e:
+                logger.error(f"❌ Erro no listener de subscrições: {e}")
+    
     # Métodos de compatibilidade
     def notify_new_signal(self, signal_data: Dict[str, Any]):
         """Alias para broadcast_new_signal"""
@@ -258,10 +404,13 @@ class RealTimeUpdates:
 # Instância global
 realtime_updates = None
 
-def initialize_realtime_updates(socketio: SocketIO) -> RealTimeUpdates:
+def initialize_realtime_updates(socketio: SocketIO, config=None) -> RealTimeUpdates:
     """Inicializar sistema de atualizações em tempo real"""
     global realtime_updates
-    realtime_updates = RealTimeUpdates(socketio)
+    settings = getattr(config, 'REALTIME_PRICE_FEED', None) or {}
+    realtime_updates = RealTimeUpdates(socketio,
+                                       price_frame_interval=settings.get('broadcast_frame_ms', 250) / 1000,
+                                       compact_payloads=settings.get('compact_payloads', True))
     realtime_updates.setup_events()
     return realtime_updates
 
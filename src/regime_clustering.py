@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Clustering incremental de regimes de mercado
+
+Mantém, por série (symbol, timeframe), um MiniBatchKMeans e o StandardScaler
+usados no primeiro ajuste. Nas chamadas seguintes apenas os candles novos são
+normalizados, classificados (predict) e usados em um passo partial_fit; os
+rótulos dos candles já vistos vêm do cache da série.
+
+O modelo é reajustado do zero a cada refit_every candles novos ou quando a
+distância média dos novos candles aos centróides (média móvel exponencial)
+passa de drift_threshold vezes a distância do ajuste (no mínimo
+drift_min_candles candles após o último ajuste). No reajuste os novos
+centróides são pareados com os antigos (algoritmo húngaro), então os ids e os
+nomes dos regimes não trocam entre chamadas.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+from scipy.spatial.distance import cdist
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import StandardScaler
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Função que nomeia os clusters a partir dos centróides normalizados
+Interpreter = Callable[[np.ndarray, np.ndarray, List[str]], Dict[int, str]]
+
+
+class _SeriesClusters:
+    """Modelo de clustering de uma série e rótulos já atribuídos"""
+
+    def __init__(self, feature_names: List[str]):
+        self.feature_names = list(feature_names)
+        self.scaler: Optional[StandardScaler] = None
+        self.kmeans: Optional[MiniBatchKMeans] = None
+        self.id_map: Optional[np.ndarray] = None  # cluster do kmeans -> id estável
+        self.interpretations: Dict[int, str] = {}
+        self.labels: Optional[pd.Series] = None   # id estável por timestamp
+        self.fit_distance = 0.0
+        self.recent_distance = 0.0
+        self.rows_since_fit = 0
+        self.lock = threading.Lock()
+
+
+class IncrementalRegimeClusterer:
+    """Cache de modelos MiniBatchKMeans por (symbol, timeframe)"""
+
+    def __init__(self, n_clusters: int = 4, batch_size: int = 256, refit_every: int = 500,
+                 drift_threshold: float = 2.0, drift_smoothing: float = 0.05,
+                 drift_min_candles: int = 50, max_series: int = 128):
+        self.n_clusters = n_clusters
+        self.batch_size = batch_size
+        self.refit_every = refit_every
+        self.drift_threshold = drift_threshold
+        self.drift_smoothing = drift_smoothing
+        self.drift_min_candles = drift_min_candles
+        self.max_series = max_series
+        self._models: 'OrderedDict[Tuple[str, str], _SeriesClusters]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'fits': 0, 'refits_scheduled': 0, 'refits_drift': 0,
+                      'updates': 0, 'cached': 0}
+
+    @classmethod
+    def from_config(cls, config) -> 'IncrementalRegimeClusterer':
+        settings = getattr(config, 'REGIME_CLUSTERING', None) or {}
+        return cls(
+            n_clusters=settings.get('n_clusters', 4),
+            batch_size=settings.get('batch_size', 256),
+            refit_every=settings.get('refit_every_candles', 500),
+            drift_threshold=settings.get('drift_threshold', 2.0),
+            drift_smoothing=settings.get('drift_smoothing', 0.05),
+            drift_min_candles=settings.get('drift_min_candles', 50),
+            max_series=settings.get('max_series', 128),
+        )
+
+    def assign(self, symbol: str, timeframe: str, index: pd.Index, features: np.ndarray,
+               feature_names: List[str], interpret: Interpreter) -> Tuple[np.ndarray, Dict[int, str]]:
+        """
+        Ids de cluster estáveis para as linhas de features (sem NaN) com o
+        índice informado, e o nome de cada id.
+        """
+        model = self._get_model((symbol, timeframe), feature_names)
+
+        with model.lock:
+            if model.kmeans is None:
+                self._fit(model, features, interpret)
+                self._count('fits')
+                labels = self._predict(model, features)
+            else:
+                labels = self._update(model, index, features, interpret)
+
+            model.labels = pd.Series(labels, index=index)
+            return labels, dict(model.interpretations)
+
+    def reset(self, symbol: Optional[str] = None, timeframe: Optional[str] = None):
+        """Descartar o modelo de uma série (ou de todas)"""
+        with self._lock:
+            if symbol is None:
+                self._models.clear()
+                return
+            for key in [k for k in self._models
+                        if k[0] == symbol and (timeframe is None or k[1] == timeframe)]:
+                del self._models[key]
+
+    def get_stats(self) -> Dict:
+        """Contadores de ajustes e atualizações dos modelos"""
+        with self._lock:
+            return {**self.stats, 'series': len(self._models)}
+
+    # === Atualização do modelo ===
+
+    def _update(self, model: _SeriesClusters, index: pd.Index, features: np.ndarray,
+                interpret: Interpreter) -> np.ndarray:
+        positions = model.labels.index.get_indexer(index)
+        cached = np.where(positions >= 0, model.labels.to_numpy()[positions], -1)
+        unseen = positions < 0
+        # O candle aberto muda a cada chamada: reclassificar também o último já visto
+        refresh = unseen | (positions == len(model.labels) - 1)
+
+        if not refresh.any():
+            self._count('cached')
+            return cached
+
+        new_rows = features[unseen]
+        if len(new_rows):
+            scaled = model.scaler.transform(new_rows)
+            distance = float(np.mean(np.min(model.kmeans.transform(scaled), axis=1) ** 2))
+            weight = 1 - (1 - self.drift_smoothing) ** len(new_rows)
+            model.recent_distance += weight * (distance - model.recent_distance)
+            model.rows_since_fit += len(new_rows)
+
+            # Janela recém-reajustada ainda mistura o regime antigo: esperar drift_min_candles
+            drifted = (model.rows_since_fit >= self.drift_min_candles and
+                       model.recent_distance > self.drift_threshold * model.fit_distance)
+            if drifted or model.rows_since_fit >= self.refit_every:
+                logger.info(f"🔄 Reajustando clusters de regime "
+                            f"({'drift' if drifted else 'agendado'}, {model.rows_since_fit} candles novos)")
+                self._fit(model, features, interpret)
+                self._count('refits_drift' if drifted else 'refits_scheduled')
+                return self._predict(model, features)
+
+            model.kmeans.partial_fit(scaled)
+            self._count('updates')
+
+        labels = cached.copy()
+        labels[refresh] = self._predict(model, features[refresh])
+        return labels
+
+    def _fit(self, model: _SeriesClusters, features: np.ndarray, interpret: Interpreter):
+        """Ajustar scaler e MiniBatchKMeans do zero, mantendo os ids do modelo anterior"""
+        scaler = StandardScaler()
+        scaled = scaler.fit_transform(features)
+        kmeans = MiniBatchKMeans(n_clusters=self.n_clusters, batch_size=self.batch_size,
+                                 random_state=42, n_init=3)
+        kmeans.fit(scaled)
+
+        if model.kmeans is None:
+            id_map = np.arange(self.n_clusters)
+        else:
+            # Centróides antigos levados para a escala nova e pareados com os novos
+            previous = scaler.transform(model.scaler.inverse_transform(model.kmeans.cluster_centers_))
+            new_clusters, old_clusters = linear_sum_assignment(cdist(kmeans.cluster_centers_, previous))
+            id_map = np.empty(self.n_clusters, dtype=int)
+            id_map[new_clusters] = model.id_map[old_clusters]
+
+        names = interpret(kmeans.cluster_centers_, np.arange(self.n_clusters), model.feature_names)
+        model.interpretations = {int(id_map[c]): name.replace(f'Regime_{c}', f'Regime_{id_map[c]}')
+                                 for c, name in names.items()}
+        model.scaler, model.kmeans, model.id_map = scaler, kmeans, id_map
+        model.fit_distance = float(np.mean(np.min(kmeans.transform(scaled), axis=1) ** 2)) or 1e-12
+        model.recent_distance = model.fit_distance
+        model.rows_since_fit = 0
+
+    @staticmethod
+    def _predict(model: _SeriesClusters, features: np.ndarray) -> np.ndarray:
+        return model.id_map[model.kmeans.predict(model.scaler.transform(features))]
+
+    def _get_model(self, key: Tuple[str, str], feature_names: List[str]) -> _SeriesClusters:
+        with self._lock:
+            model = self._models.get(key)
+            if model is None or model.feature_names != list(feature_names):
+                model = _SeriesClusters(feature_names)
+                self._models[key] = model
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_series:
+                self._models.popitem(last=False)
+            return model
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Kernels de janela móvel sobre arrays NumPy
+
+Substituem os rolling(...).apply(lambda ...) que constroem uma Series por
+janela. Cada kernel recebe os valores brutos (Series ou array), trabalha com
+sliding_window_view (sem cópia) ou somas acumuladas e devolve um array float64
+do mesmo tamanho da entrada.
+
+Convenção igual à do pandas com min_periods=window: as primeiras window-1
+posições e qualquer janela que contenha NaN resultam em NaN.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _as_float_array(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+def _complete_windows(values: np.ndarray, window: int) -> np.ndarray:
+    """Máscara (tamanho n - window + 1) das janelas sem NaN"""
+    nan_count = np.concatenate(([0], np.cumsum(np.isnan(values))))
+    return (nan_count[window:] - nan_count[:-window]) == 0
+
+
+def _align(values: np.ndarray, window_result: np.ndarray, window: int,
+           valid: np.ndarray) -> np.ndarray:
+    """Posicionar o resultado por janela no fim de cada janela, com NaN no aquecimento"""
+    result = np.full(len(values), np.nan)
+    result[window - 1:] = np.where(valid, window_result, np.nan)
+    return result
+
+
+def rolling_endpoint_trend(values, window: int) -> np.ndarray:
+    """
+    Direção entre as extremidades da janela: 1 se o último valor é maior que
+    o primeiro, -1 caso contrário (equivale a x.iloc[-1] > x.iloc[0])
+    """
+    values = _as_float_array(values)
+    if len(values) < window:
+        return np.full(len(values), np.nan)
+
+    trend = np.where(values[window - 1:] > values[:len(values) - window + 1], 1.0, -1.0)
+    return _align(values, trend, window, _complete_windows(values, window))
+
+
+def rolling_lag1_autocorr(values, window: int) -> np.ndarray:
+    """Autocorrelação lag 1 de cada janela (equivale a x.autocorr(lag=1))"""
+    values = _as_float_array(values)
+    if window < 3 or len(values) < window:
+        return np.full(len(values), np.nan)
+
+    windows = sliding_window_view(values, window)
+    current = windows[:, 1:]
+    previous = windows[:, :-1]
+    current = current - current.mean(axis=1, keepdims=True)
+    previous = previous - previous.mean(axis=1, keepdims=True)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = np.einsum('ij,ij->i', current, previous)
+        scale = np.sqrt(np.einsum('ij,ij->i', current, current) *
+                        np.einsum('ij,ij->i', previous, previous))
+        autocorr = np.clip(covariance / scale, -1.0, 1.0)
+
+    return _align(values, autocorr, window, _complete_windows(values, window))
+
+
+def rolling_slope(values, window: int) -> np.ndarray:
+    """
+    Inclinação da regressão linear (mínimos quadrados, x = 0..window-1) de
+    cada janela, equivalente a np.polyfit(range(window), x, 1)[0]
+    """
+    values = _as_float_array(values)
+    if window < 2 or len(values) < window:
+        return np.full(len(values), np.nan)
+
+    # Com x centrado, sum((x - x̄)(y - ȳ)) = sum((x - x̄) y): um produto por janela
+    x_centered = np.arange(window, dtype=np.float64) - (window - 1) / 2.0
+    slope = sliding_window_view(np.nan_to_num(values), window) @ (x_centered / np.dot(x_centered, x_centered))
+    return _align(values, slope, window, _complete_windows(values, window))
+
+
+def rolling_rank_pct(values, window: int) -> np.ndarray:
+    """
+    Rank percentual do último valor dentro da janela, com empates pela média
+    (equivale a rolling(window).rank(pct=True))
+    """
+    values = _as_float_array(values)
+    if len(values) < window:
+        return np.full(len(values), np.nan)
+
+    windows = sliding_window_view(values, window)
+    last = values[window - 1:, None]
+    below = np.count_nonzero(windows < last, axis=1)
+    equal = np.count_nonzero(windows == last, axis=1)
+    rank_pct = (below + (equal + 1) / 2.0) / window
+    return _align(values, rank_pct, window, _complete_windows(values, window))
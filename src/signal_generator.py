@@ -9,6 +9,10 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import logging
 import json
+import multiprocessing
+import time
+from concurrent.futures import (FIRST_COMPLETED, Future, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
 
 try:
     from .technical_indicators import TechnicalIndicators
@@ -16,6 +20,7 @@ try:
     from .ai_engine import AITradingEngine
     from .market_analyzer import MarketAnalyzer
     from .config import Config
+    from .feature_store import get_feature_store
 except ImportError:
     # Fallback para imports absolutos quando executado diretamente
     from technical_indicators import TechnicalIndicators
@@ -23,6 +28,7 @@ except ImportError:
     from ai_engine import AITradingEngine
     from market_analyzer import MarketAnalyzer
     from config import Config
+    from feature_store import get_feature_store
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +49,21 @@ def set_socketio_instance(socketio):
     global _socketio_instance
     _socketio_instance = socketio
 
+# Indicadores usados pelos processos da varredura concorrente (um por processo).
+# Só a etapa sem estado roda nos processos: as features incluem o clustering de
+# regimes, cujo modelo persistente por (symbol, timeframe) vive no processo
+# principal e divergiria entre cópias nos processos filhos.
+_scan_worker_indicators = None
+
+def _init_scan_worker(config):
+    """Inicializar processo da varredura concorrente"""
+    global _scan_worker_indicators
+    _scan_worker_indicators = TechnicalIndicators(config)
+
+def _compute_scan_indicators(symbol: str, timeframe: str, candles: pd.DataFrame) -> pd.DataFrame:
+    """Calcular indicadores de um par dentro de um processo da varredura"""
+    return _scan_worker_indicators.calculate_all_indicators(candles, symbol, timeframe)
+
 
 
 class Signal:
@@ -87,13 +108,21 @@ class SignalGenerator:
         self.market_data = market_data
         self.config = ai_engine.config
         self.technical_indicators = TechnicalIndicators(self.config)
-        self.market_analyzer = MarketAnalyzer(self.config, market_data, ai_engine)
+        self.feature_store = get_feature_store(self.config)
+        self.market_analyzer = MarketAnalyzer(self.config, market_data, ai_engine, self.feature_store)
         self.active_signals = {}
         self.signal_history = []
         self.last_signal_time = {}
+        self.last_scan_report = {}
+        self._io_pool = None
+        self._cpu_pool = None
     
-    def generate_signal(self, symbol: str, timeframe: str = '1h') -> Optional[Signal]:
-        """Gerar sinal de trading baseado em análise de mercado com IA"""
+    def generate_signal(self, symbol: str, timeframe: str = '1h',
+                        candles: Optional[pd.DataFrame] = None) -> Optional[Signal]:
+        """Gerar sinal de trading baseado em análise de mercado com IA
+
+        candles permite informar dados já obtidos (ex.: varredura concorrente).
+        """
         print(f"🚨 TESTE DEBUG: generate_signal chamado para {symbol} {timeframe}")  # DEBUG VISÍVEL
         
         try:
@@ -106,7 +135,7 @@ class SignalGenerator:
             logger.info(f"OK Cooldown OK para {symbol}")
             
             # Obter dados de mercado
-            df = self.market_data.get_historical_data(symbol, timeframe, 500)
+            df = candles if candles is not None else self.market_data.get_historical_data(symbol, timeframe, 500)
             logger.info(f"Dados obtidos para {symbol}: {len(df)} registros")
             
             # Validação robusta dos dados
@@ -124,7 +153,8 @@ class SignalGenerator:
             
             # Calcular indicadores técnicos
             logger.info(f"Calculando indicadores técnicos para {symbol}")
-            df = self.technical_indicators.calculate_all_indicators(df)
+            candles = df
+            df = self.market_analyzer.get_indicator_frame(symbol, timeframe, candles)
             if df is None or df.empty:
                 logger.error(f"Falha ao calcular indicadores técnicos para {symbol}")
                 raise ValueError(f"INDICATORS_FAILED:{symbol}")
@@ -134,7 +164,8 @@ class SignalGenerator:
             logger.info(f"Executando análise completa de mercado com IA para {symbol}")
             market_recommendation = self.market_analyzer.get_trade_recommendation(
                 symbol=symbol,
-                timeframe=timeframe
+                timeframe=timeframe,
+                candles=candles
             )
             
             if not market_recommendation:
@@ -1292,19 +1323,204 @@ class SignalGenerator:
         except Exception as e:
             logger.error(f"Erro ao atualizar status do sinal: {e}")
     
-    def generate_signals_for_all_pairs(self) -> List[Signal]:
-        """Gerar sinais para todos os pares configurados"""
+    def generate_signals_for_all_pairs(self, timeframes: Optional[List[str]] = None) -> List[Signal]:
+        """Gerar sinais para todos os pares configurados
+
+        Por padrão a varredura é concorrente (ver SCAN_CONFIG); o relatório da
+        última varredura fica em self.last_scan_report.
+        """
+        timeframes = timeframes or [self.config.DEFAULT_TIMEFRAME]
+
+        if not self.config.SCAN_CONFIG.get('concurrent', True):
+            return self._generate_signals_sequential(timeframes)
+
+        try:
+            return self._generate_signals_concurrent(timeframes)
+        except Exception as e:
+            logger.error(f"Erro na varredura concorrente, usando varredura sequencial: {e}")
+            return self._generate_signals_sequential(timeframes)
+
+    def _generate_signals_sequential(self, timeframes: List[str]) -> List[Signal]:
+        """Varredura sequencial, um par por vez"""
         signals = []
-        
+        started = time.monotonic()
+
         try:
             for symbol in self.config.get_all_pairs():
-                signal = self.generate_signal(symbol)
-                if signal and signal.signal_type != 'hold':
-                    signals.append(signal)
-            
+                for timeframe in timeframes:
+                    signal = self.generate_signal(symbol, timeframe)
+                    if signal and signal.signal_type != 'hold':
+                        signals.append(signal)
+
             logger.info(f"Gerados {len(signals)} sinais para todos os pares")
             return signals
-            
+
         except Exception as e:
             logger.error(f"Erro ao gerar sinais para todos os pares: {e}")
-            return signals
\ No newline at end of file
+            return signals
+
+        finally:
+            self.last_scan_report = {
+                'concurrent': False,
+                'duration_seconds': round(time.monotonic() - started, 3),
+                'timed_out': [],
+                'failed': []
+            }
+
+    def _generate_signals_concurrent(self, timeframes: List[str]) -> List[Signal]:
+        """
+        Varredura concorrente em três etapas por par:
+        busca de dados (threads) -> indicadores (processos) -> features e sinal (threads).
+
+        pair_timeout_seconds vale para o par inteiro, contado desde a busca de
+        dados; pares que estouram o tempo ou falham ficam fora do resultado e
+        são listados no relatório.
+        Threads em execução não podem ser interrompidas: o trabalho atrasado
+        termina em segundo plano e seu resultado é descartado.
+        """
+        scan_config = self.config.SCAN_CONFIG
+        pair_timeout = scan_config.get('pair_timeout_seconds', 60)
+        started = time.monotonic()
+        scan_deadline = started + scan_config.get('scan_timeout_seconds', 180)
+
+        io_pool = self._get_io_pool()
+        cpu_pool = self._get_cpu_pool()
+
+        tasks = [(symbol, timeframe) for symbol in self.config.get_all_pairs() for timeframe in timeframes]
+        order = {task: position for position, task in enumerate(tasks)}
+        pending: Dict[Future, Dict] = {}
+        results: Dict[Tuple[str, str], Optional[Signal]] = {}
+        timed_out, failed = [], []
+
+        def submit(stage: str, symbol: str, timeframe: str, future: Future, candles=None,
+                   started: Optional[float] = None):
+            # started: início do par (primeira etapa), mantido nas etapas seguintes
+            pending[future] = {'stage': stage, 'symbol': symbol, 'timeframe': timeframe, 'candles': candles,
+                               'started': time.monotonic() if started is None else started}
+
+        for symbol, timeframe in tasks:
+            submit('fetch', symbol, timeframe,
+                   io_pool.submit(self.market_data.get_historical_data, symbol, timeframe, 500))
+
+        while pending:
+            now = time.monotonic()
+            if now >= scan_deadline:
+                break
+
+            next_deadline = min(task['started'] + pair_timeout for task in pending.values())
+            done, _ = wait(list(pending), timeout=max(0.0, min(next_deadline, scan_deadline) - now),
+                           return_when=FIRST_COMPLETED)
+
+            for future in done:
+                task = pending.pop(future)
+                symbol, timeframe, stage = task['symbol'], task['timeframe'], task['stage']
+
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if stage == 'frames':
+                        # Pool de processos indisponível: calcular na etapa do sinal
+                        logger.warning(f"Falha no processo de features para {symbol} {timeframe}: {e}")
+                        self._discard_cpu_pool()
+                        cpu_pool = None
+                        submit('signal', symbol, timeframe,
+                               io_pool.submit(self.generate_signal, symbol, timeframe, task['candles']),
+                               started=task['started'])
+                    else:
+                        logger.error(f"Erro na etapa '{stage}' para {symbol} {timeframe}: {e}")
+                        failed.append(f"{symbol}_{timeframe}")
+                    continue
+
+                if stage == 'fetch':
+                    candles = result
+                    if (cpu_pool is not None and candles is not None and len(candles) >= 100 and
+                            self.feature_store.get(symbol, timeframe, candles, 'indicators', count=False) is None):
+                        submit('frames', symbol, timeframe,
+                               cpu_pool.submit(_compute_scan_indicators, symbol, timeframe, candles), candles,
+                               started=task['started'])
+                    else:
+                        submit('signal', symbol, timeframe,
+                               io_pool.submit(self.generate_signal, symbol, timeframe, candles),
+                               started=task['started'])
+
+                elif stage == 'frames':
+                    # Features (com o clustering persistente) no processo principal, a partir dos indicadores
+                    self.feature_store.put(symbol, timeframe, task['candles'], 'indicators', result)
+                    submit('signal', symbol, timeframe,
+                           io_pool.submit(self.generate_signal, symbol, timeframe, task['candles']),
+                           started=task['started'])
+
+                else:
+                    results[(symbol, timeframe)] = result
+
+            now = time.monotonic()
+            for future, task in list(pending.items()):
+                if now - task['started'] >= pair_timeout:
+                    future.cancel()
+                    pending.pop(future)
+                    timed_out.append(f"{task['symbol']}_{task['timeframe']}")
+                    logger.warning(f"⏱️ Timeout na etapa '{task['stage']}' para {task['symbol']} {task['timeframe']}")
+
+        for future, task in pending.items():
+            future.cancel()
+            timed_out.append(f"{task['symbol']}_{task['timeframe']}")
+
+        signals = [signal for task, signal in sorted(results.items(), key=lambda item: order[item[0]])
+                   if signal and signal.signal_type != 'hold']
+
+        duration = time.monotonic() - started
+        self.last_scan_report = {
+            'concurrent': True,
+            'duration_seconds': round(duration, 3),
+            'pairs_total': len(tasks),
+            'completed': len(results),
+            'timed_out': timed_out,
+            'failed': failed
+        }
+
+        logger.info(f"Gerados {len(signals)} sinais para todos os pares em {duration:.1f}s "
+                    f"({len(results)}/{len(tasks)} concluídos, {len(timed_out)} timeouts, {len(failed)} falhas)")
+        return signals
+
+    def _get_io_pool(self) -> ThreadPoolExecutor:
+        """Pool de threads para busca de dados e geração de sinais"""
+        if self._io_pool is None:
+            workers = max(1, self.config.SCAN_CONFIG.get('io_workers', 8))
+            self._io_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='signal-scan')
+        return self._io_pool
+
+    def _get_cpu_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Pool de processos para indicadores, quando disponível"""
+        if self._cpu_pool is not None:
+            return self._cpu_pool
+
+        workers = self.config.SCAN_CONFIG.get('cpu_workers', 0)
+        # Os indicadores dos processos alimentam AITradingEngine.prepare_features:
+        # engines que o sobrescrevem continuam calculando nas threads.
+        # Sem fork, o processo filho reexecutaria o módulo principal (main.py).
+        if (workers <= 0 or
+                type(self.ai_engine).prepare_features is not AITradingEngine.prepare_features or
+                'fork' not in multiprocessing.get_all_start_methods()):
+            return None
+
+        try:
+            self._cpu_pool = ProcessPoolExecutor(max_workers=workers,
+                                                 mp_context=multiprocessing.get_context('fork'),
+                                                 initializer=_init_scan_worker,
+                                                 initargs=(self.config,))
+        except Exception as e:
+            logger.warning(f"Pool de processos indisponível, usando threads: {e}")
+            self._cpu_pool = None
+        return self._cpu_pool
+
+    def _discard_cpu_pool(self):
+        if self._cpu_pool is not None:
+            self._cpu_pool.shutdown(wait=False, cancel_futures=True)
+            self._cpu_pool = None
+
+    def shutdown(self):
+        """Encerrar os pools da varredura concorrente"""
+        if self._io_pool is not None:
+            self._io_pool.shutdown(wait=False, cancel_futures=True)
+            self._io_pool = None
+        self._discard_cpu_pool()
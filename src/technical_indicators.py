@@ -6,9 +6,14 @@ Indicadores técnicos para análise de mercado
 import pandas as pd
 import numpy as np
 import ta
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional
 import logging
 
+try:
+    from .incremental_indicators import IndicatorContext, incremental_indicator_engine
+except ImportError:
+    from incremental_indicators import IndicatorContext, incremental_indicator_engine
+
 logger = logging.getLogger(__name__)
 
 class TechnicalIndicators:
@@ -17,46 +22,67 @@ class TechnicalIndicators:
     def __init__(self, config):
         self.config = config
     
-    def calculate_all_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Calcular todos os indicadores técnicos"""
+    def calculate_all_indicators(self, df: pd.DataFrame, symbol: Optional[str] = None,
+                                 timeframe: Optional[str] = None) -> pd.DataFrame:
+        """Calcular todos os indicadores técnicos
+
+        Informando symbol e timeframe, o cálculo passa pelo motor incremental,
+        que reaproveita o estado da chamada anterior da mesma série.
+        """
+        if symbol and timeframe:
+            return incremental_indicator_engine.calculate(self, df, symbol, timeframe)
+        
+        df = df.copy()
         try:
-            df = df.copy()
-            
-            # Médias móveis
-            df = self._add_moving_averages(df)
-            
-            # Indicadores de momentum
-            df = self._add_momentum_indicators(df)
-            
-            # Indicadores de volatilidade
-            df = self._add_volatility_indicators(df)
-              # Indicadores de volume
-            df = self._add_volume_indicators(df)
-            
-            # MELHORIA 2: Indicadores avançados de volume
-            df = self._add_advanced_volume_indicators(df)
-            
-            # Indicadores de tendência
-            df = self._add_trend_indicators(df)
-              # Padrões de candlestick
-            df = self._add_candlestick_patterns(df)
-            
-            # MELHORIA 3: Padrões avançados de candlestick
-            df = self._add_advanced_candlestick_patterns(df)
-            
-            # MELHORIA 3: Padrões de Candlestick Automáticos Avançados
-            df = self._add_advanced_candlestick_patterns(df)
-            
-            # MELHORIA 5: ANÁLISE DE SENTIMENTO DE MERCADO
-            df = self._add_market_sentiment_indicators(df)
-            
-            return df
+            return self._calculate_indicators(df)
             
         except Exception as e:
             logger.error(f"Erro ao calcular indicadores: {e}")
             return df
     
-    def _add_moving_averages(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _calculate_indicators(self, df: pd.DataFrame,
+                              context: Optional[IndicatorContext] = None) -> pd.DataFrame:
+        """Pipeline de indicadores (context permite continuar a série incrementalmente)"""
+        # Médias móveis
+        df = self._add_moving_averages(df, context)
+        
+        # Indicadores de momentum
+        df = self._add_momentum_indicators(df, context)
+        
+        # Indicadores de volatilidade
+        df = self._add_volatility_indicators(df, context)
+          # Indicadores de volume
+        df = self._add_volume_indicators(df)
+        
+        # MELHORIA 2: Indicadores avançados de volume
+        df = self._add_advanced_volume_indicators(df)
+        
+        # Indicadores de tendência
+        df = self._add_trend_indicators(df, context)
+        
+        # Padrões de candlestick (olham no máximo 2 candles para trás)
+        if context is not None:
+            df = context.splice(df, self._add_all_candlestick_patterns, context_rows=2)
+        else:
+            df = self._add_all_candlestick_patterns(df)
+        
+        # MELHORIA 5: ANÁLISE DE SENTIMENTO DE MERCADO
+        df = self._add_market_sentiment_indicators(df)
+        
+        return df
+    
+    def _add_all_candlestick_patterns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Padrões de candlestick básicos e avançados"""
+          # Padrões de candlestick
+        df = self._add_candlestick_patterns(df)
+        
+        # MELHORIA 3: Padrões de Candlestick Automáticos Avançados
+        df = self._add_advanced_candlestick_patterns(df)
+        
+        return df
+    
+    def _add_moving_averages(self, df: pd.DataFrame,
+                             context: Optional[IndicatorContext] = None) -> pd.DataFrame:
         """Adicionar médias móveis"""
         # SMA (Simple Moving Average)
         for period in self.config.TECHNICAL_INDICATORS['sma_periods']:
@@ -64,27 +90,41 @@ class TechnicalIndicators:
         
         # EMA (Exponential Moving Average)
         for period in self.config.TECHNICAL_INDICATORS['ema_periods']:
-            df[f'ema_{period}'] = ta.trend.ema_indicator(df['close'], window=period)
+            if context is not None:
+                df[f'ema_{period}'] = context.ema(f'ema_{period}', df['close'], period)
+            else:
+                df[f'ema_{period}'] = ta.trend.ema_indicator(df['close'], window=period)
         
         # WMA (Weighted Moving Average)
         df['wma_20'] = ta.trend.wma_indicator(df['close'], window=20)
         
         return df
     
-    def _add_momentum_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _add_momentum_indicators(self, df: pd.DataFrame,
+                                 context: Optional[IndicatorContext] = None) -> pd.DataFrame:
         """Adicionar indicadores de momentum"""
         # RSI (Relative Strength Index)
         rsi_period = self.config.TECHNICAL_INDICATORS['rsi_period']
-        df['rsi'] = ta.momentum.rsi(df['close'], window=rsi_period)
+        if context is not None:
+            df['rsi'] = context.rsi('rsi', df['close'], rsi_period)
+        else:
+            df['rsi'] = ta.momentum.rsi(df['close'], window=rsi_period)
         
         # MACD (Moving Average Convergence Divergence)
         macd_fast = self.config.TECHNICAL_INDICATORS['macd_fast']
         macd_slow = self.config.TECHNICAL_INDICATORS['macd_slow']
         macd_signal = self.config.TECHNICAL_INDICATORS['macd_signal']
         
-        macd_line = ta.trend.macd_diff(df['close'], window_fast=macd_fast, window_slow=macd_slow)
-        macd_signal_line = ta.trend.macd_signal(df['close'], window_fast=macd_fast, 
-                                               window_slow=macd_slow, window_sign=macd_signal)
+        if context is not None:
+            # Mesma composição do ta: macd_diff usa a janela de sinal padrão (9)
+            macd_raw = (context.ema(f'ema_{macd_fast}', df['close'], macd_fast) -
+                        context.ema(f'ema_{macd_slow}', df['close'], macd_slow))
+            macd_line = macd_raw - context.ema('macd_raw_signal_9', macd_raw, 9)
+            macd_signal_line = context.ema(f'macd_raw_signal_{macd_signal}', macd_raw, macd_signal)
+        else:
+            macd_line = ta.trend.macd_diff(df['close'], window_fast=macd_fast, window_slow=macd_slow)
+            macd_signal_line = ta.trend.macd_signal(df['close'], window_fast=macd_fast, 
+                                                   window_slow=macd_slow, window_sign=macd_signal)
         
         df['macd'] = macd_line
         df['macd_signal'] = macd_signal_line
@@ -110,7 +150,8 @@ class TechnicalIndicators:
         
         return df
     
-    def _add_volatility_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _add_volatility_indicators(self, df: pd.DataFrame,
+                                   context: Optional[IndicatorContext] = None) -> pd.DataFrame:
         """Adicionar indicadores de volatilidade"""
         # Bollinger Bands
         bb_period = self.config.TECHNICAL_INDICATORS['bb_period']
@@ -124,7 +165,10 @@ class TechnicalIndicators:
         
         # ATR (Average True Range)
         atr_period = self.config.TECHNICAL_INDICATORS['atr_period']
-        df['atr'] = ta.volatility.average_true_range(df['high'], df['low'], df['close'], window=atr_period)
+        if context is not None:
+            df['atr'] = context.atr('atr', df['high'], df['low'], df['close'], atr_period)
+        else:
+            df['atr'] = ta.volatility.average_true_range(df['high'], df['low'], df['close'], window=atr_period)
         
         # Keltner Channels
         df['kc_upper'] = ta.volatility.keltner_channel_hband(df['high'], df['low'], df['close'], window=20)
@@ -170,13 +214,18 @@ class TechnicalIndicators:
         
         return df
     
-    def _add_trend_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _add_trend_indicators(self, df: pd.DataFrame,
+                              context: Optional[IndicatorContext] = None) -> pd.DataFrame:
         """Adicionar indicadores de tendência"""
         # ADX (Average Directional Index)
         adx_period = self.config.TECHNICAL_INDICATORS['adx_period']
-        df['adx'] = ta.trend.adx(df['high'], df['low'], df['close'], window=adx_period)
-        df['adx_pos'] = ta.trend.adx_pos(df['high'], df['low'], df['close'], window=adx_period)
-        df['adx_neg'] = ta.trend.adx_neg(df['high'], df['low'], df['close'], window=adx_period)
+        if context is not None:
+            df['adx'], df['adx_pos'], df['adx_neg'] = context.adx(
+                'adx', df['high'], df['low'], df['close'], adx_period)
+        else:
+            df['adx'] = ta.trend.adx(df['high'], df['low'], df['close'], window=adx_period)
+            df['adx_pos'] = ta.trend.adx_pos(df['high'], df['low'], df['close'], window=adx_period)
+            df['adx_neg'] = ta.trend.adx_neg(df['high'], df['low'], df['close'], window=adx_period)
         
         # Parabolic SAR
         df['psar'] = ta.trend.psar_down(df['high'], df['low'], df['close'])        
@@ -675,16 +724,19 @@ class TechnicalIndicators:
         Detecta padrões complexos com alta precisão
         """
         try:
+            # Corpo, sombras e range calculados uma única vez para todos os padrões
+            patterns = self._advanced_candlestick_kernel(df)
+            
             # === PADRÕES BULLISH (ALTA) ===
             
             # 1. Hammer (Martelo)
-            df['hammer_advanced'] = self._detect_hammer_advanced(df)
+            df['hammer_advanced'] = patterns['hammer_advanced']
             
             # 2. Morning Star (Estrela da Manhã)
-            df['morning_star_advanced'] = self._detect_morning_star_advanced(df)
+            df['morning_star_advanced'] = patterns['morning_star_advanced']
             
             # 3. Bullish Engulfing (Engolfo de Alta)
-            df['bullish_engulfing_advanced'] = self._detect_bullish_engulfing_advanced(df)
+            df['bullish_engulfing_advanced'] = patterns['bullish_engulfing_advanced']
             
             # 4. Piercing Pattern (Padrão Perfurante)
             df['piercing_pattern'] = self._detect_piercing_pattern(df)
@@ -698,13 +750,13 @@ class TechnicalIndicators:
             # === PADRÕES BEARISH (BAIXA) ===
             
             # 7. Shooting Star (Estrela Cadente)
-            df['shooting_star_advanced'] = self._detect_shooting_star_advanced(df)
+            df['shooting_star_advanced'] = patterns['shooting_star_advanced']
             
             # 8. Evening Star (Estrela da Tarde)
             df['evening_star_advanced'] = self._detect_evening_star_advanced(df)
             
             # 9. Bearish Engulfing (Engolfo de Baixa)
-            df['bearish_engulfing_advanced'] = self._detect_bearish_engulfing_advanced(df)
+            df['bearish_engulfing_advanced'] = patterns['bearish_engulfing_advanced']
             
             # 10. Dark Cloud Cover (Cobertura de Nuvem Escura)
             df['dark_cloud_cover'] = self._detect_dark_cloud_cover(df)
@@ -718,13 +770,13 @@ class TechnicalIndicators:
             # === PADRÕES DE REVERSÃO/INDECISÃO ===
             
             # 13. Doji Avançado
-            df['doji_advanced'] = self._detect_doji_advanced(df)
+            df['doji_advanced'] = patterns['doji_advanced']
             
             # 14. Spinning Top (Pião)
-            df['spinning_top'] = self._detect_spinning_top(df)
+            df['spinning_top'] = patterns['spinning_top']
             
             # 15. Long-Legged Doji (Doji de Pernas Longas)
-            df['long_legged_doji'] = self._detect_long_legged_doji(df)
+            df['long_legged_doji'] = patterns['long_legged_doji']
             
             # === SCORES CONSOLIDADOS ===
             
@@ -745,203 +797,108 @@ class TechnicalIndicators:
             return df    
     # === MÉTODOS DE DETECÇÃO AVANÇADOS ===
     
-    def _detect_hammer_advanced(self, df: pd.DataFrame) -> pd.Series:
-        """Detectar Hammer com critérios mais flexíveis"""
+    def _advanced_candlestick_kernel(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Kernel vetorizado dos padrões avançados de candlestick.
+        Calcula corpo, sombras e range uma única vez e avalia todos os padrões
+        como máscaras sobre arrays deslocados (mesmos critérios dos detectores).
+        """
+        open_ = df['open'].to_numpy(dtype=np.float64)
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
+        n = len(close)
+        
+        body = np.abs(close - open_)
+        upper_shadow = high - np.maximum(open_, close)
+        lower_shadow = np.minimum(open_, close) - low
+        total_range = high - low
+        bullish = close > open_
+        bearish = close < open_
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            body_ratio = body / total_range
+            min_shadow_ratio = np.minimum(upper_shadow, lower_shadow) / total_range
+        
+        has_range = total_range > 0
+        has_body = has_range & (body > 0)
+        small_body = body <= (total_range * 0.4)
+        
+        # Padrões de um candle (hammer/shooting star ignoram o primeiro candle)
+        hammer = has_body & (lower_shadow >= (body * 1.5)) & (upper_shadow <= body) & small_body
+        shooting_star = has_body & (upper_shadow >= (body * 1.5)) & (lower_shadow <= body) & small_body
+        hammer[:1] = False
+        shooting_star[:1] = False
+        
+        doji = has_range & (body_ratio <= 0.1)
+        spinning_top = has_body & (body_ratio <= 0.3) & (np.minimum(upper_shadow, lower_shadow) >= body)
+        long_legged_doji = has_range & (body_ratio <= 0.05) & (min_shadow_ratio >= 0.3)
+        
+        # Padrões de dois candles: [1:] é o candle atual, [:-1] o anterior
+        bullish_engulfing = np.zeros(n, dtype=bool)
+        bearish_engulfing = np.zeros(n, dtype=bool)
+        if n > 1:
+            bigger_body = body[1:] > body[:-1] * 1.1
+            bullish_engulfing[1:] = (bearish[:-1] & bullish[1:] & bigger_body &
+                                     (close[1:] > open_[:-1]))
+            bearish_engulfing[1:] = (bullish[:-1] & bearish[1:] & bigger_body &
+                                     (close[1:] < open_[:-1]))
+        
+        # Morning Star: candles i-2 (bearish), i-1 (estrela) e i (bullish)
+        morning_star = np.zeros(n, dtype=bool)
+        if n > 2:
+            morning_star[2:] = (
+                bearish[:-2] &
+                (body[:-2] > body[1:-1] * 3) &
+                (high[1:-1] < low[:-2]) &
+                bullish[2:] &
+                (open_[2:] > high[1:-1]) &
+                (close[2:] > (open_[:-2] + close[:-2]) / 2)
+            )
+        
+        patterns = {
+            'hammer_advanced': hammer,
+            'morning_star_advanced': morning_star,
+            'bullish_engulfing_advanced': bullish_engulfing,
+            'shooting_star_advanced': shooting_star,
+            'bearish_engulfing_advanced': bearish_engulfing,
+            'doji_advanced': doji,
+            'spinning_top': spinning_top,
+            'long_legged_doji': long_legged_doji,
+        }
+        return {name: mask.astype(np.int64) for name, mask in patterns.items()}
+    
+    def _advanced_pattern_series(self, df: pd.DataFrame, name: str) -> pd.Series:
+        """Série de um único padrão avançado calculada pelo kernel"""
         try:
-            signals = pd.Series(0, index=df.index)
-            
-            for i in range(1, len(df)):
-                high = df.iloc[i]['high']
-                low = df.iloc[i]['low']
-                open_price = df.iloc[i]['open']
-                close = df.iloc[i]['close']
-                
-                # Corpo do candle
-                body = abs(close - open_price)
-                # Sombra inferior
-                lower_shadow = min(open_price, close) - low
-                # Sombra superior
-                upper_shadow = high - max(open_price, close)
-                # Range total
-                total_range = high - low
-                
-                if total_range > 0 and body > 0:
-                    # Critérios flexíveis para Hammer:
-                    # 1. Sombra inferior >= 1.5x o corpo
-                    # 2. Sombra superior <= corpo
-                    # 3. Corpo pequeno em relação ao range
-                    
-                    condition1 = lower_shadow >= (body * 1.5)
-                    condition2 = upper_shadow <= body
-                    condition3 = body <= (total_range * 0.4)  # Corpo pequeno
-                    
-                    if condition1 and condition2 and condition3:
-                        signals.iloc[i] = 1
-            
-            return signals
+            return pd.Series(self._advanced_candlestick_kernel(df)[name], index=df.index)
             
         except Exception:
             return pd.Series(0, index=df.index)
     
+    def _detect_hammer_advanced(self, df: pd.DataFrame) -> pd.Series:
+        """Detectar Hammer com critérios mais flexíveis"""
+        return self._advanced_pattern_series(df, 'hammer_advanced')
+    
     def _detect_morning_star_advanced(self, df: pd.DataFrame) -> pd.Series:
         """Detectar Morning Star (padrão de 3 candles)"""
-        try:
-            signals = pd.Series(0, index=df.index)
-            
-            for i in range(2, len(df)):
-                # Três candles: primeiro (i-2), segundo (i-1), terceiro (i)
-                candle1 = df.iloc[i-2]  # Primeiro: bearish
-                candle2 = df.iloc[i-1]  # Segundo: pequeno corpo (star)
-                candle3 = df.iloc[i]    # Terceiro: bullish
-                
-                # Corpos dos candles
-                body1 = abs(candle1['close'] - candle1['open'])
-                body2 = abs(candle2['close'] - candle2['open'])
-                body3 = abs(candle3['close'] - candle3['open'])
-                
-                # Critérios para Morning Star:
-                # 1. Primeiro candle: bearish forte
-                # 2. Segundo candle: corpo pequeno (gap down)
-                # 3. Terceiro candle: bullish forte (gap up)
-                
-                condition1 = candle1['close'] < candle1['open']  # Bearish
-                condition2 = body1 > body2 * 3  # Primeiro corpo >> segundo corpo
-                condition3 = candle2['high'] < candle1['low']  # Gap down
-                condition4 = candle3['close'] > candle3['open']  # Bullish
-                condition5 = candle3['open'] > candle2['high']  # Gap up
-                condition6 = candle3['close'] > (candle1['open'] + candle1['close']) / 2  # Recuperação significativa
-                
-                if condition1 and condition2 and condition3 and condition4 and condition5 and condition6:
-                    signals.iloc[i] = 1
-            
-            return signals
-            
-        except Exception:
-            return pd.Series(0, index=df.index)
+        return self._advanced_pattern_series(df, 'morning_star_advanced')
     
     def _detect_shooting_star_advanced(self, df: pd.DataFrame) -> pd.Series:
         """Detectar Shooting Star (martelo invertido bearish)"""
-        try:
-            signals = pd.Series(0, index=df.index)
-            
-            for i in range(1, len(df)):
-                high = df.iloc[i]['high']
-                low = df.iloc[i]['low']
-                open_price = df.iloc[i]['open']
-                close = df.iloc[i]['close']
-                
-                # Corpo do candle
-                body = abs(close - open_price)
-                # Sombra superior
-                upper_shadow = high - max(open_price, close)
-                # Sombra inferior
-                lower_shadow = min(open_price, close) - low
-                # Range total
-                total_range = high - low
-                
-                if total_range > 0 and body > 0:
-                    # Critérios para Shooting Star:
-                    # 1. Sombra superior >= 1.5x o corpo
-                    # 2. Sombra inferior <= corpo
-                    # 3. Corpo pequeno em relação ao range
-                    
-                    condition1 = upper_shadow >= (body * 1.5)
-                    condition2 = lower_shadow <= body
-                    condition3 = body <= (total_range * 0.4)
-                    
-                    if condition1 and condition2 and condition3:
-                        signals.iloc[i] = 1
-            
-            return signals
-            
-        except Exception:
-            return pd.Series(0, index=df.index)
+        return self._advanced_pattern_series(df, 'shooting_star_advanced')
     
     def _detect_doji_advanced(self, df: pd.DataFrame) -> pd.Series:
         """Detectar Doji (indecisão)"""
-        try:
-            signals = pd.Series(0, index=df.index)
-            
-            for i in range(len(df)):
-                high = df.iloc[i]['high']
-                low = df.iloc[i]['low']
-                open_price = df.iloc[i]['open']
-                close = df.iloc[i]['close']
-                
-                # Range total
-                total_range = high - low
-                # Corpo do candle
-                body = abs(close - open_price)
-                
-                if total_range > 0:
-                    # Doji: corpo muito pequeno em relação ao range
-                    body_ratio = body / total_range
-                    
-                    if body_ratio <= 0.1:  # Corpo <= 10% do range total
-                        signals.iloc[i] = 1
-            
-            return signals
-            
-        except Exception:
-            return pd.Series(0, index=df.index)
+        return self._advanced_pattern_series(df, 'doji_advanced')
     
     def _detect_bullish_engulfing_advanced(self, df: pd.DataFrame) -> pd.Series:
         """Detectar Bullish Engulfing simplificado"""
-        try:
-            signals = pd.Series(0, index=df.index)
-            
-            for i in range(1, len(df)):
-                prev_candle = df.iloc[i-1]
-                curr_candle = df.iloc[i]
-                
-                # Candle anterior bearish, atual bullish
-                prev_bearish = prev_candle['close'] < prev_candle['open']
-                curr_bullish = curr_candle['close'] > curr_candle['open']
-                
-                # Corpo atual maior que o anterior
-                prev_body = abs(prev_candle['close'] - prev_candle['open'])
-                curr_body = abs(curr_candle['close'] - curr_candle['open'])
-                bigger_body = curr_body > prev_body * 1.1
-                
-                # Fechamento atual acima da abertura anterior
-                closes_above = curr_candle['close'] > prev_candle['open']
-                
-                if prev_bearish and curr_bullish and bigger_body and closes_above:
-                    signals.iloc[i] = 1
-            
-            return signals
-            
-        except Exception:
-            return pd.Series(0, index=df.index)
+        return self._advanced_pattern_series(df, 'bullish_engulfing_advanced')
     
     def _detect_bearish_engulfing_advanced(self, df: pd.DataFrame) -> pd.Series:
         """Detectar Bearish Engulfing simplificado"""
-        try:
-            signals = pd.Series(0, index=df.index)
-            
-            for i in range(1, len(df)):
-                prev_candle = df.iloc[i-1]
-                curr_candle = df.iloc[i]
-                
-                # Candle anterior bullish, atual bearish
-                prev_bullish = prev_candle['close'] > prev_candle['open']
-                curr_bearish = curr_candle['close'] < curr_candle['open']
-                
-                # Corpo atual maior que o anterior
-                prev_body = abs(prev_candle['close'] - prev_candle['open'])
-                curr_body = abs(curr_candle['close'] - curr_candle['open'])
-                bigger_body = curr_body > prev_body * 1.1
-                
-                # Fechamento atual abaixo da abertura anterior
-                closes_below = curr_candle['close'] < prev_candle['open']
-                
-                if prev_bullish and curr_bearish and bigger_body and closes_below:
-                    signals.iloc[i] = 1
-            
-            return signals
-            
-        except Exception:
-            return pd.Series(0, index=df.index)
+        return self._advanced_pattern_series(df, 'bearish_engulfing_advanced')
     
     def _detect_evening_star_advanced(self, df: pd.DataFrame) -> pd.Series:
         """Detectar Evening Star simplificado"""
@@ -1008,63 +965,11 @@ class TechnicalIndicators:
     
     def _detect_spinning_top(self, df: pd.DataFrame) -> pd.Series:
         """Detectar Spinning Top (corpo pequeno, sombras grandes)"""
-        try:
-            signals = pd.Series(0, index=df.index)
-            
-            for i in range(len(df)):
-                high = df.iloc[i]['high']
-                low = df.iloc[i]['low']
-                open_price = df.iloc[i]['open']
-                close = df.iloc[i]['close']
-                
-                # Corpo e sombras
-                body = abs(close - open_price)
-                upper_shadow = high - max(open_price, close)
-                lower_shadow = min(open_price, close) - low
-                total_range = high - low
-                
-                if total_range > 0 and body > 0:
-                    # Spinning Top: corpo pequeno, sombras grandes
-                    body_ratio = body / total_range
-                    min_shadow = min(upper_shadow, lower_shadow)
-                    
-                    if body_ratio <= 0.3 and min_shadow >= body:
-                        signals.iloc[i] = 1
-            
-            return signals
-            
-        except Exception:
-            return pd.Series(0, index=df.index)
+        return self._advanced_pattern_series(df, 'spinning_top')
     
     def _detect_long_legged_doji(self, df: pd.DataFrame) -> pd.Series:
         """Detectar Long-Legged Doji"""
-        try:
-            signals = pd.Series(0, index=df.index)
-            
-            for i in range(len(df)):
-                high = df.iloc[i]['high']
-                low = df.iloc[i]['low']
-                open_price = df.iloc[i]['open']
-                close = df.iloc[i]['close']
-                
-                # Corpo e sombras
-                body = abs(close - open_price)
-                upper_shadow = high - max(open_price, close)
-                lower_shadow = min(open_price, close) - low
-                total_range = high - low
-                
-                if total_range > 0:
-                    # Long-Legged Doji: corpo minúsculo, sombras muito longas
-                    body_ratio = body / total_range
-                    min_shadow_ratio = min(upper_shadow, lower_shadow) / total_range
-                    
-                    if body_ratio <= 0.05 and min_shadow_ratio >= 0.3:
-                        signals.iloc[i] = 1
-            
-            return signals
-            
-        except Exception:
-            return pd.Series(0, index=df.index)
+        return self._advanced_pattern_series(df, 'long_legged_doji')
     
     def _calculate_bullish_patterns_score(self, df: pd.DataFrame) -> pd.Series:
         """Calcular score consolidado de padrões bullish"""
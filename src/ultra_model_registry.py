@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Registro versionado dos modelos do UltraEnhancedAIEngine e do UltraFastAIEngine
+
+Cada série (símbolo, timeframe) tem um diretório com uma versão por arquivo
+(v0001.joblib, v0002.joblib, ...) contendo o ensemble, o seletor de features,
+o scaler e a lista de colunas usadas no treino. O arquivo current.json aponta
+para a versão em uso e guarda os metadados (janela de treino, acurácia); ele é
+trocado com os.replace depois que a nova versão está completa no disco, então
+um leitor nunca vê uma versão pela metade. Cada engine tem o seu diretório.
+
+Na inicialização apenas os current.json são lidos; o modelo de cada série é
+carregado na primeira vez que ele é pedido. Uma versão é considerada
+desatualizada quando os dados avançaram mais que staleness_candles candles
+além do fim da janela de treino.
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = 'current.json'
+VERSION_PATTERN = re.compile(r'^v(\d+)\.joblib$')
+
+
+class UltraModelRegistry:
+    """Versões dos modelos ultra (ensemble + seletor + scaler) por (símbolo, timeframe)"""
+
+    def __init__(self, directory: str = 'models/ultra', keep_versions: int = 3,
+                 staleness_candles: int = 24):
+        self.directory = directory
+        self.keep_versions = max(1, keep_versions)
+        self.staleness_candles = staleness_candles
+        self._entries: Dict[Tuple[str, str], Dict] = {}
+        self._lock = threading.Lock()
+        self.stats = {'loaded': 0, 'saved': 0, 'pruned': 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def get_entry(self, symbol: str, timeframe: str) -> Optional[Dict]:
+        """Metadados da versão em uso, se existir"""
+        with self._lock:
+            entry = self._entries.get((symbol, timeframe))
+            return dict(entry) if entry is not None else None
+
+    def load(self, symbol: str, timeframe: str) -> Optional[Tuple[Dict, Dict]]:
+        """Componentes da versão em uso e seus metadados"""
+        entry = self.get_entry(symbol, timeframe)
+        if entry is None:
+            return None
+
+        try:
+            bundle = joblib.load(self._version_path(symbol, timeframe, entry['version']))
+        except Exception as e:
+            logger.error(f"Erro ao carregar modelo ultra {symbol} {timeframe} v{entry['version']}: {e}")
+            return None
+
+        self._count('loaded')
+        return bundle, entry
+
+    def refresh(self, symbol: str, timeframe: str) -> Optional[Dict]:
+        """
+        Reler o current.json da série, que pode ter sido trocado por outro
+        processo (ex.: pipeline de treino offline)
+        """
+        current_path = os.path.join(self._series_dir(symbol, timeframe), CURRENT_FILE)
+        try:
+            with open(current_path, 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Falha ao reler modelo ultra {symbol} {timeframe}: {e}")
+            return self.get_entry(symbol, timeframe)
+
+        with self._lock:
+            self._entries[(symbol, timeframe)] = entry
+        return dict(entry)
+
+    def is_stale(self, entry: Dict, index: pd.Index) -> bool:
+        """Os dados avançaram mais que staleness_candles além do fim do treino?"""
+        trained_to = entry.get('trained_to')
+        if trained_to is None or not isinstance(index, pd.DatetimeIndex) or len(index) == 0:
+            return True
+        new_candles = int(np.count_nonzero(index.asi8 > trained_to))
+        return new_candles > self.staleness_candles
+
+    def save(self, symbol: str, timeframe: str, bundle: Dict, index: pd.Index, **metadata) -> Optional[Dict]:
+        """Gravar uma nova versão e apontar current.json para ela (escrita atômica)"""
+        series_dir = self._series_dir(symbol, timeframe)
+        is_datetime = isinstance(index, pd.DatetimeIndex) and len(index) > 0
+
+        with self._lock:
+            os.makedirs(series_dir, exist_ok=True)
+            version = max(self._versions(series_dir), default=0) + 1
+            entry = {
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'version': version,
+                'trained_from': int(index.asi8[0]) if is_datetime else None,
+                'trained_to': int(index.asi8[-1]) if is_datetime else None,
+                'rows': len(index),
+                'saved_at': time.time(),
+                **metadata,
+            }
+
+            path = self._version_path(symbol, timeframe, version)
+            try:
+                _atomic_write(path, lambda file: joblib.dump(bundle, file))
+                _atomic_write(os.path.join(series_dir, CURRENT_FILE),
+                              lambda file: file.write(json.dumps(entry, default=float).encode('utf-8')))
+            except Exception as e:
+                logger.error(f"Erro ao salvar modelo ultra {symbol} {timeframe}: {e}")
+                return None
+
+            self._entries[(symbol, timeframe)] = json.loads(json.dumps(entry, default=float))
+            self.stats['saved'] += 1
+            self._prune(series_dir, version)
+
+        logger.info(f"💾 Modelo ultra {symbol} {timeframe} salvo como v{version}")
+        return dict(entry)
+
+    def get_stats(self) -> Dict:
+        """Contadores de uso do registro"""
+        with self._lock:
+            return {**self.stats, 'series': len(self._entries)}
+
+    def _scan(self):
+        """Ler apenas o current.json de cada série"""
+        for name in sorted(os.listdir(self.directory)):
+            current_path = os.path.join(self.directory, name, CURRENT_FILE)
+            if not os.path.isfile(current_path):
+                continue
+            try:
+                with open(current_path, 'r', encoding='utf-8') as file:
+                    entry = json.load(file)
+                self._entries[(entry['symbol'], entry['timeframe'])] = entry
+            except Exception as e:
+                logger.warning(f"Modelo ultra ignorado ({name}): {e}")
+
+        if self._entries:
+            logger.info(f"💾 {len(self._entries)} modelos ultra registrados")
+
+    def _prune(self, series_dir: str, current_version: int):
+        """Remover versões antigas além de keep_versions (nunca a atual)"""
+        old_versions = sorted(v for v in self._versions(series_dir) if v != current_version)
+        for version in old_versions[:max(0, len(old_versions) - (self.keep_versions - 1))]:
+            try:
+                os.remove(os.path.join(series_dir, f"v{version:04d}.joblib"))
+                self.stats['pruned'] += 1
+            except OSError as e:
+                logger.warning(f"Falha ao remover versão antiga v{version}: {e}")
+
+    @staticmethod
+    def _versions(series_dir: str):
+        if not os.path.isdir(series_dir):
+            return []
+        return [int(match.group(1)) for match in map(VERSION_PATTERN.match, os.listdir(series_dir)) if match]
+
+    def _series_dir(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.directory, f"{quote(symbol, safe='')}_{quote(timeframe, safe='')}")
+
+    def _version_path(self, symbol: str, timeframe: str, version: int) -> str:
+        return os.path.join(self._series_dir(symbol, timeframe), f"v{version:04d}.joblib")
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+
+def _atomic_write(path: str, write):
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            write(file)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+_ultra_registries: Dict[str, UltraModelRegistry] = {}
+_ultra_registry_lock = threading.Lock()
+
+
+def get_ultra_model_registry(config=None, engine: str = 'ultra') -> Optional[UltraModelRegistry]:
+    """
+    Instância compartilhada do registro de um engine ('ultra' ou
+    'ultra_fast'); None se desabilitado na configuração
+    """
+    settings = getattr(config, 'ULTRA_MODEL_REGISTRY', None) or {}
+    if not settings.get('enabled', True):
+        return None
+
+    with _ultra_registry_lock:
+        registry = _ultra_registries.get(engine)
+        if registry is None:
+            default_directory = os.path.join('models', engine)
+            directory = (settings.get('directory', default_directory) if engine == 'ultra'
+                         else settings.get(f'{engine}_directory', default_directory))
+            registry = UltraModelRegistry(
+                directory=directory,
+                keep_versions=settings.get('keep_versions', 3),
+                staleness_candles=settings.get('staleness_candles', 24),
+            )
+            _ultra_registries[engine] = registry
+        return registry
+
+
+def _reset_locks_after_fork():
+    # Processos filhos (varredura concorrente) herdam locks possivelmente
+    # adquiridos por outras threads do pai no momento do fork
+    global _ultra_registry_lock
+    _ultra_registry_lock = threading.Lock()
+    for registry in _ultra_registries.values():
+        registry._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_locks_after_fork)
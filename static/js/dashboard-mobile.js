@@ -12,6 +12,8 @@ class MobileDashboard {
         this.isRefreshing = false;
         this.toastCount = 0;
         this.maxToasts = 3;
+        this.livePrices = {};
+        this.priceDecoder = new PriceFrameDecoder();
         
         this.init();
     }
@@ -77,6 +79,8 @@ class MobileDashboard {
             
             this.socket.on('connect', () => {
                 console.log('✅ WebSocket conectado');
+                // Quadros binários compactos: menos bytes e menos parse no celular
+                this.subscribePrices();
                 this.updateConnectionStatus(true);
                 this.isOnline = true;
             });
@@ -91,6 +95,23 @@ class MobileDashboard {
                 this.updatePrices(data);
             });
 
+            this.socket.on('price_batch', (batch) => {
+                this.handlePriceBatch(batch);
+            });
+
+            this.socket.on('price_symbols', (table) => {
+                this.priceDecoder.setSymbols(table);
+            });
+
+            this.socket.on('price_frame', (frame) => {
+                const batch = this.priceDecoder.decode(frame);
+                if (batch) {
+                    this.handlePriceBatch(batch);
+                } else if (this.priceDecoder.needsKeyframe) {
+                    this.subscribePrices();
+                }
+            });
+
             this.socket.on('signal_update', (data) => {
                 this.updateSignals(data);
             });
@@ -109,6 +130,12 @@ class MobileDashboard {
         }
     }
 
+    subscribePrices() {
+        // Tabela de símbolos + quadro-chave; também usado para ressincronizar
+        this.priceDecoder.reset();
+        this.socket.emit('subscribe_prices', { format: 'compact' });
+    }
+
     async loadInitialData() {
         this.showLoading(true);
         
@@ -174,29 +201,65 @@ class MobileDashboard {
         });
     }
 
+    handlePriceBatch(batch) {
+        // Atualizar só os cards dos símbolos do quadro; variação 24h só se veio no quadro
+        const priceGrid = document.getElementById('price-grid');
+        if (!priceGrid) return;
+
+        let added = false;
+        Object.entries(batch.prices || {}).forEach(([symbol, data]) => {
+            const live = this.livePrices[symbol] || (this.livePrices[symbol] = { symbol: symbol, change: 0 });
+            live.price = data.price;
+            if (data.change_percent !== undefined) {
+                live.change = data.change_percent;
+            }
+
+            const card = priceGrid.querySelector(`.price-card[data-symbol="${symbol}"]`);
+            if (card) {
+                this.fillPriceCard(card, live);
+            } else {
+                added = true;
+            }
+        });
+
+        if (added) {
+            this.updatePrices(Object.values(this.livePrices));
+        } else {
+            this.updateLastUpdateTime();
+        }
+    }
+
     updatePrices(prices) {
         const priceGrid = document.getElementById('price-grid');
         if (!priceGrid || !prices) return;
 
-        const priceCards = prices.map(price => {
-            const changeClass = price.change >= 0 ? 'text-success' : 'text-danger';
-            const changeIcon = price.change >= 0 ? '↗' : '↘';
-            
-            return `
-                <div class="price-card animate-slide-up">
+        prices.forEach(price => {
+            this.livePrices[price.symbol] = { symbol: price.symbol, price: price.price, change: price.change || 0 };
+        });
+
+        const priceCards = prices.map(price => `
+                <div class="price-card animate-slide-up" data-symbol="${price.symbol}">
                     <div class="price-symbol">${price.symbol}</div>
-                    <div class="price-value">$${this.formatNumber(price.price)}</div>
-                    <div class="price-change ${changeClass}">
-                        ${changeIcon} ${price.change.toFixed(2)}%
-                    </div>
+                    <div class="price-value"></div>
+                    <div class="price-change"></div>
                 </div>
-            `;
-        }).join('');
+            `).join('');
 
         priceGrid.innerHTML = priceCards;
+        priceGrid.querySelectorAll('.price-card').forEach(card => {
+            this.fillPriceCard(card, this.livePrices[card.dataset.symbol]);
+        });
         this.updateLastUpdateTime();
     }
 
+    fillPriceCard(card, price) {
+        const change = price.change || 0;
+        card.querySelector('.price-value').textContent = `$${this.formatNumber(price.price)}`;
+        const changeElement = card.querySelector('.price-change');
+        changeElement.className = `price-change ${change >= 0 ? 'text-success' : 'text-danger'}`;
+        changeElement.textContent = `${change >= 0 ? '↗' : '↘'} ${change.toFixed(2)}%`;
+    }
+
     updateSignals(signals) {
         const container = document.getElementById('signals-container');
         if (!container || !signals || !Array.isArray(signals)) return;
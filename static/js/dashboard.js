@@ -12,6 +12,7 @@ class SimpleTradingDashboard {    constructor() {
         this.tradingViewWidget = null;
         this.isConnected = false;
         this.lastPrices = {};
+        this.priceDecoder = new PriceFrameDecoder();
         this.priceUpdateInterval = null;
         this.multiSymbolPriceInterval = null;
         this.activeTradeSymbols = [];
@@ -235,6 +236,8 @@ class SimpleTradingDashboard {    constructor() {
         
         this.socket.on('connect', () => {
             this.isConnected = true;
+            // Preços chegam agrupados em um quadro binário compacto
+            this.subscribePrices();
             this.updateBotStatus(true);
             this.showNotification('Conectado ao servidor em tempo real', 'success');
         });
@@ -249,6 +252,23 @@ class SimpleTradingDashboard {    constructor() {
             this.handlePriceUpdate(data);
         });
 
+        this.socket.on('price_batch', (batch) => {
+            this.handlePriceBatch(batch);
+        });
+
+        this.socket.on('price_symbols', (table) => {
+            this.priceDecoder.setSymbols(table);
+        });
+
+        this.socket.on('price_frame', (frame) => {
+            const batch = this.priceDecoder.decode(frame);
+            if (batch) {
+                this.handlePriceBatch(batch);
+            } else if (this.priceDecoder.needsKeyframe) {
+                this.subscribePrices();
+            }
+        });
+
         this.socket.on('trade_update', (data) => {
             this.handleTradeUpdate(data);
         });
@@ -271,6 +291,12 @@ class SimpleTradingDashboard {    constructor() {
         });
     }
 
+    subscribePrices() {
+        // Tabela de símbolos + quadro-chave; também usado para ressincronizar
+        this.priceDecoder.reset();
+        this.socket.emit('subscribe_prices', { format: 'compact' });
+    }
+
     updateBotStatus(isRunning) {
         const statusElement = document.getElementById('botStatus');
         const statusTextElement = document.getElementById('botStatusText');
@@ -711,6 +737,13 @@ class SimpleTradingDashboard {    constructor() {
         this.updateActiveTradesPricesForSymbol(data.symbol, data.price);
     }
 
+    handlePriceBatch(batch) {
+        // Um evento por quadro com o último preço de cada símbolo alterado
+        Object.entries(batch.prices || {}).forEach(([symbol, data]) => {
+            this.handlePriceUpdate({ symbol: symbol, price: data.price });
+        });
+    }
+
     handleTradeUpdate(data) {
         // Atualizar trades em tempo realthis.loadPortfolio();
         this.loadActiveTradesStatus();
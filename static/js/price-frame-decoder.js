@@ -0,0 +1,89 @@
+/**
+ * CryptoNinja 🥷 - Decodificador dos quadros compactos de preço
+ * Formato em src/price_wire.py; usado por dashboard.js e dashboard-mobile.js
+ */
+
+class PriceFrameDecoder {
+    constructor() {
+        this.reset();
+    }
+
+    reset() {
+        this.symbols = [];       // índice -> símbolo (evento price_symbols)
+        this.values = [];        // índice -> inteiros em ponto fixo do último quadro
+        this.sequence = null;    // null até chegar o quadro-chave
+        this.needsKeyframe = false;
+    }
+
+    setSymbols(table) {
+        (table.symbols || []).forEach((symbol, i) => {
+            this.symbols[table.offset + i] = symbol;
+        });
+    }
+
+    decode(data) {
+        const bytes = data instanceof ArrayBuffer ? new Uint8Array(data)
+            : new Uint8Array(data.buffer, data.byteOffset, data.byteLength);
+        const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+        if (view.getUint8(0) !== PriceFrameDecoder.VERSION) return null;
+
+        const kind = view.getUint8(1);
+        const sequence = view.getUint32(2, true);
+        const timestamp = view.getFloat64(6, true);
+        const count = view.getUint16(14, true);
+
+        if (kind === PriceFrameDecoder.KEYFRAME) {
+            this.values = [];
+        } else {
+            if (this.sequence === null) return null;
+            if (sequence !== ((this.sequence + 1) >>> 0)) {
+                // Delta já incluído no quadro-chave: ignorar; buraco: pedir outro quadro-chave
+                if (((this.sequence - sequence) >>> 0) >= 0x80000000) {
+                    this.sequence = null;
+                    this.needsKeyframe = true;
+                }
+                return null;
+            }
+        }
+        this.sequence = sequence;
+
+        // Varints somados com aritmética de Number (operadores de bit truncam em 32 bits)
+        let position = 16;
+        const readVarint = () => {
+            let result = 0;
+            let multiplier = 1;
+            let byte;
+            do {
+                byte = bytes[position++];
+                result += (byte & 0x7f) * multiplier;
+                multiplier *= 128;
+            } while (byte >= 0x80);
+            return result;
+        };
+
+        const prices = {};
+        for (let i = 0; i < count; i++) {
+            const slot = readVarint();
+            const mask = bytes[position++];
+            const values = this.values[slot] || (this.values[slot] = [0, 0, 0, 0]);
+            for (let bit = 0; bit < 4; bit++) {
+                if (mask & (1 << bit)) {
+                    const zigzag = readVarint();
+                    values[bit] += zigzag % 2 ? -(zigzag + 1) / 2 : zigzag / 2;
+                }
+            }
+            const symbol = this.symbols[slot];
+            if (symbol === undefined) continue;
+            // Preço sempre; demais campos só se vieram no quadro (bit da máscara)
+            const price = { price: values[0] / 1e8 };
+            if (mask & 2) price.change_24h = values[1] / 1e8;
+            if (mask & 4) price.change_percent = values[2] / 1e4;
+            if (mask & 8) price.volume = values[3] / 1e2;
+            prices[symbol] = price;
+        }
+        return { timestamp: timestamp, prices: prices };
+    }
+}
+
+PriceFrameDecoder.VERSION = 1;
+PriceFrameDecoder.KEYFRAME = 0;
@@ -1,6 +1,6 @@
 // Service Worker para CryptoBot Dashboard
 // Versão e cache
-const CACHE_VERSION = 'cryptobot-v2.0.1';
+const CACHE_VERSION = 'cryptobot-v2.0.3';
 const STATIC_CACHE = `${CACHE_VERSION}-static`;
 const DYNAMIC_CACHE = `${CACHE_VERSION}-dynamic`;
 const API_CACHE = `${CACHE_VERSION}-api`;
@@ -9,6 +9,7 @@ const API_CACHE = `${CACHE_VERSION}-api`;
 const STATIC_ASSETS = [
   '/',
   '/static/css/mobile-responsive.css',
+  '/static/js/price-frame-decoder.js',
   '/static/js/dashboard-mobile.js',
   '/static/manifest.json',
   '/static/icons/icon-192x192.png',
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+🧪 TESTE - ASSINATURAS DINÂMICAS DE STREAMS (servidor WebSocket falso local)
+
+Sobe um servidor que imita o endpoint de streams combinados da Binance
+(SUBSCRIBE/UNSUBSCRIBE e um ticker por stream assinado a cada 100ms) e
+confere o BinanceStreamManager e o RealTimePriceAPI contra ele:
+  1. assinatura inicial e preços recebidos por push
+  2. SUBSCRIBE/UNSUBSCRIBE na conexão aberta quando o conjunto muda
+  3. divisão em várias conexões acima do limite por conexão
+  4. reconexão com backoff e nova assinatura após queda do servidor
+  5. símbolo fora dos pares configurados (COMPUSDT) sem REST no caminho
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+import websockets
+
+from src.binance_stream_manager import BinanceStreamManager
+from src.realtime_price_api import RealTimePriceAPI
+
+
+class FakeBinanceServer:
+    """Endpoint de streams combinados em ws://127.0.0.1:<porta>/stream"""
+
+    def __init__(self):
+        self.connections = {}  # conexão -> streams assinados
+        self.control_messages = []
+        self.loop = None
+        self.server = None
+        self.port = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self):
+        return f"ws://127.0.0.1:{self.port}/stream"
+
+    def start(self):
+        threading.Thread(target=lambda: asyncio.run(self._main()), daemon=True).start()
+        self._ready.wait(5)
+
+    def drop_connections(self):
+        """Derrubar todas as conexões (o servidor continua aceitando novas)"""
+        for connection in list(self.connections):
+            asyncio.run_coroutine_threadsafe(connection.close(), self.loop)
+
+    def subscriptions(self):
+        return [sorted(streams) for streams in list(self.connections.values())]
+
+    async def _main(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await websockets.serve(self._handler, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self._ready.set()
+        await asyncio.Future()
+
+    async def _handler(self, connection, *args):
+        streams = self.connections[connection] = set()
+        feeder = asyncio.create_task(self._feed(connection, streams))
+        try:
+            async for message in connection:
+                request = json.loads(message)
+                self.control_messages.append(request['method'])
+                if request['method'] == 'SUBSCRIBE':
+                    streams.update(request['params'])
+                elif request['method'] == 'UNSUBSCRIBE':
+                    streams.difference_update(request['params'])
+                await connection.send(json.dumps({'result': None, 'id': request['id']}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            feeder.cancel()
+            self.connections.pop(connection, None)
+
+    async def _feed(self, connection, streams):
+        price = 100.0
+        while True:
+            await asyncio.sleep(0.1)
+            price += 0.5
+            for stream in list(streams):
+                symbol = stream.split('@')[0].upper()
+                await connection.send(json.dumps({'stream': stream, 'data': {'e': '24hrTicker', 's': symbol,
+                                                                             'c': f"{price:.2f}"}}))
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def check(name, ok):
+    print(f"  {'✅' if ok else '❌'} {name}")
+    return ok
+
+
+def test_stream_manager(server):
+    print("\n📡 BinanceStreamManager")
+    received = {}
+    manager = BinanceStreamManager(lambda data, size: received.__setitem__(data['s'], data['c']),
+                                   url=server.url, max_streams_per_connection=3,
+                                   control_interval=0.01, reconnect_base=0.2, reconnect_max=1.0)
+    results = []
+
+    manager.update_streams(['btcusdt@ticker', 'ethusdt@ticker'])
+    manager.start()
+    results.append(check("assinatura inicial recebe preços",
+                         wait_until(lambda: {'BTCUSDT', 'ETHUSDT'} <= set(received))))
+
+    connects = manager.get_stats()['connects']
+    manager.update_streams(['btcusdt@ticker', 'solusdt@ticker'])
+    results.append(check("SUBSCRIBE/UNSUBSCRIBE na conexão aberta",
+                         wait_until(lambda: server.subscriptions() == [['btcusdt@ticker', 'solusdt@ticker']])
+                         and manager.get_stats()['connects'] == connects
+                         and 'UNSUBSCRIBE' in server.control_messages))
+
+    streams = [f"coin{i}usdt@ticker" for i in range(7)]
+    manager.update_streams(streams)
+    results.append(check("7 streams divididos em 3 conexões (limite 3)",
+                         wait_until(lambda: sorted(len(s) for s in server.subscriptions()) == [1, 3, 3])))
+
+    manager.update_streams(streams[:2])
+    results.append(check("conexões vazias fechadas",
+                         wait_until(lambda: server.subscriptions() == [sorted(streams[:2])])))
+
+    server.drop_connections()
+    received.clear()
+    results.append(check("reconexão com nova assinatura",
+                         wait_until(lambda: manager.get_stats()['reconnects'] >= 1
+                                    and server.subscriptions() == [sorted(streams[:2])]
+                                    and {'COIN0USDT', 'COIN1USDT'} <= set(received))))
+
+    manager.stop(timeout=2)
+    results.append(check("stop fecha as conexões", wait_until(lambda: not server.subscriptions())))
+    print(f"  📊 {manager.get_stats()}")
+    return all(results)
+
+
+def test_realtime_price_api(server):
+    print("\n💹 RealTimePriceAPI")
+    api = RealTimePriceAPI()
+    api.binance_ws_url = server.url
+    api.stream_settings = {'control_interval': 0.01, 'reconnect_base': 0.2}
+    api.websocket_fresh_seconds = 5.0
+    api.set_watch_symbols('config', ['BTCUSDT', 'ETHUSDT'])
+    api._update_crypto_prices_rest = lambda symbols: None  # Sem rede: só o WebSocket
+    rest_calls = []
+    api._fetch_price_immediate = lambda symbol: rest_calls.append(symbol)
+
+    api.start()
+    results = [check("preços dos pares configurados via WebSocket",
+                     wait_until(lambda: api.get_price_info('BTCUSDT') is not None
+                                and api.get_price_info('BTCUSDT')['source'] == 'websocket'))]
+
+    api.set_watch_symbols('trades', ['COMPUSDT'])
+    results.append(check("COMPUSDT assinado ao entrar no conjunto observado",
+                         wait_until(lambda: api.get_price_info('COMPUSDT') is not None)))
+    results.append(check("get_current_price sem REST no caminho da requisição",
+                         api.get_current_price('COMPUSDT') is not None and not rest_calls))
+
+    api.stop()
+    print(f"  📊 {api.get_stats()}")
+    return all(results)
+
+
+if __name__ == "__main__":
+    print("🧪 TESTE - ASSINATURAS DINÂMICAS DE STREAMS")
+    print("=" * 60)
+    server = FakeBinanceServer()
+    server.start()
+    ok = test_stream_manager(server)
+    ok = test_realtime_price_api(server) and ok
+    print("=" * 60)
+    print("✅ Todos os testes passaram" if ok else "❌ Falhas encontradas")
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+🏭 PIPELINE DE TREINO OFFLINE
+Treina os modelos dos engines de IA fora do caminho de predição, a partir do
+histórico salvo no cache de candles em disco (data/candles).
+
+Para cada série (símbolo, timeframe) as features são montadas uma vez e os
+modelos configurados em TRAINING_PIPELINE['models'] são ajustados:
+  - ultra:      ensemble do UltraEnhancedAIEngine (registro models/ultra)
+  - ultra_fast: RandomForest do UltraFastAIEngine (registro models/ultra_fast)
+  - lstm:       SimpleLSTM de preço (registro models/lstm, um por símbolo)
+
+As séries são distribuídas entre processos (um por núcleo por padrão). Os
+engines em execução passam a usar as versões novas quando as suas ficam
+desatualizadas. Ao final é exibido (e salvo em JSON) um relatório de tempo e
+acurácia por série e modelo.
+
+Uso:
+    python training_pipeline.py [--symbols BTCUSDT ETHUSDT] [--timeframes 1h 4h] [--workers 4]
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from src.candle_store import CandleDiskCache, CandleRingBuffer
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Engines usados pelos processos de treino (um conjunto por processo)
+_worker_engines = None
+
+
+def _init_training_worker(config, limit_threads: bool):
+    """Inicializar processo de treino"""
+    global _worker_engines
+    if limit_threads:
+        # Um processo por núcleo: evitar que BLAS/OpenMP abram threads por processo
+        try:
+            from threadpoolctl import threadpool_limits
+            threadpool_limits(limits=1)
+        except ImportError:
+            logger.warning("⚠️ threadpoolctl não instalado: threads de BLAS/OpenMP sem limite por processo")
+
+    from ai_engine_ultra_enhanced import UltraEnhancedAIEngine
+    from ai_engine_ultra_fast import UltraFastAIEngine
+    _worker_engines = {'ultra': UltraEnhancedAIEngine(config), 'ultra_fast': UltraFastAIEngine(config)}
+
+
+def load_history(config, symbols: Optional[List[str]] = None,
+                 timeframes: Optional[List[str]] = None) -> Dict[Tuple[str, str], pd.DataFrame]:
+    """Séries (símbolo, timeframe) do cache de candles em disco, filtradas se informado"""
+    fetch_settings = config.MARKET_DATA_FETCH
+    settings = config.TRAINING_PIPELINE
+    disk_cache = CandleDiskCache(fetch_settings.get('candle_cache_dir', 'data/candles'))
+    max_candles = settings.get('max_candles', 1000)
+    min_candles = settings.get('min_candles', 200)
+
+    history = {}
+    for key in disk_cache.keys():
+        symbol, _, timeframe = key.rpartition('_')
+        if not symbol or (symbols and symbol not in symbols) or (timeframes and timeframe not in timeframes):
+            continue
+        try:
+            arrays = disk_cache.load(key)
+            if arrays is None or len(arrays[0]) < min_candles:
+                logger.warning(f"⚠️ {key}: histórico insuficiente para treino")
+                continue
+            buffer = CandleRingBuffer(max_candles)
+            buffer.extend(*arrays)
+            history[(symbol, timeframe)] = buffer.to_dataframe()
+        except Exception as e:
+            logger.error(f"Erro ao carregar histórico de {key}: {e}")
+    return history
+
+
+def _train_series(symbol: str, timeframe: str, candles: pd.DataFrame,
+                  models: List[str], lstm_timeframe: str) -> List[Dict]:
+    """Treinar todos os modelos de uma série; uma linha de relatório por modelo"""
+    ultra_engine = _worker_engines['ultra']
+    rows = []
+
+    def run(model: str, train):
+        started = time.perf_counter()
+        try:
+            result = train()
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        rows.append({
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'model': model,
+            'success': bool(result.get('success', False)),
+            'accuracy': result.get('accuracy'),
+            'version': result.get('version'),
+            'seconds': round(time.perf_counter() - started, 3),
+            'candles': len(candles),
+            'error': result.get('reason') or result.get('error'),
+        })
+
+    if 'ultra' in models:
+        # Features ultra montadas uma vez por série
+        features = ultra_engine.create_ultra_features(candles.copy())
+        run('ultra', lambda: ultra_engine.train_ultra_model(features, symbol, timeframe))
+
+    if 'ultra_fast' in models:
+        run('ultra_fast', lambda: _worker_engines['ultra_fast'].train_model(candles, symbol, timeframe))
+
+    if 'lstm' in models and timeframe == lstm_timeframe:
+        def train_lstm():
+            result = ultra_engine.train_lstm_model(candles, symbol, timeframe)
+            return {'success': result.get('model') is not None, 'accuracy': result.get('accuracy')}
+        run('lstm', train_lstm)
+
+    return rows
+
+
+def run_training_pipeline(config, symbols: Optional[List[str]] = None,
+                          timeframes: Optional[List[str]] = None,
+                          workers: Optional[int] = None) -> Dict:
+    """Treinar todas as séries do cache em processos paralelos e devolver o relatório"""
+    settings = config.TRAINING_PIPELINE
+    models = settings.get('models', ['ultra', 'ultra_fast', 'lstm'])
+    lstm_timeframe = settings.get('lstm_timeframe', '1h')
+    workers = workers or settings.get('workers', 0) or os.cpu_count() or 1
+
+    started = time.perf_counter()
+    history = load_history(config, symbols, timeframes)
+    load_seconds = time.perf_counter() - started
+    logger.info(f"📚 {len(history)} séries carregadas do cache em {load_seconds:.2f}s")
+
+    rows = []
+    if history:
+        workers = min(workers, len(history))
+        # fork quando disponível, como na varredura concorrente do SignalGenerator
+        context = (multiprocessing.get_context('fork')
+                   if 'fork' in multiprocessing.get_all_start_methods() else None)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_training_worker,
+                                 initargs=(config, workers > 1)) as pool:
+            futures = {pool.submit(_train_series, symbol, timeframe, candles, models, lstm_timeframe):
+                       (symbol, timeframe) for (symbol, timeframe), candles in history.items()}
+            for future in as_completed(futures):
+                symbol, timeframe = futures[future]
+                try:
+                    rows.extend(future.result())
+                except Exception as e:
+                    logger.error(f"Erro no treino de {symbol} {timeframe}: {e}")
+                    rows.append({'symbol': symbol, 'timeframe': timeframe, 'model': '*',
+                                 'success': False, 'error': str(e)})
+
+    rows.sort(key=lambda row: (row['symbol'], row['timeframe'], row['model']))
+    report = {
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'workers': workers,
+        'series': len(history),
+        'load_seconds': round(load_seconds, 3),
+        'total_seconds': round(time.perf_counter() - started, 3),
+        'results': rows,
+    }
+
+    report_path = settings.get('report_path')
+    if report_path:
+        try:
+            os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
+            with open(report_path, 'w', encoding='utf-8') as file:
+                json.dump(report, file, indent=2, default=float)
+        except Exception as e:
+            logger.error(f"Erro ao salvar relatório de treino: {e}")
+    return report
+
+
+def print_report(report: Dict):
+    print(f"\n📋 RELATÓRIO DE TREINO - {report['series']} séries, {report['workers']} processos")
+    print("=" * 78)
+    print(f"{'Símbolo':<12}{'TF':<6}{'Modelo':<12}{'Versão':>7}{'Acurácia':>10}{'Tempo':>10}  Status")
+    for row in report['results']:
+        accuracy = f"{row['accuracy']:.3f}" if row.get('accuracy') is not None else '-'
+        version = f"v{row['version']}" if row.get('version') else '-'
+        status = '✅' if row['success'] else f"❌ {row.get('error') or ''}"
+        print(f"{row['symbol']:<12}{row['timeframe']:<6}{row['model']:<12}{version:>7}"
+              f"{accuracy:>10}{row.get('seconds', 0):>9.2f}s  {status}")
+    print("=" * 78)
+    print(f"⏱️ Histórico: {report['load_seconds']:.2f}s | Total: {report['total_seconds']:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline de treino offline dos engines de IA")
+    parser.add_argument('--symbols', nargs='*', help="Símbolos (padrão: todos do cache)")
+    parser.add_argument('--timeframes', nargs='*', help="Timeframes (padrão: todos do cache)")
+    parser.add_argument('--workers', type=int, help="Processos de treino (padrão: um por núcleo)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    print("🏭 PIPELINE DE TREINO OFFLINE")
+    report = run_training_pipeline(Config(), args.symbols, args.timeframes, args.workers)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()